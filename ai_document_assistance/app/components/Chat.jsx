@@ -10,6 +10,9 @@ const Chat = ({
   showHistory,
   messages,
   messagesEndRef,
+  hasOlderMessages,
+  loadOlderMessages,
+  loadingOlderMessages,
   setInputMessage,
   handleSendMessage,
   inputMessage,
@@ -67,7 +70,14 @@ const Chat = ({
         </div>
       )}
 
-      <ChatBox messages={messages} messagesEndRef={messagesEndRef} loadingSendMessage={loadingSendMessage} />
+      <ChatBox
+        messages={messages}
+        messagesEndRef={messagesEndRef}
+        loadingSendMessage={loadingSendMessage}
+        hasOlderMessages={hasOlderMessages}
+        loadOlderMessages={loadOlderMessages}
+        loadingOlderMessages={loadingOlderMessages}
+      />
       <SendMessage
         setInputMessage={setInputMessage}
         handleSendMessage={handleSendMessage}
@@ -1,7 +1,7 @@
 import React from 'react'
 import { Loader2 } from 'lucide-react'
 
-const ChatBox = ({messages=[] , messagesEndRef, loadingSendMessage}) => {
+const ChatBox = ({messages=[] , messagesEndRef, loadingSendMessage, hasOlderMessages, loadOlderMessages, loadingOlderMessages}) => {
   return (
             <div className="flex-1 overflow-y-auto p-6 space-y-4">
           {messages.length === 0 ? (
@@ -17,6 +17,18 @@ const ChatBox = ({messages=[] , messagesEndRef, loadingSendMessage}) => {
             </div>
           ) : (
             <>
+              {hasOlderMessages && (
+                <div className="flex justify-center">
+                  <button
+                    onClick={loadOlderMessages}
+                    disabled={loadingOlderMessages}
+                    className="flex items-center gap-2 px-4 py-2 text-xs text-gray-300 bg-white/5 hover:bg-white/10 rounded-lg border border-purple-500/20 transition-all disabled:opacity-50 disabled:cursor-not-allowed"
+                  >
+                    {loadingOlderMessages && <Loader2 className="w-4 h-4 animate-spin text-purple-400" />}
+                    Load earlier messages
+                  </button>
+                </div>
+              )}
 {messages.map(msg => {
   // Function to convert plain text lists to formatted JSX
   const formatContent = (text) => {
@@ -1,7 +1,7 @@
 import { Trash, X, Loader2 } from "lucide-react";
 import React from "react";
 
-const ChatHistory = ({ setShowHistory, loadSessionMessages, chatHistory , deleteChatSession, loadingChatHistory, loadingDeleteChat}) => {
+const ChatHistory = ({ setShowHistory, loadSessionMessages, chatHistory , deleteChatSession, loadingChatHistory, loadingDeleteChat, hasMoreChatHistory, loadMoreChatHistory, loadingMoreChatHistory}) => {
   console.log(chatHistory, "chat History");
   return (
     <div className="w-80 bg-black/30 backdrop-blur-xl border-l border-purple-500/20 p-6 overflow-y-auto">
@@ -23,9 +23,8 @@ const ChatHistory = ({ setShowHistory, loadSessionMessages, chatHistory , delete
           </div>
         ) : Array.isArray(chatHistory) && chatHistory.length > 0 ? (
           chatHistory.map((chat) => {
-            const firstMessage = chat.messages?.[0]?.message || "No messages";
-            const lastMessageTimestamp =
-              chat.messages?.[chat.messages.length - 1]?.timestamp;
+            const firstMessage = chat.title || "No messages";
+            const lastMessageTimestamp = chat.updatedAt;
             const isDeleting = loadingDeleteChat;
 
             return (
@@ -65,6 +64,17 @@ const ChatHistory = ({ setShowHistory, loadSessionMessages, chatHistory , delete
             No chat history yet
           </p>
         )}
+
+        {!loadingChatHistory && hasMoreChatHistory && (
+          <button
+            onClick={loadMoreChatHistory}
+            disabled={loadingMoreChatHistory}
+            className="w-full flex items-center justify-center gap-2 p-3 text-sm text-gray-300 bg-white/5 hover:bg-white/10 rounded-lg border border-purple-500/20 transition-all disabled:opacity-50 disabled:cursor-not-allowed"
+          >
+            {loadingMoreChatHistory && <Loader2 className="w-4 h-4 animate-spin text-purple-400" />}
+            Load more
+          </button>
+        )}
       </div>
     </div>
   );
@@ -11,6 +11,10 @@ export default function AIDocAnalyzer() {
   const [documents, setDocuments] = useState([]);
   const [messages, setMessages] = useState([]);
   const [chatHistory, setChatHistory] = useState([]);
+  // nextCursor of the last session list page (null on the last page)
+  const [chatHistoryCursor, setChatHistoryCursor] = useState(null);
+  // nextCursor of the oldest loaded page of the open session's messages
+  const [olderMessagesCursor, setOlderMessagesCursor] = useState(null);
   const [inputMessage, setInputMessage] = useState('');
   const [showHistory, setShowHistory] = useState(false);
   const [showSidebar, setShowSidebar] = useState(true);
@@ -21,6 +25,8 @@ export default function AIDocAnalyzer() {
   const [loadingUpload, setLoadingUpload] = useState(false);
   const [loadingDocuments, setLoadingDocuments] = useState(false);
   const [loadingChatHistory, setLoadingChatHistory] = useState(false);
+  const [loadingMoreChatHistory, setLoadingMoreChatHistory] = useState(false);
+  const [loadingOlderMessages, setLoadingOlderMessages] = useState(false);
   const [loadingSendMessage, setLoadingSendMessage] = useState(false);
   const [loadingDeleteChat, setLoadingDeleteChat] = useState(false);
   const [loadingNewChat, setLoadingNewChat] = useState(false);
@@ -30,9 +36,11 @@ export default function AIDocAnalyzer() {
     messagesEndRef.current?.scrollIntoView({ behavior: 'smooth' });
   };
 
+  // Only new messages at the end scroll; loading earlier ones keeps the position
+  const lastMessageId = messages[messages.length - 1]?.id;
   useEffect(() => {
     scrollToBottom();
-  }, [messages]);
+  }, [lastMessageId]);
 
   const handleFileUpload = async (e) => {
     const files = Array.from(e.target.files);
@@ -160,40 +168,100 @@ export default function AIDocAnalyzer() {
     }
   };
 
-  const loadSessionMessages = (session) => {
-    if (!session || !Array.isArray(session.messages)) {
+  const loadSessionMessages = async (session) => {
+    if (!session || !session.sessionId) {
       console.error("Invalid session data", session);
       return;
     }
 
-    // Set the sessionId when loading an existing session
-    if (session.sessionId) {
+    const token = sessionStorage.getItem("auth_token");
+    if (!token) {
+      console.error("Missing auth_token");
+      return;
+    }
+
+    // The session list has no messages; fetch the latest page of this session's transcript
+    try {
+      const data = await fetchSessionMessages(token, session.sessionId, null);
+
+      // Set the sessionId when loading an existing session
       sessionStorage.setItem("sessionId", session.sessionId);
+
+      setMessages(data.messages);
+      setOlderMessagesCursor(data.nextCursor);
+      setShowHistory(false);
+      setErrorMessage(null); // Clear any previous errors
+    } catch (err) {
+      console.error("Chat session fetch error:", err);
+      setErrorMessage(err.message || "Failed to load chat session. Please try again.");
     }
+  };
 
-    const formattedMessages = session.messages.map((msg, index) => ({
-      id: `${session.sessionId}-${index}`,
-      type: msg.role === "user" ? "user" : "ai",
-      content: msg.message,
-      timestamp: new Date(msg.timestamp).toLocaleTimeString(),
-    }));
+  // One page of a session's messages, ending before the `before` cursor (the latest page if null)
+  const fetchSessionMessages = async (token, sessionId, before) => {
+    const params = new URLSearchParams({ sessionId });
+    if (before) params.set("before", before);
 
-    setMessages(formattedMessages);
-    setShowHistory(false);
-    setErrorMessage(null); // Clear any previous errors
+    const res = await fetch(
+      `${process.env.NEXT_PUBLIC_BACKEND_API}/chat/history?${params}`,
+      {
+        method: "GET",
+        headers: {
+          Authorization: `Bearer ${token}`,
+          "Content-Type": "application/json",
+        },
+      }
+    );
+    const data = await res.json();
+    if (!res.ok || !data.success || !Array.isArray(data.messages)) {
+      throw new Error(data.error || `Failed to fetch chat session: ${res.status}`);
+    }
+
+    // Messages are numbered from the start of the session, so ids stay unique across pages
+    const firstIndex = data.nextCursor ? Number(data.nextCursor) : 0;
+    return {
+      nextCursor: data.nextCursor || null,
+      messages: data.messages.map((msg, index) => ({
+        id: `${sessionId}-${firstIndex + index}`,
+        type: msg.role === "user" ? "user" : "ai",
+        content: msg.message,
+        timestamp: new Date(msg.timestamp).toLocaleTimeString(),
+      })),
+    };
   };
 
-  const loadChatHistory = async () => {
+  const loadOlderMessages = async () => {
+    const token = sessionStorage.getItem("auth_token");
+    const sessionId = sessionStorage.getItem("sessionId");
+    if (!token || !sessionId || !olderMessagesCursor || loadingOlderMessages) return;
+
+    setLoadingOlderMessages(true);
+    try {
+      const data = await fetchSessionMessages(token, sessionId, olderMessagesCursor);
+      setMessages((prev) => [...data.messages, ...prev]);
+      setOlderMessagesCursor(data.nextCursor);
+    } catch (err) {
+      console.error("Chat session fetch error:", err);
+      setErrorMessage(err.message || "Failed to load earlier messages. Please try again.");
+    } finally {
+      setLoadingOlderMessages(false);
+    }
+  };
+
+  // The first page of sessions, or with a cursor the next page, appended to the list
+  const loadChatHistory = async (cursor = null) => {
     const token = sessionStorage.getItem("auth_token");
     if (!token) {
       console.error("Missing auth_token");
       return;
     }
 
-    setLoadingChatHistory(true);
+    const setLoading = cursor ? setLoadingMoreChatHistory : setLoadingChatHistory;
+    setLoading(true);
     setErrorMessage(null);
     try {
-      const res = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_API}/chat/all-history`, {
+      const params = cursor ? `?${new URLSearchParams({ cursor })}` : "";
+      const res = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_API}/chat/all-history${params}`, {
         method: "GET",
         headers: {
           Authorization: `Bearer ${token}`,
@@ -213,9 +281,10 @@ export default function AIDocAnalyzer() {
 
       const data = await res.json();
       
-      if (Array.isArray(data)) {
-        setChatHistory(data);
-        setShowHistory(false);
+      if (data.success && Array.isArray(data.sessions)) {
+        setChatHistory((prev) => (cursor ? [...prev, ...data.sessions] : data.sessions));
+        setChatHistoryCursor(data.nextCursor || null);
+        if (!cursor) setShowHistory(false);
       } else {
         console.error("Unexpected chat history response shape", data);
       }
@@ -223,7 +292,13 @@ export default function AIDocAnalyzer() {
       console.error("Chat history fetch error:", err);
       setErrorMessage(err.message || "Failed to load chat history. Please try again.");
     } finally {
-      setLoadingChatHistory(false);
+      setLoading(false);
+    }
+  };
+
+  const loadMoreChatHistory = () => {
+    if (chatHistoryCursor && !loadingMoreChatHistory) {
+      loadChatHistory(chatHistoryCursor);
     }
   };
 
@@ -368,6 +443,7 @@ export default function AIDocAnalyzer() {
       const currentSessionId = sessionStorage.getItem("sessionId");
       if (currentSessionId === sessionId) {
         setMessages([]);
+        setOlderMessagesCursor(null);
         sessionStorage.removeItem("sessionId");
       }
     } catch (err) {
@@ -389,6 +465,7 @@ export default function AIDocAnalyzer() {
     setLoadingNewChat(true);
     setErrorMessage(null);
     setMessages([]);
+    setOlderMessagesCursor(null);
 
     try {
       const res = await fetch(`${process.env.NEXT_PUBLIC_BACKEND_API}/chat/new-session`, {
@@ -447,6 +524,9 @@ export default function AIDocAnalyzer() {
           showHistory={showHistory} 
           messages={messages} 
           messagesEndRef={messagesEndRef} 
+          hasOlderMessages={Boolean(olderMessagesCursor)}
+          loadOlderMessages={loadOlderMessages}
+          loadingOlderMessages={loadingOlderMessages}
           setInputMessage={setInputMessage} 
           handleSendMessage={handleSendMessage} 
           inputMessage={inputMessage} 
@@ -463,6 +543,9 @@ export default function AIDocAnalyzer() {
             deleteChatSession={deleteChatSession}
             chatHistory={chatHistory}
             loadingChatHistory={loadingChatHistory}
+            hasMoreChatHistory={Boolean(chatHistoryCursor)}
+            loadMoreChatHistory={loadMoreChatHistory}
+            loadingMoreChatHistory={loadingMoreChatHistory}
             loadingDeleteChat={loadingDeleteChat}
           />
         )}
@@ -5,7 +5,13 @@ from route.documents import documents_bp
 from route.chat import chat_bp
 from route.admin import admin_bp
 from route.swagger_docs import documents_ns
-from config import FRONTEND_URL
+from configuration.Database import db
+from models.indexes import ensure_indexes, report_collection_scans
+from models.user import backfill_user_fields
+from lib.deletionJobs import deletion_worker
+from lib.chatArchive import chat_archiver
+from utils.deadline import DEADLINE_HEADER
+from config import FRONTEND_URL, MONGO_ENSURE_INDEXES, MONGO_REPORT_COLLECTION_SCANS, DELETION_WORKER_ENABLED, CHAT_ARCHIVE_ENABLED, PREFORK_SERVER
 from flask_restx import Api
 
 api = Api(
@@ -15,6 +21,16 @@ api = Api(
     doc="/docs",
 )
 
+def start_background_workers():
+    """
+    Start this process's background jobs. Under the preforking server they
+    start in each worker after fork (gunicorn.conf.py), never in the master.
+    """
+    if DELETION_WORKER_ENABLED:
+        deletion_worker.start()
+    if CHAT_ARCHIVE_ENABLED:
+        chat_archiver.start()
+
 def create_app() -> Flask:
     app = Flask(__name__)
     
@@ -22,7 +38,7 @@ def create_app() -> Flask:
         app,
         supports_credentials=False,
         origins=[FRONTEND_URL],
-        allow_headers=["Content-Type", "Authorization"],
+        allow_headers=["Content-Type", "Authorization", DEADLINE_HEADER],
         methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"]
     )
     api.init_app(app)
@@ -33,6 +49,14 @@ def create_app() -> Flask:
     app.register_blueprint(chat_bp)
     app.register_blueprint(admin_bp)
 
+    if MONGO_ENSURE_INDEXES:
+        ensure_indexes(db)
+        backfill_user_fields(db)
+    if MONGO_REPORT_COLLECTION_SCANS:
+        report_collection_scans(db)
+    if not PREFORK_SERVER:
+        start_background_workers()
+
     @app.get("/health")
     def health():
         return jsonify({"success": True}), 200
@@ -41,5 +65,6 @@ def create_app() -> Flask:
 
 app = create_app()
 
+# Development server (WSGI only); in production run `gunicorn -c gunicorn.conf.py asgi:app`
 if __name__ == "__main__":
     app.run(host="0.0.0.0", port=5055, debug=True)
\ No newline at end of file
@@ -0,0 +1,90 @@
+"""
+ASGI entry point. The routes in route/chat_async.py run on the event loop;
+every other request goes to the Flask app, which runs on a pool of WEB_THREADS
+threads through a2wsgi.
+
+Production (gunicorn.conf.py, uvicorn workers), from backend/src:
+    gunicorn -c gunicorn.conf.py asgi:app
+A single local process:
+    uvicorn asgi:app --port 5055
+"""
+import json
+
+from a2wsgi import WSGIMiddleware
+
+from app import app as flask_app
+from route.chat_async import ASYNC_ROUTES
+from config import FRONTEND_URL, WEB_THREADS
+
+# Question bodies are small; anything larger is rejected before parsing
+MAX_ASYNC_BODY_BYTES = 1024 * 1024
+
+flask_asgi = WSGIMiddleware(flask_app, workers=WEB_THREADS)
+
+
+async def _read_body(receive) -> bytes | None:
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body += message.get("body", b"")
+        if len(body) > MAX_ASYNC_BODY_BYTES:
+            return None
+        if not message.get("more_body"):
+            return bytes(body)
+
+
+def _cors_headers(headers: dict) -> list:
+    """
+    What flask-cors adds to Flask responses (preflights still go to Flask).
+    """
+    origin = headers.get("origin")
+    if not origin or FRONTEND_URL not in ("*", origin):
+        return []
+    return [(b"access-control-allow-origin", origin.encode()), (b"vary", b"Origin")]
+
+
+async def _serve(handler, scope, receive, send):
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope["headers"]}
+    body = await _read_body(receive)
+    if body is None:
+        result, status = {"success": False, "error": "Request body too large"}, 413
+    else:
+        try:
+            result, status = await handler(headers, body)
+        except Exception as e:
+            print(f"❌ Unexpected error in {scope['path']}: {e}")
+            result, status = {"success": False, "error": f"An unexpected error occurred: {str(e)}"}, 500
+
+    payload = json.dumps(result, default=str).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(payload)).encode()),
+            *_cors_headers(headers),
+        ],
+    })
+    await send({"type": "http.response.body", "body": payload})
+
+
+async def _lifespan(receive, send):
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await _lifespan(receive, send)
+    if scope["type"] == "http":
+        handler = ASYNC_ROUTES.get((scope["method"], scope["path"]))
+        if handler is not None:
+            return await _serve(handler, scope, receive, send)
+    await flask_asgi(scope, receive, send)
@@ -4,6 +4,10 @@ from dotenv import load_dotenv
 load_dotenv()
 
 MONGO_URI = os.getenv("MONGO_URI", "")
+# Create the indexes declared in models/indexes.py at startup, and optionally
+# explain the hot queries and report any that still scan a whole collection
+MONGO_ENSURE_INDEXES = os.getenv("MONGO_ENSURE_INDEXES", "true").lower() == "true"
+MONGO_REPORT_COLLECTION_SCANS = os.getenv("MONGO_REPORT_COLLECTION_SCANS", "false").lower() == "true"
 # PINECONE_API_KEY = os.getenv("PINECONE_API_KEY", "")
 # PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME", "")
 # PINECONE_CHAT_INDEX_NAME = os.getenv("PINECONE_CHAT_INDEX_NAME", "")
@@ -22,5 +26,97 @@ except Exception:
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "models/embedding-001")
 
+# Decrypted api_config values are cached per process and reloaded after this many seconds
+API_CONFIG_TTL_SECONDS = float(os.getenv("API_CONFIG_TTL_SECONDS", "60"))
+
+# Per-process cache of user status, role and limit settings (seconds; 0 disables)
+USER_CONTEXT_TTL_SECONDS = float(os.getenv("USER_CONTEXT_TTL_SECONDS", "30"))
+USER_CONTEXT_CACHE_SIZE = int(os.getenv("USER_CONTEXT_CACHE_SIZE", "10000"))
+
 # Admin monitoring defaults (override via env if desired)
-DEFAULT_TOKEN_COST_PER_1K_USD = float(os.getenv("DEFAULT_TOKEN_COST_PER_1K_USD", "0.002"))
\ No newline at end of file
+DEFAULT_TOKEN_COST_PER_1K_USD = float(os.getenv("DEFAULT_TOKEN_COST_PER_1K_USD", "0.002"))
+
+# RAG context packing (token budget for retrieved context sent to the LLM)
+MAX_CONTEXT_TOKENS = int(os.getenv("MAX_CONTEXT_TOKENS", "1000"))
+
+# LLM HTTP client: pooled keep-alive session and separate connect/read timeouts (seconds)
+LLM_HTTP_POOL_SIZE = int(os.getenv("LLM_HTTP_POOL_SIZE", "10"))
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_READ_TIMEOUT = float(os.getenv("LLM_READ_TIMEOUT", "30"))
+
+# LLM admission control defaults; each can be overridden by the same key in the api_config collection
+LLM_RATE_LIMIT_PER_SEC = float(os.getenv("LLM_RATE_LIMIT_PER_SEC", "0"))  # 0 disables the token bucket
+LLM_RATE_LIMIT_BURST = int(os.getenv("LLM_RATE_LIMIT_BURST", "10"))
+LLM_MAX_IN_FLIGHT = int(os.getenv("LLM_MAX_IN_FLIGHT", "16"))
+LLM_MAX_QUEUE_WAIT = float(os.getenv("LLM_MAX_QUEUE_WAIT", "5"))
+LLM_RETRY_BUDGET_RATIO = float(os.getenv("LLM_RETRY_BUDGET_RATIO", "0.1"))
+
+# Hedged LLM requests (opt-in); overridable from the api_config collection
+LLM_HEDGE_ENABLED = os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+LLM_HEDGE_PERCENTILE = float(os.getenv("LLM_HEDGE_PERCENTILE", "95"))
+LLM_HEDGE_MIN_DELAY = float(os.getenv("LLM_HEDGE_MIN_DELAY", "2"))
+LLM_HEDGE_MAX_RATIO = float(os.getenv("LLM_HEDGE_MAX_RATIO", "0.05"))
+
+# LLM usage metering: records are buffered and flushed to Mongo in batches
+LLM_USAGE_FLUSH_SIZE = int(os.getenv("LLM_USAGE_FLUSH_SIZE", "100"))
+LLM_USAGE_FLUSH_INTERVAL = float(os.getenv("LLM_USAGE_FLUSH_INTERVAL", "10"))
+
+# Per-user daily activity rollups for admin analytics, counted in memory and flushed with $inc
+USAGE_ROLLUP_FLUSH_INTERVAL = float(os.getenv("USAGE_ROLLUP_FLUSH_INTERVAL", "10"))
+USAGE_ROLLUP_MAX_KEYS = int(os.getenv("USAGE_ROLLUP_MAX_KEYS", "5000"))
+
+# Chat message vectors are written behind the request by a background queue
+CHAT_VECTOR_BATCH_SIZE = int(os.getenv("CHAT_VECTOR_BATCH_SIZE", "32"))
+CHAT_VECTOR_QUEUE_SIZE = int(os.getenv("CHAT_VECTOR_QUEUE_SIZE", "5000"))
+CHAT_VECTOR_MAX_RETRIES = int(os.getenv("CHAT_VECTOR_MAX_RETRIES", "3"))
+CHAT_VECTOR_RETRY_BACKOFF = float(os.getenv("CHAT_VECTOR_RETRY_BACKOFF", "0.5"))
+
+# Cascading deletes of users' data and documents run as background jobs
+DELETION_WORKER_ENABLED = os.getenv("DELETION_WORKER_ENABLED", "true").lower() == "true"
+DELETION_BATCH_SIZE = int(os.getenv("DELETION_BATCH_SIZE", "500"))
+DELETION_POLL_INTERVAL = float(os.getenv("DELETION_POLL_INTERVAL", "5"))
+DELETION_LEASE_SECONDS = float(os.getenv("DELETION_LEASE_SECONDS", "300"))
+DELETION_MAX_ATTEMPTS = int(os.getenv("DELETION_MAX_ATTEMPTS", "5"))
+DELETION_RETRY_BACKOFF = float(os.getenv("DELETION_RETRY_BACKOFF", "30"))
+
+# Deleted chat sessions are moved to cold collections after a grace period
+CHAT_ARCHIVE_ENABLED = os.getenv("CHAT_ARCHIVE_ENABLED", "true").lower() == "true"
+CHAT_ARCHIVE_GRACE_DAYS = float(os.getenv("CHAT_ARCHIVE_GRACE_DAYS", "7"))
+CHAT_ARCHIVE_INTERVAL = float(os.getenv("CHAT_ARCHIVE_INTERVAL", "3600"))
+CHAT_ARCHIVE_BATCH_SIZE = int(os.getenv("CHAT_ARCHIVE_BATCH_SIZE", "200"))
+
+# Conversation memory for follow-up questions
+CONVERSATION_MEMORY_TOKENS = int(os.getenv("CONVERSATION_MEMORY_TOKENS", "400"))
+CONVERSATION_RECENT_MESSAGES = int(os.getenv("CONVERSATION_RECENT_MESSAGES", "6"))
+CONVERSATION_SUMMARY_BATCH = int(os.getenv("CONVERSATION_SUMMARY_BATCH", "6"))
+
+# Request deadlines: the default (and maximum) time budget for one chat request, in seconds.
+# Keep it below the load balancer's 60s request timeout; clients may ask for less with X-Request-Timeout.
+REQUEST_DEADLINE_SECONDS = float(os.getenv("REQUEST_DEADLINE_SECONDS", "55"))
+# Don't start an LLM attempt (or retry) with less than this much of the deadline left
+LLM_MIN_ATTEMPT_SECONDS = float(os.getenv("LLM_MIN_ATTEMPT_SECONDS", "2"))
+# Upper bound for a single vector index query
+VECTOR_QUERY_TIMEOUT = float(os.getenv("VECTOR_QUERY_TIMEOUT", "10"))
+
+# Chat messages are stored in bucket documents of at most this many messages per session
+MESSAGE_BUCKET_SIZE = int(os.getenv("MESSAGE_BUCKET_SIZE", "100"))
+
+# /chat/history paging: messages per page by default and at most
+CHAT_HISTORY_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_PAGE_SIZE", "50"))
+CHAT_HISTORY_MAX_PAGE_SIZE = int(os.getenv("CHAT_HISTORY_MAX_PAGE_SIZE", "200"))
+
+# /chat/all-history session listing: sessions per page by default and at most
+CHAT_SESSIONS_PAGE_SIZE = int(os.getenv("CHAT_SESSIONS_PAGE_SIZE", "20"))
+CHAT_SESSIONS_MAX_PAGE_SIZE = int(os.getenv("CHAT_SESSIONS_MAX_PAGE_SIZE", "100"))
+
+# Production server (gunicorn.conf.py): the app and embedding model load once in a master
+# process that forks WEB_WORKERS uvicorn workers. Async routes (route/chat_async.py) run on
+# each worker's event loop; Flask routes run on WEB_THREADS threads per worker.
+# Torch threads per worker default to the cores split between the workers.
+WEB_BIND = os.getenv("WEB_BIND", "0.0.0.0:5055")
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(os.cpu_count() or 1)))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "8"))
+WEB_TIMEOUT = int(os.getenv("WEB_TIMEOUT", "120"))
+WORKER_TORCH_THREADS = int(os.getenv("WORKER_TORCH_THREADS", str(max(1, (os.cpu_count() or 1) // WEB_WORKERS))))
+# Set by gunicorn.conf.py: background jobs start in each forked worker rather than in the master
+PREFORK_SERVER = os.getenv("PREFORK_SERVER", "false").lower() == "true"
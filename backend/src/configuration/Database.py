@@ -1,16 +1,82 @@
+import threading
 from pymongo import MongoClient
 from config import MONGO_URI
 
-client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+_lock = threading.Lock()
+client = None
+_database = None
+_collections = {}
 
-db = client.get_default_database()
 
-users_collection = db.users
-chat_sessions_collection = db.chat_sessions
-documents_collection = db.documents
-document_chunks_collection = db.document_chunks
-messages_collection = db.messages
-api_config_collection = db.api_config
+def reconnect():
+    """
+    Open a new client and point `db` and the collection handles below at it.
+    A forked worker calls this first thing: a MongoClient's pools and monitor
+    threads must not be shared with the parent. The parent's client is only
+    dropped, since closing it would end the parent's sessions on shared sockets.
+    """
+    global client, _database
+    with _lock:
+        client = MongoClient(MONGO_URI, serverSelectionTimeoutMS=5000)
+        _database = client.get_default_database()
+        _collections.clear()
+
+
+def _collection(name: str):
+    collection = _collections.get(name)
+    if collection is None:
+        with _lock:
+            collection = _collections.setdefault(name, _database[name])
+    return collection
+
+
+class _DatabaseHandle:
+    """
+    The default database of the current client.
+    """
+
+    def __getattr__(self, attr):
+        return getattr(_database, attr)
+
+    def __getitem__(self, name):
+        return _database[name]
+
+    def __repr__(self):
+        return f"<DatabaseHandle {_database!r}>"
+
+
+class _CollectionHandle:
+    """
+    A collection of the current client; modules import these once at import
+    time, so they must survive reconnect().
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+
+    def __getattr__(self, attr):
+        return getattr(_collection(self._name), attr)
+
+    def __repr__(self):
+        return f"<CollectionHandle {self._name}>"
+
+
+reconnect()
+
+db = _DatabaseHandle()
+
+users_collection = _CollectionHandle("users")
+chat_sessions_collection = _CollectionHandle("chat_sessions")
+documents_collection = _CollectionHandle("documents")
+document_chunks_collection = _CollectionHandle("document_chunks")
+messages_collection = _CollectionHandle("messages")
+api_config_collection = _CollectionHandle("api_config")
+llm_usage_collection = _CollectionHandle("llm_usage")
+llm_usage_rollups_collection = _CollectionHandle("llm_usage_rollups")
+usage_rollups_collection = _CollectionHandle("usage_rollups")
+deletion_jobs_collection = _CollectionHandle("deletion_jobs")
+chat_sessions_archive_collection = _CollectionHandle("chat_sessions_archive")
+messages_archive_collection = _CollectionHandle("messages_archive")
 
 def connect_to_database():
     """
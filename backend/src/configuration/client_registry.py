@@ -0,0 +1,203 @@
+"""
+Config-versioned registry of provider clients built from api_config.
+
+Each client is registered with a builder and the api_config keys it depends on.
+When the configuration version changes (an admin edit, or a snapshot reload
+that found new values), clients whose keys changed are rebuilt and swapped in
+atomically. The replaced client is closed once the calls still running on it
+have finished. Clients not built from api_config (the embedding model, HTTP
+pools) are not managed here and survive a swap untouched.
+
+Callers hold a ClientHandle: every method call runs on the client that is
+current when the call starts, leased for the duration of the call.
+"""
+import threading
+from contextlib import contextmanager
+from typing import Any, Callable, Iterable
+from utils.api_config_helper import api_config_snapshot, get_config_version
+
+
+class _Generation:
+    def __init__(self, client, fingerprint):
+        self.client = client
+        self.fingerprint = fingerprint
+        self.in_flight = 0
+        self.retired = False
+
+
+class ClientHandle:
+    """
+    Stable reference to a registry client.
+    """
+
+    def __init__(self, registry: "ClientRegistry", name: str):
+        self._registry = registry
+        self._name = name
+
+    def __getattr__(self, attr):
+        value = getattr(self._registry.current(self._name), attr)
+        if not callable(value):
+            return value
+
+        def call(*args, **kwargs):
+            with self._registry.lease(self._name) as client:
+                return getattr(client, attr)(*args, **kwargs)
+
+        return call
+
+    def __repr__(self):
+        return f"<ClientHandle {self._name}>"
+
+
+class ClientRegistry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._specs = {}
+        self._build_locks = {}
+        self._current = {}
+        self._checked_version = {}
+        self._pinned = set()
+
+        self.swaps = 0
+        self.build_errors = 0
+        self.closed = 0
+
+    def register(self, name: str, build: Callable[[], Any], config_keys: Iterable[str], close: Callable[[Any], None] = None):
+        """
+        Register a client built by `build()` from the api_config `config_keys`.
+        `close(client)` releases a replaced client (default: its close() method, if any).
+        """
+        with self._lock:
+            self._specs[name] = (build, tuple(config_keys), close)
+            self._build_locks.setdefault(name, threading.Lock())
+
+    def pin(self, name: str, client):
+        """
+        Use `client` for `name` regardless of api_config (e.g. a local stand-in).
+        """
+        with self._lock:
+            self._build_locks.setdefault(name, threading.Lock())
+            previous = self._current.get(name)
+            self._current[name] = _Generation(client, None)
+            self._pinned.add(name)
+        if previous is not None:
+            self._retire(name, previous)
+
+    def handle(self, name: str) -> ClientHandle:
+        return ClientHandle(self, name)
+
+    def current(self, name: str):
+        """
+        The current client, rebuilt first if its configuration changed.
+        Raises if there is no client yet and it can't be built.
+        """
+        return self._generation(name).client
+
+    def _fingerprint(self, config_keys: tuple) -> tuple:
+        values = api_config_snapshot.values()
+        return tuple(values.get(key) for key in config_keys)
+
+    def _generation(self, name: str) -> _Generation:
+        version = get_config_version()
+        generation = self._current.get(name)
+        if generation is not None and (name in self._pinned or self._checked_version.get(name) == version):
+            return generation
+
+        with self._build_locks[name]:
+            generation = self._current.get(name)
+            if generation is not None and (name in self._pinned or self._checked_version.get(name) == version):
+                return generation
+
+            build, config_keys, _ = self._specs[name]
+            fingerprint = self._fingerprint(config_keys)
+            if generation is None or fingerprint != generation.fingerprint:
+                try:
+                    replacement = _Generation(build(), fingerprint)
+                except Exception as e:
+                    if generation is None:
+                        raise
+                    # A bad new value shouldn't take down a working client
+                    self.build_errors += 1
+                    print(f"❌ Failed to rebuild the {name} client, keeping the current one: {e}")
+                    self._checked_version[name] = version
+                    return generation
+
+                with self._lock:
+                    self._current[name] = replacement
+                if generation is not None:
+                    self.swaps += 1
+                    print(f"🔄 Swapped in a new {name} client (config version {version})")
+                    self._retire(name, generation)
+                generation = replacement
+
+            self._checked_version[name] = version
+            return generation
+
+    @contextmanager
+    def lease(self, name: str):
+        """
+        The current client, kept open until the block exits even if it is replaced meanwhile.
+        """
+        while True:
+            generation = self._generation(name)
+            with self._lock:
+                if not generation.retired:
+                    generation.in_flight += 1
+                    break
+        try:
+            yield generation.client
+        finally:
+            with self._lock:
+                generation.in_flight -= 1
+                drained = generation.retired and generation.in_flight == 0
+            if drained:
+                self._close(name, generation)
+
+    def _retire(self, name: str, generation: _Generation):
+        with self._lock:
+            generation.retired = True
+            drained = generation.in_flight == 0
+        if drained:
+            self._close(name, generation)
+
+    def _close(self, name: str, generation: _Generation):
+        spec = self._specs.get(name)
+        close = spec[2] if spec and spec[2] else None
+        if close is None:
+            method = getattr(generation.client, "close", None)
+            if not callable(method):
+                return
+            close = lambda client: method()
+        try:
+            close(generation.client)
+            self.closed += 1
+        except Exception as e:
+            print(f"⚠️ Failed to close the replaced {name} client: {e}")
+
+    def reset_after_fork(self):
+        """
+        Forget the clients built in the parent so a forked worker builds its
+        own on first use. They aren't closed: their connections are shared
+        with the parent. Pinned clients are kept.
+        """
+        self._lock = threading.Lock()
+        self._build_locks = {name: threading.Lock() for name in self._specs.keys() | self._pinned}
+        self._current = {name: generation for name, generation in self._current.items() if name in self._pinned}
+        self._checked_version = {}
+
+    def stats(self) -> dict:
+        with self._lock:
+            clients = {
+                name: {"in_flight": generation.in_flight, "pinned": name in self._pinned}
+                for name, generation in self._current.items()
+            }
+        return {
+            "config_version": api_config_snapshot.version,
+            "clients": clients,
+            "swaps": self.swaps,
+            "build_errors": self.build_errors,
+            "closed": self.closed,
+        }
+
+
+provider_clients = ClientRegistry()
@@ -0,0 +1,56 @@
+"""
+A per-process background asyncio event loop.
+Async clients (e.g. the LLM client) live on this loop so synchronous WSGI code
+and coroutines running on other loops can share one set of connection pools.
+"""
+import asyncio
+import concurrent.futures
+import os
+import threading
+
+_lock = threading.Lock()
+_loop: asyncio.AbstractEventLoop | None = None
+_loop_pid: int | None = None
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """
+    Return the background loop, starting it on first use.
+    A forked child gets a fresh loop, since threads don't survive fork().
+    """
+    global _loop, _loop_pid
+    if _loop is not None and _loop_pid == os.getpid():
+        return _loop
+
+    with _lock:
+        if _loop is None or _loop_pid != os.getpid():
+            loop = asyncio.new_event_loop()
+            thread = threading.Thread(target=loop.run_forever, name="async-io-loop", daemon=True)
+            thread.start()
+            _loop = loop
+            _loop_pid = os.getpid()
+    return _loop
+
+
+def submit(coro) -> concurrent.futures.Future:
+    """
+    Schedule a coroutine on the background loop from any thread.
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run_sync(coro):
+    """
+    Run a coroutine on the background loop and block for its result.
+    Must not be called from the background loop itself.
+    """
+    return submit(coro).result()
+
+
+async def run_on_loop(coro):
+    """
+    Await a coroutine on the background loop from any other running loop.
+    """
+    if asyncio.get_running_loop() is get_loop():
+        return await coro
+    return await asyncio.wrap_future(submit(coro))
@@ -0,0 +1,199 @@
+import asyncio
+import httpx
+from typing import AsyncIterator, Dict, List
+from configuration.gemini_client import baseGeminiClient
+from configuration.llm_limiter import LLMLimiter
+from utils.deadline import Deadline, DeadlineExceeded
+from config import LLM_HTTP_POOL_SIZE, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT, LLM_MIN_ATTEMPT_SECONDS
+
+
+class asyncGeminiClient(baseGeminiClient):
+    """
+    asyncio Gemini client with the same interface as geminiClient.
+    The underlying httpx pool is bound to the event loop it is first used on,
+    so all calls must come from one loop (see configuration.event_loop).
+    """
+
+    def __init__(
+        self,
+        pool_size: int = LLM_HTTP_POOL_SIZE,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT,
+        limiter: LLMLimiter = None
+    ):
+        super().__init__()
+        self.limiter = limiter or LLMLimiter()
+        self.limits = httpx.Limits(max_connections=pool_size, max_keepalive_connections=pool_size)
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self._http = None
+        self._stats = {}
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None:
+            self._http = httpx.AsyncClient(limits=self.limits, timeout=self.timeout, headers=self.headers)
+        return self._http
+
+    async def aclose(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    def reset_after_fork(self):
+        """
+        Drop the pool inherited over fork() without closing it: its sockets
+        and event loop belong to the parent. A new one opens on first use.
+        """
+        self._http = None
+        self._stats = {}
+
+    def _host_stats(self, url: str) -> Dict:
+        host = httpx.URL(url).host
+        return self._stats.setdefault(host, {"host": host, "connections_opened": 0, "requests": 0})
+
+    def _request_extensions(self, url: str) -> Dict:
+        """
+        Count requests per host and, through httpcore's trace hook, the ones that
+        had to open a new connection; the rest were served on a pooled connection.
+        """
+        stats = self._host_stats(url)
+        stats["requests"] += 1
+
+        async def trace(event_name, info):
+            if event_name == "connection.connect_tcp.complete":
+                stats["connections_opened"] += 1
+
+        return {"trace": trace}
+
+    def _request_timeout(self, deadline: Deadline | None) -> httpx.Timeout:
+        """
+        Per-request timeouts, shrunk to what's left of the deadline.
+        """
+        if deadline is None:
+            return self.timeout
+        deadline.check("the LLM request")
+        remaining = deadline.remaining()
+        return httpx.Timeout(min(self.timeout.read, remaining), connect=min(self.timeout.connect, remaining))
+
+    def _queue_wait(self, deadline: Deadline | None) -> float | None:
+        return deadline.remaining() if deadline is not None else None
+
+    def _retry_fits(self, deadline: Deadline | None, wait_time: float) -> bool:
+        """
+        A retry is only worth it if the backoff plus a minimal attempt fit in the deadline.
+        """
+        if deadline is None or deadline.can_fit(wait_time + LLM_MIN_ATTEMPT_SECONDS):
+            return True
+        print(f"⏱️ Skipping LLM retry: {deadline.remaining():.2f}s left of the request deadline")
+        return False
+
+    def pool_stats(self) -> list[dict]:
+        """
+        Connection reuse per host for this client.
+        """
+        return [
+            {**s, "reused": max(0, s["requests"] - s["connections_opened"])}
+            for s in self._stats.values()
+        ]
+
+    async def chat_completion(
+        self,
+        messages: List[Dict],
+        model: str = None,
+        temperature: float = 0.1,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        max_retries: int = 3,
+        deadline: Deadline = None
+    ):
+        payload = self._build_payload(messages, temperature, max_tokens, top_p)
+        url = self._request_url()
+
+        last_exception = None
+
+        for attempt in range(max_retries):
+            try:
+                timeout = self._request_timeout(deadline)
+                async with self.limiter.slot(self._queue_wait(deadline)):
+                    response = await self.http.post(url, json=payload, timeout=timeout, extensions=self._request_extensions(url))
+
+                retryable = response.status_code == 429 or response.status_code >= 500
+                if retryable and attempt < max_retries - 1:
+                    wait_time = self.limiter.backoff_delay(attempt, self._retry_after(response))
+                    if self._retry_fits(deadline, wait_time) and self.limiter.try_retry():
+                        print(f"⚠️ Gemini returned {response.status_code}. Retrying in {wait_time:.2f} seconds... (Attempt {attempt + 1}/{max_retries})")
+                        await asyncio.sleep(wait_time)
+                        continue
+
+                response.raise_for_status()
+                completion = self._completion_from_response(response.json())
+                completion["retries"] = attempt
+                return completion
+
+            except httpx.HTTPStatusError as e:
+                print(f"❌ Gemini API error ({e.response.status_code}): {e}")
+                raise
+            except httpx.TransportError as e:
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded(f"Request deadline of {deadline.budget:.1f}s exceeded during the LLM request") from e
+                last_exception = e
+                if attempt < max_retries - 1:
+                    wait_time = self.limiter.backoff_delay(attempt)
+                    if self._retry_fits(deadline, wait_time) and self.limiter.try_retry():
+                        print(f"⚠️ Request error. Retrying in {wait_time:.2f} seconds... (Attempt {attempt + 1}/{max_retries})")
+                        await asyncio.sleep(wait_time)
+                        continue
+                print(f"❌ Gemini API request error after {attempt + 1} attempts: {e}")
+                raise
+
+        if last_exception:
+            raise last_exception
+        raise Exception(f"Failed to get response from Gemini API after {max_retries} attempts")
+
+    def _retry_after(self, response: httpx.Response) -> float | None:
+        retry_after = response.headers.get("Retry-After")
+        if response.status_code == 429 and retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return None
+
+    async def chat_completion_stream(
+        self,
+        messages: List[Dict],
+        model: str = None,
+        temperature: float = 0.1,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        usage: Dict = None,
+        deadline: Deadline = None
+    ) -> AsyncIterator[str]:
+        """
+        Stream a completion as text fragments, as Gemini generates them.
+        If a `usage` dict is passed, it is updated with the token counts
+        Gemini reports on the stream. With a `deadline`, the stream is
+        abandoned once it expires.
+        """
+        payload = self._build_payload(messages, temperature, max_tokens, top_p)
+        url = self._stream_url()
+        timeout = self._request_timeout(deadline)
+
+        async with self.limiter.slot(self._queue_wait(deadline)):
+            try:
+                async with self.http.stream("POST", url, json=payload, timeout=timeout, extensions=self._request_extensions(url)) as response:
+                    if response.status_code >= 400:
+                        await response.aread()
+                        response.raise_for_status()
+
+                    async for line in response.aiter_lines():
+                        data = self._stream_event(line)
+                        if not data:
+                            continue
+                        if usage is not None and data.get("usageMetadata"):
+                            usage.update(self._usage_from_response(data))
+                        for fragment in self._event_fragments(data):
+                            yield fragment
+                        if deadline is not None:
+                            deadline.check("the end of the LLM stream")
+            except httpx.TransportError as e:
+                if deadline is not None and deadline.expired():
+                    raise DeadlineExceeded(f"Request deadline of {deadline.budget:.1f}s exceeded during the LLM stream") from e
+                raise
@@ -1,30 +1,72 @@
+import json
 import requests
 import time
-from typing import List, Dict
+from typing import Dict, Iterator, List, NamedTuple
 from utils.api_config_helper import (
-    get_gemini_api_url, get_gemini_api_key
+    get_gemini_api_url, get_gemini_api_key, get_gemini_stream_api_url
 )
+from configuration.client_registry import provider_clients
+from configuration.http_session import build_http_session, session_pool_stats
+from config import LLM_HTTP_POOL_SIZE, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT
 
 
-class geminiClient:
+class GeminiCredentials(NamedTuple):
+    api_key: str
+    api_url: str
+    stream_api_url: str | None
+
+
+def _load_gemini_credentials() -> GeminiCredentials:
+    api_url=get_gemini_api_url()
+    api_key=get_gemini_api_key()
+    if not api_key:
+        raise ValueError("GEMINI_API_KEY is required")
+    if not api_url:
+        raise ValueError("GEMINI_API_URL is required")
+    return GeminiCredentials(api_key, api_url, get_gemini_stream_api_url())
+
+
+# Reloaded when the key or URLs change in api_config; the HTTP pools are kept
+provider_clients.register(
+    "gemini", _load_gemini_credentials, ("GEMINI_API_KEY", "GEMINI_API_URL", "GEMINI_STREAM_API_URL")
+)
+
+
+class baseGeminiClient:
     """
-    Gemini-backed client that preserves Grok/OpenAI-style interface
+    Shared Gemini configuration and request/response shaping for the sync and async clients
     """
 
     def __init__(self):
-        api_url=get_gemini_api_url()
-        api_key=get_gemini_api_key()
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY is required")
-        if not api_url:
-            raise ValueError("GEMINI_API_URL is required")
-
-        self.api_key = api_key
-        self.api_url = api_url
+        # Fails fast when Gemini isn't configured
+        provider_clients.current("gemini")
         self.headers = {
             "Content-Type": "application/json"
         }
 
+    @property
+    def credentials(self) -> GeminiCredentials:
+        """
+        The current credentials. Read them once per request so the key and URL always match.
+        """
+        return provider_clients.current("gemini")
+
+    @property
+    def api_key(self) -> str:
+        return self.credentials.api_key
+
+    @property
+    def api_url(self) -> str:
+        return self.credentials.api_url
+
+    @property
+    def stream_api_url(self) -> str | None:
+        return self.credentials.stream_api_url
+
+    def _request_url(self) -> str:
+        credentials = self.credentials
+        return f"{credentials.api_url}?key={credentials.api_key}"
+
     def _messages_to_prompt(self, messages: List[Dict]) -> str:
         """
         Convert OpenAI-style messages to a single Gemini prompt
@@ -36,18 +78,9 @@ class geminiClient:
             prompt_parts.append(f"{role.upper()}:\n{content}")
         return "\n\n".join(prompt_parts)
 
-    def chat_completion(
-        self,
-        messages: List[Dict],
-        model: str = None,
-        temperature: float = 0.1,
-        max_tokens: int = 1024,
-        top_p: float = 0.9,
-        max_retries: int = 3
-    ):
+    def _build_payload(self, messages: List[Dict], temperature: float, max_tokens: int, top_p: float) -> Dict:
         prompt = self._messages_to_prompt(messages)
-
-        payload = {
+        return {
             "contents": [
                 {
                     "parts": [{"text": prompt}]
@@ -60,15 +93,114 @@ class geminiClient:
             }
         }
 
+    def _stream_url(self) -> str:
+        """
+        Gemini streams from `:streamGenerateContent?alt=sse`. An explicit
+        GEMINI_STREAM_API_URL config wins, otherwise it's derived from GEMINI_API_URL.
+        """
+        credentials = self.credentials
+        url = credentials.stream_api_url or credentials.api_url.replace(":generateContent", ":streamGenerateContent")
+        return f"{url}?alt=sse&key={credentials.api_key}"
+
+    def _completion_from_response(self, data: Dict) -> Dict:
+        """
+        Convert a generateContent response to the OpenAI-style completion shape
+        """
+        if "candidates" not in data or not data["candidates"]:
+            raise ValueError("No candidates in Gemini API response")
+
+        text = data["candidates"][0]["content"]["parts"][0]["text"]
+
+        return {
+            "choices": [
+                {
+                    "message": {
+                        "role": "assistant",
+                        "content": text.strip()
+                    }
+                }
+            ],
+            "usage": self._usage_from_response(data)
+        }
+
+    def _usage_from_response(self, data: Dict) -> Dict:
+        """
+        Map Gemini `usageMetadata` to OpenAI-style usage counts (0 when absent)
+        """
+        usage = data.get("usageMetadata") or {}
+        prompt_tokens = usage.get("promptTokenCount", 0)
+        completion_tokens = usage.get("candidatesTokenCount", 0)
+        return {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": usage.get("totalTokenCount", prompt_tokens + completion_tokens)
+        }
+
+    def _stream_event(self, line: str) -> Dict | None:
+        """
+        Parse one `data:` line of a streamGenerateContent SSE response
+        """
+        if not line or not line.startswith("data:"):
+            return None
+        return json.loads(line[len("data:"):].strip())
+
+    def _event_fragments(self, data: Dict) -> Iterator[str]:
+        for candidate in data.get("candidates") or []:
+            for part in (candidate.get("content") or {}).get("parts") or []:
+                text = part.get("text")
+                if text:
+                    yield text
+
+
+class geminiClient(baseGeminiClient):
+    """
+    Gemini-backed client that preserves Grok/OpenAI-style interface
+    """
+
+    def __init__(
+        self,
+        pool_size: int = LLM_HTTP_POOL_SIZE,
+        connect_timeout: float = LLM_CONNECT_TIMEOUT,
+        read_timeout: float = LLM_READ_TIMEOUT
+    ):
+        super().__init__()
+        # One pooled keep-alive session per client; retries reuse its connections
+        self.pool_size = pool_size
+        self.session = build_http_session(pool_size)
+        self.timeout = (connect_timeout, read_timeout)
+
+    def pool_stats(self) -> list[dict]:
+        """
+        Connection pool statistics for the Gemini session (connection reuse per host).
+        """
+        return session_pool_stats(self.session)
+
+    def reset_after_fork(self):
+        """
+        Give a forked worker its own connection pool; the inherited sockets belong to the parent.
+        """
+        self.session = build_http_session(self.pool_size)
+
+    def chat_completion(
+        self,
+        messages: List[Dict],
+        model: str = None,
+        temperature: float = 0.1,
+        max_tokens: int = 1024,
+        top_p: float = 0.9,
+        max_retries: int = 3
+    ):
+        payload = self._build_payload(messages, temperature, max_tokens, top_p)
+
         last_exception = None
         
         for attempt in range(max_retries):
             try:
-                response = requests.post(
-                    f"{self.api_url}?key={self.api_key}",
+                response = self.session.post(
+                    self._request_url(),
                     headers=self.headers,
                     json=payload,
-                    timeout=30
+                    timeout=self.timeout
                 )
                 
                 if response.status_code == 429:
@@ -89,23 +221,7 @@ class geminiClient:
                 
                 response.raise_for_status()
 
-                data = response.json()
-                
-                if "candidates" not in data or not data["candidates"]:
-                    raise ValueError("No candidates in Gemini API response")
-                
-                text = data["candidates"][0]["content"]["parts"][0]["text"]
-
-                return {
-                    "choices": [
-                        {
-                            "message": {
-                                "role": "assistant",
-                                "content": text.strip()
-                            }
-                        }
-                    ]
-                }
+                return self._completion_from_response(response.json())
 
             except requests.exceptions.HTTPError as e:
                 if e.response and e.response.status_code == 429:
@@ -142,12 +258,6 @@ class geminiClient:
         else:
             raise Exception(f"Failed to get response from Gemini API after {max_retries} attempts")
 
-    def chat_completion_stream(self, *args, **kwargs):
-        """
-        Streaming not supported in this client
-        """
-        raise NotImplementedError("Gemini streaming not implemented")
-
     def check_health(self) -> bool:
         try:
             self.chat_completion(
@@ -0,0 +1,51 @@
+import requests
+from requests.adapters import HTTPAdapter
+from config import LLM_HTTP_POOL_SIZE
+
+
+def build_http_session(pool_size: int = LLM_HTTP_POOL_SIZE) -> requests.Session:
+    """
+    Create a pooled keep-alive HTTP session.
+    Connections are reused across calls and retries instead of paying a
+    fresh TCP/TLS handshake per request. Retries are left to the caller.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=pool_size,
+        pool_maxsize=pool_size,
+        max_retries=0,
+        pool_block=False
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update({"Connection": "keep-alive"})
+    return session
+
+
+def session_pool_stats(session: requests.Session) -> list[dict]:
+    """
+    Report per-host connection reuse for a session.
+    `reused` is the number of requests served on an already-open connection.
+    """
+    stats = []
+    seen = set()
+    for adapter in session.adapters.values():
+        if id(adapter) in seen:
+            continue
+        seen.add(id(adapter))
+
+        pools = adapter.poolmanager.pools
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            stats.append({
+                "scheme": pool.scheme,
+                "host": pool.host,
+                "port": pool.port,
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "reused": max(0, pool.num_requests - pool.num_connections),
+                "idle_connections": pool.pool.qsize() if pool.pool else 0,
+            })
+    return stats
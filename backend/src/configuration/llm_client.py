@@ -1,19 +1,123 @@
-from configuration.gemini_client import geminiClient
+import asyncio
+import time
+from configuration import event_loop
+from configuration.gemini_async_client import asyncGeminiClient
+from configuration.llm_limiter import LLMLimiter
+from configuration.llm_hedging import Hedger
+from lib.llmUsage import usage_meter
+from utils.api_config_helper import get_llm_limits, get_llm_hedging
+
+
+async def _anext(agen):
+    return await agen.__anext__()
+
+
+def _prompt_chars(args, kwargs) -> int:
+    messages = kwargs.get("messages") or (args[0] if args else [])
+    return sum(len(m.get("content") or "") for m in messages)
+
 
 class LLMClient:
-    def __init__(self, provider="gemini"):
+    """
+    Provider-agnostic LLM client.
+    The provider client is asyncio-based and lives on the process's background
+    event loop; the synchronous methods are shims over it for WSGI callers.
+
+    Every call accepts optional `user_id` and `feature` keywords, which are used
+    only for usage metering and are not sent to the provider, and an optional
+    `deadline` (utils.deadline.Deadline) that bounds queueing, timeouts and retries.
+    """
+
+    def __init__(self, provider="gemini", usage_recorder=None):
         self.provider = provider
+        self.usage_recorder = usage_recorder
+
+        # Process-wide admission control shared by every call through this client
+        self.limiter = LLMLimiter(**get_llm_limits())
+        # Opt-in hedging of slow non-streaming calls; hedges also go through the limiter
+        self.hedger = Hedger(**get_llm_hedging())
 
         if provider == "gemini":
-            self.client = geminiClient()
+            self.client = asyncGeminiClient(limiter=self.limiter)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
-    
+
+    def _record_usage(self, user_id, feature, prompt_chars, started, usage=None, retries=0, success=True):
+        if not self.usage_recorder:
+            return
+        usage = usage or {}
+        self.usage_recorder(
+            userId=user_id,
+            feature=feature,
+            provider=self.provider,
+            prompt_tokens=usage.get("prompt_tokens", 0),
+            output_tokens=usage.get("completion_tokens", 0),
+            total_tokens=usage.get("total_tokens", 0),
+            prompt_chars=prompt_chars,
+            latency_ms=(time.monotonic() - started) * 1000,
+            retries=retries,
+            success=success,
+        )
+
+    async def _metered_completion(self, *args, user_id=None, feature=None, **kwargs):
+        prompt_chars = _prompt_chars(args, kwargs)
+
+        # Metered per provider call, so a hedge's second request is counted too
+        async def metered_call():
+            started = time.monotonic()
+            try:
+                response = await self.client.chat_completion(*args, **kwargs)
+            except (Exception, asyncio.CancelledError):
+                # Includes the losing call of a hedge, whose usage isn't known
+                self._record_usage(user_id, feature, prompt_chars, started, success=False)
+                raise
+            self._record_usage(
+                user_id, feature, prompt_chars, started,
+                usage=response.get("usage"), retries=response.get("retries", 0)
+            )
+            return response
+
+        return await self.hedger.run(metered_call, deadline=kwargs.get("deadline"))
+
+    def _open_stream(self, args, kwargs):
+        user_id = kwargs.pop("user_id", None)
+        feature = kwargs.pop("feature", None)
+        usage = {}
+        agen = self.client.chat_completion_stream(*args, usage=usage, **kwargs)
+        meter = (user_id, feature, _prompt_chars(args, kwargs), time.monotonic())
+        return agen, usage, meter
+
+    async def achat_completion(self, *args, **kwargs):
+        return await event_loop.run_on_loop(self._metered_completion(*args, **kwargs))
+
     def chat_completion(self, *args, **kwargs):
-        return self.client.chat_completion(*args, **kwargs)
-    
+        return event_loop.run_sync(self._metered_completion(*args, **kwargs))
+
     def chat_completion_stream(self, *args, **kwargs):
-        return self.client.chat_completion_stream(*args, **kwargs)
+        agen, usage, meter = self._open_stream(args, kwargs)
+        success = False
+        try:
+            while True:
+                try:
+                    yield event_loop.run_sync(_anext(agen))
+                except StopAsyncIteration:
+                    success = True
+                    return
+        finally:
+            event_loop.run_sync(agen.aclose())
+            self._record_usage(*meter, usage=usage, success=success)
+
+    def pool_stats(self):
+        return self.client.pool_stats()
+
+    def reset_after_fork(self):
+        self.client.reset_after_fork()
+
+    def limiter_stats(self):
+        return self.limiter.stats()
+
+    def hedging_stats(self):
+        return self.hedger.stats()
 
 
-llm = LLMClient(provider="gemini")
+llm = LLMClient(provider="gemini", usage_recorder=usage_meter.record)
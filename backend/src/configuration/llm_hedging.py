@@ -0,0 +1,176 @@
+"""
+Hedged LLM requests.
+If a call hasn't completed within a percentile of recent latencies, an identical
+second call is issued; the first success wins and the other is cancelled.
+A hedge-rate cap bounds the extra quota spent on hedges, and no hedge is sent
+when the request deadline would expire before it could plausibly finish.
+"""
+import asyncio
+import bisect
+import time
+from collections import deque
+
+from utils.deadline import Deadline
+
+HISTOGRAM_BOUNDS_MS = [100, 250, 500, 1000, 2000, 4000, 8000, 16000, 32000]
+
+
+class LatencyHistogram:
+    """
+    Rolling window of the most recent successful call latencies.
+    """
+
+    def __init__(self, max_samples: int = 500):
+        self.samples = deque(maxlen=max_samples)
+
+    def record(self, seconds: float):
+        self.samples.append(seconds)
+
+    def percentile(self, pct: float) -> float | None:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+        return ordered[index]
+
+    def snapshot(self) -> dict:
+        buckets = [0] * (len(HISTOGRAM_BOUNDS_MS) + 1)
+        for seconds in self.samples:
+            buckets[bisect.bisect_left(HISTOGRAM_BOUNDS_MS, seconds * 1000)] += 1
+
+        def ms(value):
+            return round(value * 1000, 1) if value is not None else None
+
+        return {
+            "samples": len(self.samples),
+            "p50_ms": ms(self.percentile(50)),
+            "p90_ms": ms(self.percentile(90)),
+            "p95_ms": ms(self.percentile(95)),
+            "p99_ms": ms(self.percentile(99)),
+            "buckets": [
+                {"le_ms": bound, "count": count}
+                for bound, count in zip(HISTOGRAM_BOUNDS_MS + ["+Inf"], buckets)
+            ],
+        }
+
+
+class Hedger:
+    def __init__(
+        self,
+        enabled: bool = False,
+        percentile: float = 95,
+        min_delay: float = 2.0,
+        max_hedge_ratio: float = 0.05,
+        min_samples: int = 20,
+        window_seconds: float = 60.0
+    ):
+        self.enabled = enabled
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.window = window_seconds
+        self.histogram = LatencyHistogram()
+
+        self.recent_requests = deque()
+        self.recent_hedges = deque()
+        self.requests = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+        self.hedges_capped = 0
+        self.hedges_past_deadline = 0
+
+    def hedge_delay(self) -> float:
+        """
+        Delay before hedging: the configured latency percentile once enough
+        samples exist, never below min_delay.
+        """
+        if len(self.histogram.samples) < self.min_samples:
+            return self.min_delay
+        return max(self.min_delay, self.histogram.percentile(self.percentile))
+
+    def expected_latency(self) -> float:
+        """
+        Typical call latency (the median), or 0 until enough samples exist.
+        """
+        if len(self.histogram.samples) < self.min_samples:
+            return 0.0
+        return self.histogram.percentile(50)
+
+    def _trim(self, now: float):
+        for events in (self.recent_requests, self.recent_hedges):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def _may_hedge(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+        if len(self.recent_hedges) + 1 > self.max_hedge_ratio * len(self.recent_requests):
+            self.hedges_capped += 1
+            return False
+        self.recent_hedges.append(now)
+        return True
+
+    async def _timed(self, coro):
+        started = time.monotonic()
+        result = await coro
+        self.histogram.record(time.monotonic() - started)
+        return result
+
+    async def run(self, make_call, deadline: Deadline = None):
+        """
+        Run `make_call()` (a coroutine factory), hedging it if enabled and slow.
+        Each call is a separate provider request, so metering belongs inside
+        `make_call`: a hedge that loses is cancelled, not awaited.
+        With a `deadline`, a hedge that couldn't finish before it expires
+        (hedge delay plus the typical latency) is never sent.
+        """
+        now = time.monotonic()
+        self.requests += 1
+        self.recent_requests.append(now)
+        self._trim(now)
+
+        if not self.enabled:
+            return await self._timed(make_call())
+
+        delay = self.hedge_delay()
+        if deadline is not None and not deadline.can_fit(delay + self.expected_latency()):
+            self.hedges_past_deadline += 1
+            return await self._timed(make_call())
+
+        primary = asyncio.ensure_future(self._timed(make_call()))
+        done, _ = await asyncio.wait({primary}, timeout=delay)
+        if done or not self._may_hedge():
+            return await primary
+
+        self.hedged += 1
+        hedge = asyncio.ensure_future(self._timed(make_call()))
+        pending = {primary, hedge}
+        last_error = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            self.hedge_wins += 1
+                        return task.result()
+                    last_error = task.exception()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "percentile": self.percentile,
+            "hedge_delay_ms": round(self.hedge_delay() * 1000, 1),
+            "max_hedge_ratio": self.max_hedge_ratio,
+            "requests": self.requests,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedges_capped": self.hedges_capped,
+            "hedges_past_deadline": self.hedges_past_deadline,
+            "latency": self.histogram.snapshot(),
+        }
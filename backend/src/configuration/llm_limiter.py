@@ -0,0 +1,184 @@
+"""
+Client-side admission control for LLM calls.
+A token-bucket rate limiter and a max-in-flight semaphore sit in front of the
+provider, retries draw from a shared retry budget and back off with full jitter.
+All state lives on the background event loop, so limits are per process.
+"""
+import asyncio
+import random
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+
+class LLMRateLimitError(Exception):
+    """
+    Raised when a call can't be admitted within the allowed queue time,
+    or when a retry is refused because the retry budget is spent.
+    """
+
+
+class TokenBucket:
+    def __init__(self, rate_per_sec: float, burst: int):
+        self.rate = rate_per_sec
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, timeout: float):
+        """
+        Take one token, waiting up to `timeout` seconds for the bucket to refill.
+        A rate of 0 disables the bucket.
+        """
+        if self.rate <= 0:
+            return
+        deadline = time.monotonic() + timeout
+        while True:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            wait = (1 - self.tokens) / self.rate
+            if time.monotonic() + wait > deadline:
+                raise LLMRateLimitError("LLM rate limit reached; request not admitted in time")
+            await asyncio.sleep(wait)
+
+
+class RetryBudget:
+    """
+    Allow retries up to `ratio` of the requests seen in a sliding window,
+    plus a small floor so a quiet process can still retry.
+    """
+
+    def __init__(self, ratio: float, min_retries: int = 3, window_seconds: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window_seconds
+        self.requests = deque()
+        self.retries = deque()
+
+    def _trim(self, now: float):
+        for events in (self.requests, self.retries):
+            while events and now - events[0] > self.window:
+                events.popleft()
+
+    def record_request(self):
+        now = time.monotonic()
+        self._trim(now)
+        self.requests.append(now)
+
+    def try_retry(self) -> bool:
+        now = time.monotonic()
+        self._trim(now)
+        allowed = self.min_retries + self.ratio * len(self.requests)
+        if len(self.retries) >= allowed:
+            return False
+        self.retries.append(now)
+        return True
+
+
+class LLMLimiter:
+    def __init__(
+        self,
+        rate_per_sec: float = 0,
+        burst: int = 10,
+        max_in_flight: int = 16,
+        max_queue_wait: float = 5.0,
+        retry_budget_ratio: float = 0.1,
+        backoff_base: float = 0.5,
+        backoff_cap: float = 8.0
+    ):
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.max_in_flight = max_in_flight
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+        self.max_queue_wait = max_queue_wait
+        self.retry_budget = RetryBudget(retry_budget_ratio)
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+
+        self.in_flight = 0
+        self.queued = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.retries = 0
+        self.retries_refused = 0
+        self.queue_time_total = 0.0
+        self.queue_time_max = 0.0
+
+    @asynccontextmanager
+    async def slot(self, max_wait: float | None = None):
+        """
+        Admit one LLM request: wait (bounded by max_queue_wait, or `max_wait` if
+        shorter) for an in-flight slot and a rate token, then hold the slot for
+        the duration of the request.
+        """
+        queue_wait = self.max_queue_wait if max_wait is None else min(self.max_queue_wait, max_wait)
+        started = time.monotonic()
+        self.queued += 1
+        try:
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=queue_wait)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                raise LLMRateLimitError("Too many LLM requests in flight; request not admitted in time")
+            try:
+                remaining = queue_wait - (time.monotonic() - started)
+                await self.bucket.acquire(max(0.0, remaining))
+            except LLMRateLimitError:
+                self.semaphore.release()
+                self.rejected += 1
+                raise
+        finally:
+            self.queued -= 1
+
+        waited = time.monotonic() - started
+        self.admitted += 1
+        self.queue_time_total += waited
+        self.queue_time_max = max(self.queue_time_max, waited)
+        self.retry_budget.record_request()
+
+        self.in_flight += 1
+        try:
+            yield
+        finally:
+            self.in_flight -= 1
+            self.semaphore.release()
+
+    def backoff_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """
+        Full-jitter exponential backoff; a server-provided Retry-After is a floor.
+        """
+        delay = random.uniform(0, min(self.backoff_cap, self.backoff_base * (2 ** attempt)))
+        if retry_after:
+            delay = max(delay, retry_after)
+        return delay
+
+    def try_retry(self) -> bool:
+        """
+        Take a retry from the shared budget; False means fail now instead of retrying.
+        """
+        if self.retry_budget.try_retry():
+            self.retries += 1
+            return True
+        self.retries_refused += 1
+        return False
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_in_flight": self.max_in_flight,
+            "queued": self.queued,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "retries": self.retries,
+            "retries_refused": self.retries_refused,
+            "queue_time_avg_ms": round(1000 * self.queue_time_total / self.admitted, 2) if self.admitted else 0.0,
+            "queue_time_max_ms": round(1000 * self.queue_time_max, 2),
+            "rate_per_sec": self.bucket.rate,
+            "burst": self.bucket.capacity,
+        }
@@ -0,0 +1,26 @@
+"""
+Per-worker setup for the preforking server (gunicorn.conf.py).
+The master imports the app once, embedding model included, and forks workers
+that share those pages copy-on-write. Clients holding sockets or pools can't
+be shared across fork(), so each worker replaces them here before serving its
+first request. The asyncio loop and the background queues are already
+per-process: they check os.getpid() and start fresh in a child.
+"""
+import sys
+from configuration import Database
+from configuration.client_registry import provider_clients
+from configuration.gemini_client import gemini
+from configuration.llm_client import llm
+
+
+def after_fork(torch_threads: int):
+    Database.reconnect()
+    # Pinecone indexes and anything else built from api_config are rebuilt on first use
+    provider_clients.reset_after_fork()
+    gemini.reset_after_fork()
+    llm.reset_after_fork()
+
+    # Only when the real embedding model was loaded
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(torch_threads)
@@ -3,8 +3,7 @@ import datetime
 from functools import wraps
 from flask import request, jsonify
 from config import API_KEY_SECRET, JWT_EXP_DELTA_SECONDS, JWT_ALGORITHM
-from configuration.Database import users_collection
-from bson import ObjectId
+from utils.user_context import load_request_user_context, get_user_context
 
 JWT_SECRET = API_KEY_SECRET
 JWT_ALGORITHM = JWT_ALGORITHM
@@ -28,21 +27,33 @@ def decode_jwt(token):
     except jwt.InvalidTokenError:
         return None
 
+def authenticate(auth_header):
+    """
+    Returns (payload, None) for a valid `Bearer <token>` Authorization header,
+    or (None, error message).
+    """
+    if not auth_header:
+        return None, "Missing Authorization header"
+
+    try:
+        token = auth_header.split(" ")[1]
+    except IndexError:
+        return None, "Invalid Authorization header"
+
+    payload = decode_jwt(token)
+    if not payload:
+        return None, "Invalid or expired token"
+    return payload, None
+
 def jwt_required(f):
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        auth_header = request.headers.get("Authorization")
-        if not auth_header:
-            return jsonify({"success": False, "error": "Missing Authorization header"}), 401
-
-        try:
-            token = auth_header.split(" ")[1]
-        except IndexError:
-            return jsonify({"success": False, "error": "Invalid Authorization header"}), 401
+        payload, error = authenticate(request.headers.get("Authorization"))
+        if error:
+            return jsonify({"success": False, "error": error}), 401
 
-        payload = decode_jwt(token)
-        if not payload:
-            return jsonify({"success": False, "error": "Invalid or expired token"}), 401
+        # Status, role and limits for the rest of the request
+        load_request_user_context(payload["user_id"])
 
         # Pass user info to route
         kwargs["user_id"] = payload["user_id"]
@@ -68,11 +79,11 @@ def require_role(*allowed_roles):
             if not user_id:
                 return jsonify({"success": False, "error": "Missing user context"}), 401
 
-            user = users_collection.find_one({"_id": ObjectId(user_id)})
+            user = get_user_context(user_id)
             if not user or not user.get("is_active", True):
                 return jsonify({"success": False, "error": "User not found or inactive"}), 401
 
-            role = (user.get("role") or "user").lower()
+            role = user["role"]
             if role not in allowed:
                 return jsonify({"success": False, "error": "Forbidden"}), 403
 
@@ -0,0 +1,306 @@
+"""
+Local stand-in for the Gemini REST API, for exercising the chat path without real quota.
+
+Serves `POST .../<model>:generateContent` and `POST .../<model>:streamGenerateContent?alt=sse`
+with Gemini-shaped JSON, including `usageMetadata` token counts. Latency follows a
+configurable distribution, and a fraction of requests can fail with 429 or 5xx.
+`GET /stats` returns request and fault counters. Point the app at it through the
+api_config collection:
+
+    GEMINI_API_URL = http://127.0.0.1:8099/v1beta/models/fake:generateContent
+
+Run from backend/src:
+    python -m devtools.fake_gemini_server --port 8099 --latency lognormal:0.8:0.5 --rate-429 0.02
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse
+
+DEFAULT_ANSWER = (
+    "Key points:\n"
+    "- This answer was generated by the local fake Gemini server.\n"
+    "- It mirrors the response shape of the real generateContent API."
+)
+
+SERVER_ERRORS = [
+    (500, "INTERNAL", "An internal error has occurred. Please retry or report in https://developers.generativeai.google/guide/troubleshooting"),
+    (503, "UNAVAILABLE", "The model is overloaded. Please try again later."),
+]
+
+
+def _estimate_tokens(text: str) -> int:
+    # Same ~4 characters per token heuristic as lib.contextPacker
+    return max(1, len(text) // 4) if text else 0
+
+
+class LatencyModel:
+    """
+    Seconds-before-first-byte distribution, parsed from a spec:
+
+        0.5                   fixed 0.5s
+        fixed:0.5             same
+        uniform:0.2:1.5       uniform between 0.2s and 1.5s
+        normal:0.8:0.2        mean 0.8s, stddev 0.2s
+        lognormal:0.8:0.5     median 0.8s, log-space sigma 0.5 (long right tail)
+        exp:0.8               exponential with mean 0.8s
+    """
+
+    KINDS = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2, "exp": 1}
+
+    def __init__(self, spec: str = "0"):
+        parts = str(spec).split(":")
+        if len(parts) == 1:
+            parts = ["fixed", parts[0]]
+        kind, params = parts[0], parts[1:]
+        if kind not in self.KINDS or len(params) != self.KINDS[kind]:
+            raise ValueError(f"Invalid latency spec: {spec!r}")
+        self.spec = spec
+        self.kind = kind
+        self.params = [float(p) for p in params]
+        self._random = random.Random()
+
+    def sample(self) -> float:
+        r, p = self._random, self.params
+        if self.kind == "fixed":
+            value = p[0]
+        elif self.kind == "uniform":
+            value = r.uniform(p[0], p[1])
+        elif self.kind == "normal":
+            value = r.gauss(p[0], p[1])
+        elif self.kind == "lognormal":
+            value = p[0] * r.lognormvariate(0, p[1]) if p[0] > 0 else 0.0
+        else:
+            value = r.expovariate(1 / p[0]) if p[0] > 0 else 0.0
+        return max(0.0, value)
+
+
+def _candidate(text: str, finished: bool = True) -> dict:
+    candidate = {"content": {"role": "model", "parts": [{"text": text}]}, "index": 0}
+    if finished:
+        candidate["finishReason"] = "STOP"
+    return candidate
+
+
+def _usage_metadata(prompt_tokens: int, candidates_tokens: int) -> dict:
+    return {
+        "promptTokenCount": prompt_tokens,
+        "candidatesTokenCount": candidates_tokens,
+        "totalTokenCount": prompt_tokens + candidates_tokens,
+    }
+
+
+def _prompt_text(body: dict) -> str:
+    texts = []
+    for content in body.get("contents") or []:
+        for part in content.get("parts") or []:
+            texts.append(part.get("text") or "")
+    return "\n".join(texts)
+
+
+class FakeGeminiHandler(BaseHTTPRequestHandler):
+    server_version = "FakeGemini/1.0"
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _read_json(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        raw = self.rfile.read(length) if length else b""
+        try:
+            return json.loads(raw or b"{}")
+        except ValueError:
+            return {}
+
+    def _send_json(self, status: int, body: dict, headers: dict = None):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _send_error(self, status: int, status_name: str, message: str, headers: dict = None):
+        self._send_json(status, {"error": {"code": status, "message": message, "status": status_name}}, headers)
+
+    def do_GET(self):
+        if urlparse(self.path).path == "/stats":
+            self._send_json(200, self.server.stats())
+        else:
+            self._send_error(404, "NOT_FOUND", f"Unknown path {self.path}")
+
+    def do_POST(self):
+        try:
+            self._handle_post()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up (e.g. its deadline ran out) before the response was written
+            self.close_connection = True
+
+    def _handle_post(self):
+        path = urlparse(self.path).path
+        body = self._read_json()
+
+        if path.endswith(":streamGenerateContent"):
+            kind = "stream"
+        elif path.endswith(":generateContent"):
+            kind = "generate"
+        else:
+            self._send_error(404, "NOT_FOUND", f"Unknown path {path}")
+            return
+
+        self.server.count(kind)
+        time.sleep(self.server.latency.sample())
+        if self._inject_fault():
+            return
+
+        prompt_tokens = _estimate_tokens(_prompt_text(body))
+        if kind == "stream":
+            self._stream_answer(prompt_tokens)
+        else:
+            answer = self.server.answer
+            self._send_json(200, {
+                "candidates": [_candidate(answer)],
+                "usageMetadata": _usage_metadata(prompt_tokens, _estimate_tokens(answer)),
+            })
+
+    def _inject_fault(self) -> bool:
+        roll = self.server.random.random()
+        if roll < self.server.rate_429:
+            self.server.count("injected_429")
+            self._send_error(
+                429, "RESOURCE_EXHAUSTED", "Resource has been exhausted (e.g. check quota).",
+                headers={"Retry-After": str(self.server.retry_after)}
+            )
+            return True
+        if roll < self.server.rate_429 + self.server.rate_5xx:
+            status, status_name, message = self.server.random.choice(SERVER_ERRORS)
+            self.server.count("injected_5xx")
+            self._send_error(status, status_name, message)
+            return True
+        return False
+
+    def _stream_answer(self, prompt_tokens: int):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        # No Content-Length: the stream is delimited by closing the connection
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        words = self.server.answer.split(" ")
+        step = self.server.words_per_chunk
+        sent = ""
+        for i in range(0, len(words), step):
+            fragment = " ".join(words[i:i + step])
+            finished = i + step >= len(words)
+            if not finished:
+                fragment += " "
+            sent += fragment
+            # Like Gemini, every chunk carries the running usage counts
+            event = {
+                "candidates": [_candidate(fragment, finished=finished)],
+                "usageMetadata": _usage_metadata(prompt_tokens, _estimate_tokens(sent)),
+            }
+            self.wfile.write(f"data: {json.dumps(event)}\r\n\r\n".encode())
+            self.wfile.flush()
+            if not finished:
+                time.sleep(self.server.chunk_interval)
+
+
+class FakeGeminiServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(
+        self,
+        address=("127.0.0.1", 8099),
+        answer: str = DEFAULT_ANSWER,
+        latency: str | float = 0.0,
+        chunk_interval: float = 0.02,
+        words_per_chunk: int = 3,
+        rate_429: float = 0.0,
+        rate_5xx: float = 0.0,
+        retry_after: int = 1,
+        seed: int | None = None,
+        verbose: bool = False
+    ):
+        super().__init__(address, FakeGeminiHandler)
+        self.answer = answer
+        self.latency = latency if isinstance(latency, LatencyModel) else LatencyModel(latency)
+        self.chunk_interval = chunk_interval
+        self.words_per_chunk = max(1, words_per_chunk)
+        self.rate_429 = rate_429
+        self.rate_5xx = rate_5xx
+        self.retry_after = retry_after
+        self.random = random.Random(seed)
+        self.verbose = verbose
+
+        self._counters_lock = threading.Lock()
+        self._counters = {"generate": 0, "stream": 0, "injected_429": 0, "injected_5xx": 0}
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}/v1beta/models/fake"
+
+    def count(self, name: str):
+        with self._counters_lock:
+            self._counters[name] += 1
+
+    def stats(self) -> dict:
+        with self._counters_lock:
+            counters = dict(self._counters)
+        return {
+            **counters,
+            "latency": self.latency.spec,
+            "rate_429": self.rate_429,
+            "rate_5xx": self.rate_5xx,
+        }
+
+    def start_in_thread(self) -> threading.Thread:
+        thread = threading.Thread(target=self.serve_forever, name="fake-gemini", daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a local fake Gemini API server.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8099)
+    parser.add_argument("--latency", default="0", help="Time to first byte, e.g. 0.5, uniform:0.2:1.5, lognormal:0.8:0.5, exp:0.8")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="Seconds between streamed chunks")
+    parser.add_argument("--rate-429", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--rate-5xx", type=float, default=0.0, help="Fraction of requests answered with 500/503")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds sent with 429s")
+    parser.add_argument("--seed", type=int, default=None, help="Seed for fault injection")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    server = FakeGeminiServer(
+        (args.host, args.port),
+        latency=args.latency,
+        chunk_interval=args.chunk_interval,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed,
+        verbose=args.verbose
+    )
+    print(f"🧪 Fake Gemini server listening on {server.base_url}:generateContent")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
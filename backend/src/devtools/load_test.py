@@ -0,0 +1,421 @@
+"""
+Load-test driver for the chat path.
+
+Runs the Flask app in-process on a threaded WSGI server, backed by mongomock, an
+in-memory vector index and the local fake Gemini server, then drives it with
+concurrent simulated users. Each user opens sessions and asks a few questions
+per session (follow-ups included), over /chat/ask or /chat/ask/stream.
+
+Reports throughput, status counts and p50/p95/p99 latency per stage, both as
+seen by the client and inside the server (memory load, retrieval, LLM answer,
+persistence), plus the fake Gemini and LLM limiter counters.
+
+Run from backend/src:
+    python -m devtools.load_test --users 20 --sessions 2 --turns 4 --latency lognormal:0.8:0.5 --rate-429 0.02
+    python -m devtools.load_test --users 50 --stream-ratio 0.5 --setting LLM_MAX_IN_FLIGHT=8 --json report.json
+"""
+import argparse
+import functools
+import json
+import random
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+
+import httpx
+
+from devtools.fake_gemini_server import FakeGeminiServer
+from devtools import local_backends
+from utils.deadline import DEADLINE_HEADER
+
+TOPICS = [
+    "billing", "refunds", "onboarding", "security", "vacation", "expenses",
+    "laptops", "travel", "payroll", "benefits", "passwords", "backups",
+]
+TEAMS = ["finance", "people", "platform", "support", "legal"]
+FOLLOW_UPS = ["And what about {topic}?", "Who handles that?", "How long does it take?", "Any exceptions?"]
+
+
+def _percentile(ordered: list, pct: float) -> float:
+    # Nearest-rank percentile of an already sorted list
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+class StageRecorder:
+    """
+    Thread-safe latency samples per named stage.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples = defaultdict(list)
+        self._errors = Counter()
+
+    def record(self, stage: str, seconds: float, ok: bool = True):
+        with self._lock:
+            self._samples[stage].append(seconds)
+            if not ok:
+                self._errors[stage] += 1
+
+    def wrap(self, stage: str, fn):
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            ok = False
+            try:
+                result = fn(*args, **kwargs)
+                ok = not (isinstance(result, dict) and result.get("success") is False)
+                return result
+            finally:
+                self.record(stage, time.perf_counter() - started, ok)
+        return timed
+
+    def wrap_stream(self, stage: str, fn):
+        """
+        Time a generator function: `<stage>_first` to the first item, `<stage>` to exhaustion.
+        """
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            started = time.perf_counter()
+            first = True
+            ok = False
+            try:
+                for item in fn(*args, **kwargs):
+                    if first:
+                        self.record(f"{stage}_first", time.perf_counter() - started)
+                        first = False
+                    yield item
+                ok = True
+            finally:
+                self.record(stage, time.perf_counter() - started, ok)
+        return timed
+
+    def summary(self) -> dict:
+        with self._lock:
+            samples = {stage: sorted(values) for stage, values in self._samples.items()}
+            errors = dict(self._errors)
+
+        def ms(seconds):
+            return round(seconds * 1000, 1)
+
+        return {
+            stage: {
+                "count": len(values),
+                "errors": errors.get(stage, 0),
+                "p50_ms": ms(_percentile(values, 50)),
+                "p95_ms": ms(_percentile(values, 95)),
+                "p99_ms": ms(_percentile(values, 99)),
+                "max_ms": ms(values[-1]),
+            }
+            for stage, values in sorted(samples.items())
+        }
+
+
+def _bootstrap_app(fake: FakeGeminiServer, settings: dict, real_embeddings: str | None):
+    """
+    Swap in the local backends, seed api_config and import the app.
+    """
+    local_backends.install_mongomock()
+    if not real_embeddings:
+        local_backends.install_hash_embedder()
+
+    from configuration.Database import api_config_collection
+    from models.api_config import api_config_schema
+
+    config = {
+        "GEMINI_API_KEY": "fake-key",
+        "GEMINI_API_URL": f"{fake.base_url}:generateContent",
+        **({"HF_MODAL": real_embeddings} if real_embeddings else {}),
+        **settings,
+    }
+    api_config_collection.insert_many([
+        api_config_schema({"key_name": name, "key_value": str(value)}) for name, value in config.items()
+    ])
+
+    local_backends.install_local_indexes()
+
+    from app import app
+    return app
+
+
+def _chunk_text(rng: random.Random, title: str, topic: str, index: int) -> str:
+    team = rng.choice(TEAMS)
+    days = rng.randint(2, 30)
+    other = rng.choice(TOPICS)
+    return (
+        f"Section {index} of the {title}. The policy on {topic} says that {topic} requests are "
+        f"reviewed by the {team} team within {days} days. Exceptions to the {topic} rules need "
+        f"written approval from a {team} lead. Questions about {topic} that also involve {other} "
+        f"are escalated to the {other} owners. Records about {topic} are kept for {days * 12} months."
+    )
+
+
+def _seed_users(args, rng: random.Random) -> list[str]:
+    """
+    Create users with enabled documents whose chunks are in the local index.
+    Returns one JWT per user.
+    """
+    from bson import ObjectId
+    from configuration.Database import users_collection, documents_collection
+    from core.user_auth import generate_jwt
+    from lib.vector_Store import store_documents
+    from models.documents import document_schema
+    from models.user import user_schema
+
+    tokens = []
+    for u in range(args.users):
+        email = f"load-user-{u}@example.com"
+        user_id = users_collection.insert_one(user_schema({
+            "firstName": "Load",
+            "lastName": f"User {u}",
+            "email": email,
+            "phone": "0000000000",
+            "password_hash": "!",
+        })).inserted_id
+
+        for d in range(args.docs_per_user):
+            title = f"{rng.choice(TOPICS)} handbook {d}"
+            file_name = f"load-{u}-{d}.pdf"
+            document_id = documents_collection.insert_one(document_schema({
+                "user_id": ObjectId(user_id),
+                "title": title,
+                "file_name": file_name,
+                "file_type": "pdf",
+            })).inserted_id
+
+            chunks = []
+            for c in range(args.chunks_per_doc):
+                topic = TOPICS[(d * args.chunks_per_doc + c) % len(TOPICS)]
+                chunks.append({
+                    "text": _chunk_text(rng, title, topic, c),
+                    "metadata": {
+                        "fileName": file_name,
+                        "fileType": "pdf",
+                        "fileSize": 0,
+                        "chunkIndex": c,
+                        "totalChunks": args.chunks_per_doc,
+                        "uploadedAt": time.time(),
+                        "chunkId": f"{file_name}-{c}",
+                        "documentId": str(document_id),
+                    }
+                })
+            stored = store_documents(chunks, str(user_id), session_id=f"upload-{u}")
+            if not stored.get("success"):
+                raise RuntimeError(f"Seeding chunks failed: {stored.get('error')}")
+
+        tokens.append(generate_jwt(user_id, email))
+    return tokens
+
+
+def _instrument_server(recorder: StageRecorder):
+    """
+    Wrap the chat path's stages in place. Call sites look these names up on
+    their modules at call time, so patching the module attributes is enough.
+    """
+    import route.chat as chat_route
+    import services.chat_service as chat_service
+
+    chat_route.check_user_active = recorder.wrap("server.user_check", chat_route.check_user_active)
+    chat_service.load_conversation_memory = recorder.wrap("server.memory_load", chat_service.load_conversation_memory)
+    chat_service._prepare_answer_inputs = recorder.wrap("server.retrieval", chat_service._prepare_answer_inputs)
+    chat_service.answer_question = recorder.wrap("server.llm_answer", chat_service.answer_question)
+    chat_service.answer_question_stream = recorder.wrap_stream("server.llm_stream", chat_service.answer_question_stream)
+    persist = recorder.wrap("server.persist", chat_service.persist_chat_turn)
+    chat_service.persist_chat_turn = persist
+    chat_route.persist_chat_turn = persist
+
+
+def _answer_outcome(answer: str | None) -> str:
+    from lib.vector_Store import LLM_ERROR_ANSWER
+
+    # The chat path degrades LLM failures into a canned answer with a 200
+    return "200_llm_fallback" if answer == LLM_ERROR_ANSWER else "200"
+
+
+def _ask(client: httpx.Client, recorder: StageRecorder, payload: dict, stream: bool) -> str:
+    """
+    One question; returns an outcome label for the status counts.
+    """
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        if stream:
+            with client.stream("POST", "/chat/ask/stream", json=payload) as response:
+                if response.status_code != 200:
+                    response.read()
+                    outcome = str(response.status_code)
+                else:
+                    outcome = "stream_incomplete"
+                    first = True
+                    event = None
+                    for line in response.iter_lines():
+                        if line.startswith("event:"):
+                            event = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            if first:
+                                recorder.record("client.stream_first_token", time.perf_counter() - started)
+                                first = False
+                            if event == "done":
+                                outcome = _answer_outcome(json.loads(line[len("data:"):]).get("answer"))
+                            elif event == "error":
+                                outcome = "stream_error"
+                            event = None
+            recorder.record("client.stream", time.perf_counter() - started, outcome == "200")
+        else:
+            response = client.post("/chat/ask", json=payload)
+            outcome = str(response.status_code)
+            if response.status_code == 200:
+                outcome = _answer_outcome(response.json().get("answer"))
+            recorder.record("client.ask", time.perf_counter() - started, outcome == "200")
+    except httpx.HTTPError as e:
+        outcome = type(e).__name__
+        recorder.record("client.stream" if stream else "client.ask", time.perf_counter() - started, False)
+    return outcome
+
+
+def _run_user(base_url: str, token: str, user_index: int, args, recorder: StageRecorder, outcomes: Counter, lock):
+    rng = random.Random(args.seed + user_index)
+    headers = {"Authorization": f"Bearer {token}"}
+    if args.request_timeout:
+        headers[DEADLINE_HEADER] = str(args.request_timeout)
+    with httpx.Client(base_url=base_url, headers=headers, timeout=args.timeout) as client:
+        for _ in range(args.sessions):
+            session_id = f"load-{user_index}-{uuid.uuid4().hex[:12]}"
+            for turn in range(args.turns):
+                topic = rng.choice(TOPICS)
+                if turn == 0:
+                    question = f"What does the handbook say about {topic} requests and who reviews them?"
+                else:
+                    question = rng.choice(FOLLOW_UPS).format(topic=topic)
+                payload = {"question": question, "sessionId": session_id, "topK": args.top_k}
+                outcome = _ask(client, recorder, payload, stream=rng.random() < args.stream_ratio)
+                with lock:
+                    outcomes[outcome] += 1
+                if args.think_time:
+                    time.sleep(rng.uniform(0, 2 * args.think_time))
+
+
+def run(args) -> dict:
+    from werkzeug.serving import WSGIRequestHandler, make_server
+
+    class QuietRequestHandler(WSGIRequestHandler):
+        def log_request(self, *args, **kwargs):
+            pass
+
+    fake = FakeGeminiServer(
+        ("127.0.0.1", 0),
+        latency=args.latency,
+        chunk_interval=args.chunk_interval,
+        rate_429=args.rate_429,
+        rate_5xx=args.rate_5xx,
+        retry_after=args.retry_after,
+        seed=args.seed
+    )
+    fake.start_in_thread()
+
+    settings = dict(s.split("=", 1) for s in args.setting)
+    app = _bootstrap_app(fake, settings, args.real_embeddings)
+
+    print(f"🌱 Seeding {args.users} users x {args.docs_per_user} documents x {args.chunks_per_doc} chunks...")
+    tokens = _seed_users(args, random.Random(args.seed))
+
+    recorder = StageRecorder()
+    _instrument_server(recorder)
+
+    server = make_server("127.0.0.1", 0, app, threaded=True, request_handler=QuietRequestHandler)
+    threading.Thread(target=server.serve_forever, name="load-test-app", daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+
+    total = args.users * args.sessions * args.turns
+    print(f"🚀 Running {total} questions from {args.users} concurrent users against {base_url}...")
+    outcomes = Counter()
+    lock = threading.Lock()
+    started = time.perf_counter()
+    users = [
+        threading.Thread(target=_run_user, args=(base_url, token, i, args, recorder, outcomes, lock), daemon=True)
+        for i, token in enumerate(tokens)
+    ]
+    for t in users:
+        t.start()
+    for t in users:
+        t.join()
+    elapsed = time.perf_counter() - started
+
+    from configuration.llm_client import llm
+    from lib.llmUsage import usage_meter
+    from lib.chatVectorWriter import chat_vector_writer
+    from lib.usageRollups import usage_rollups
+
+    server.shutdown()
+    fake.shutdown()
+    usage_meter.flush()
+    chat_vector_writer.flush()
+    usage_rollups.flush()
+
+    return {
+        "users": args.users,
+        "questions": total,
+        "elapsed_s": round(elapsed, 2),
+        "throughput_rps": round(total / elapsed, 2) if elapsed else 0.0,
+        "outcomes": dict(outcomes),
+        "stages": recorder.summary(),
+        "fake_gemini": fake.stats(),
+        "llm_limiter": llm.limiter_stats(),
+        "usage_meter": usage_meter.stats(),
+        "chat_vector_writer": chat_vector_writer.stats(),
+        "usage_rollups": usage_rollups.stats(),
+    }
+
+
+def _print_report(report: dict):
+    print()
+    print(f"📈 {report['questions']} questions in {report['elapsed_s']}s "
+          f"({report['throughput_rps']} req/s) from {report['users']} users")
+    print(f"   outcomes: {report['outcomes']}")
+    print()
+    print(f"{'stage':<28}{'count':>7}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for stage, s in report["stages"].items():
+        print(f"{stage:<28}{s['count']:>7}{s['errors']:>8}{s['p50_ms']:>10}{s['p95_ms']:>10}{s['p99_ms']:>10}{s['max_ms']:>10}")
+    print()
+    print(f"   fake gemini: {report['fake_gemini']}")
+    print(f"   llm limiter: {report['llm_limiter']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the chat path against local backends.")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent simulated users")
+    parser.add_argument("--sessions", type=int, default=2, help="Chat sessions per user")
+    parser.add_argument("--turns", type=int, default=3, help="Questions per session (first one plus follow-ups)")
+    parser.add_argument("--stream-ratio", type=float, default=0.0, help="Fraction of questions sent to /chat/ask/stream")
+    parser.add_argument("--think-time", type=float, default=0.0, help="Mean seconds a user waits between questions")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Client timeout per request (seconds)")
+    parser.add_argument("--request-timeout", type=float, default=None,
+                        help=f"Request deadline sent as {DEADLINE_HEADER} (seconds); server default otherwise")
+    parser.add_argument("--docs-per-user", type=int, default=2)
+    parser.add_argument("--chunks-per-doc", type=int, default=20)
+    parser.add_argument("--latency", default="lognormal:0.5:0.5", help="Fake Gemini time to first byte (see LatencyModel)")
+    parser.add_argument("--chunk-interval", type=float, default=0.02, help="Seconds between streamed chunks")
+    parser.add_argument("--rate-429", type=float, default=0.0)
+    parser.add_argument("--rate-5xx", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--setting", action="append", default=[], metavar="KEY=VALUE",
+                        help="api_config value to seed, e.g. LLM_MAX_IN_FLIGHT=8 (repeatable)")
+    parser.add_argument("--real-embeddings", metavar="MODEL", default=None,
+                        help="Use this sentence-transformers model instead of the hash embedder")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--json", metavar="PATH", help="Also write the report as JSON")
+    args = parser.parse_args()
+
+    report = run(args)
+    _print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"💾 Report written to {args.json}")
+
+
+if __name__ == "__main__":
+    main()
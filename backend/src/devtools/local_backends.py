@@ -0,0 +1,173 @@
+"""
+In-process stand-ins for the app's external backends, for local load tests.
+
+- MongoDB: pymongo.MongoClient is swapped for mongomock's in-memory client.
+- Pinecone: lib.vectorDB's document and chat indexes are replaced by LocalIndex,
+  an in-memory cosine index supporting the query/upsert/delete calls the app makes.
+- Embeddings: configuration.embedding can be replaced by a hashed bag-of-words
+  embedder, so no sentence-transformers model has to be downloaded or run.
+
+Order matters: install_mongomock() and install_hash_embedder() must run before
+the app modules are imported; install_local_indexes() after configuration.Database.
+"""
+import math
+import os
+import re
+import sys
+import threading
+import types
+import zlib
+from types import SimpleNamespace
+
+DEFAULT_MONGO_URI = "mongodb://localhost:27017/loadtest"
+HASH_EMBEDDING_DIM = 768
+
+
+def install_mongomock(uri: str = DEFAULT_MONGO_URI):
+    """
+    Route every MongoClient created afterwards to mongomock.
+    """
+    import mongomock
+    import pymongo
+
+    if "configuration.Database" in sys.modules:
+        raise RuntimeError("install_mongomock() must run before configuration.Database is imported")
+    os.environ["MONGO_URI"] = uri
+    import config
+    # config may already have been imported with the real MONGO_URI
+    config.MONGO_URI = uri
+    pymongo.MongoClient = mongomock.MongoClient
+
+
+def hash_embed_text(text: str, dim: int = HASH_EMBEDDING_DIM) -> list[float]:
+    """
+    Signed feature hashing of lowercase words; texts sharing words score higher.
+    """
+    vector = [0.0] * dim
+    for word in re.findall(r"\w+", text.lower()):
+        h = zlib.crc32(word.encode())
+        vector[h % dim] += 1.0 if (h >> 16) & 1 else -1.0
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+class _HashModel:
+    """
+    The parts of the SentenceTransformer model other modules use directly.
+    """
+
+    def __init__(self, dim: int):
+        self.dim = dim
+        # Word pieces are approximated by words and punctuation
+        self.tokenizer = SimpleNamespace(tokenize=lambda text: re.findall(r"\w+|[^\w\s]", text))
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.dim
+
+
+def install_hash_embedder(dim: int = HASH_EMBEDDING_DIM):
+    """
+    Register a `configuration.embedding` module backed by hash_embed_text.
+    """
+    if "configuration.embedding" in sys.modules:
+        raise RuntimeError("install_hash_embedder() must run before configuration.embedding is imported")
+
+    module = types.ModuleType("configuration.embedding")
+    module.model = _HashModel(dim)
+    module.EXPECTED_EMBEDDING_DIM = dim
+    module.embed_text = lambda text: hash_embed_text(text, dim)
+    module.embed_texts = lambda texts: [hash_embed_text(t, dim) for t in texts]
+    sys.modules["configuration.embedding"] = module
+
+
+def _matches_filter(metadata: dict, flt: dict | None) -> bool:
+    for field, condition in (flt or {}).items():
+        value = metadata.get(field)
+        if isinstance(condition, dict):
+            if "$eq" in condition and value != condition["$eq"]:
+                return False
+            if "$in" in condition and value not in condition["$in"]:
+                return False
+            if "$ne" in condition and value == condition["$ne"]:
+                return False
+        elif value != condition:
+            return False
+    return True
+
+
+def _normalize(values) -> list[float]:
+    norm = math.sqrt(sum(v * v for v in values)) or 1.0
+    return [v / norm for v in values]
+
+
+class LocalIndex:
+    """
+    In-memory stand-in for a Pinecone index (cosine metric, exact search).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._vectors = {}
+
+    def upsert(self, *, vectors, namespace="", timeout=None):
+        with self._lock:
+            for v in vectors:
+                self._vectors[v["id"]] = (_normalize(v["values"]), dict(v.get("metadata") or {}))
+        return {"upsertedCount": len(vectors)}
+
+    def query(self, *, top_k, vector, filter=None, include_values=False, include_metadata=False, timeout=None):
+        # Same keywords as pinecone's Index.query, so unsupported arguments fail here too
+        query = _normalize(vector)
+        with self._lock:
+            candidates = [
+                (vid, values, metadata)
+                for vid, (values, metadata) in self._vectors.items()
+                if _matches_filter(metadata, filter)
+            ]
+        scored = sorted(
+            (
+                (sum(a * b for a, b in zip(query, values)), vid, values, metadata)
+                for vid, values, metadata in candidates
+            ),
+            key=lambda item: item[0],
+            reverse=True
+        )[:top_k]
+        return SimpleNamespace(matches=[
+            SimpleNamespace(
+                id=vid,
+                score=score,
+                metadata=metadata if include_metadata else {},
+                values=values if include_values else []
+            )
+            for score, vid, values, metadata in scored
+        ])
+
+    def delete(self, ids=None, filter=None, delete_all=False, **kwargs):
+        with self._lock:
+            if delete_all:
+                self._vectors.clear()
+            elif ids:
+                for vid in ids:
+                    self._vectors.pop(vid, None)
+            elif filter:
+                for vid in [vid for vid, (_, md) in self._vectors.items() if _matches_filter(md, filter)]:
+                    del self._vectors[vid]
+        return {}
+
+    def describe_index_stats(self, **kwargs):
+        with self._lock:
+            return {"dimension": HASH_EMBEDDING_DIM, "total_vector_count": len(self._vectors)}
+
+
+def install_local_indexes() -> tuple[LocalIndex, LocalIndex]:
+    """
+    Pin LocalIndex instances in place of lib.vectorDB's Pinecone indexes.
+    """
+    import lib.vectorDB  # noqa: F401 - registers the Pinecone indexes
+    from configuration.client_registry import provider_clients
+
+    documents, chat = LocalIndex("documents"), LocalIndex("chat")
+    provider_clients.pin("pinecone_index", documents)
+    provider_clients.pin("pinecone_chat_index", chat)
+    return documents, chat
@@ -0,0 +1,53 @@
+"""
+Production server: preforking gunicorn with the app preloaded, serving the
+ASGI app (asgi.py) on uvicorn workers.
+
+Run from backend/src:
+    gunicorn -c gunicorn.conf.py asgi:app
+
+The master imports the app once (embedding model, index checks, provider
+clients) and forks WEB_WORKERS workers that share the loaded model
+copy-on-write instead of each loading its own. Every worker then opens its own
+Mongo, HTTP and Pinecone clients (configuration/prefork.py), caps its torch
+threads at WORKER_TORCH_THREADS and starts its own background jobs.
+"""
+import gc
+import os
+
+# Read when the app is imported, so set before preloading it
+os.environ["PREFORK_SERVER"] = "true"
+
+from config import WEB_BIND, WEB_WORKERS, WEB_THREADS, WEB_TIMEOUT, WORKER_TORCH_THREADS
+
+# Thread pools are sized when torch and the tokenizers load; keep them per worker,
+# and keep the tokenizers' pool from being started in the master before fork
+os.environ.setdefault("OMP_NUM_THREADS", str(WORKER_TORCH_THREADS))
+os.environ.setdefault("MKL_NUM_THREADS", str(WORKER_TORCH_THREADS))
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")
+
+bind = WEB_BIND
+workers = WEB_WORKERS
+# Async routes run on each worker's event loop, Flask routes on WEB_THREADS threads (asgi.py)
+worker_class = "uvicorn_worker.UvicornWorker"
+timeout = WEB_TIMEOUT
+preload_app = True
+
+# No collections while the app loads: they would leave free slots that the
+# workers' allocations then write into, copying the shared pages
+gc.disable()
+
+
+def when_ready(server):
+    # Everything loaded so far moves to the permanent generation, so the
+    # workers' collections never touch (and copy) those objects
+    gc.freeze()
+    print(f"🚀 App preloaded; forking {workers} workers ({WEB_THREADS} Flask threads each)")
+
+
+def post_fork(server, worker):
+    from configuration.prefork import after_fork
+    from app import start_background_workers
+
+    gc.enable()
+    after_fork(WORKER_TORCH_THREADS)
+    start_background_workers()
@@ -0,0 +1,130 @@
+"""
+Archival of deleted chat sessions.
+delete_chat only marks a session inactive. Once it has been inactive for
+CHAT_ARCHIVE_GRACE_DAYS, a periodic job copies the session and its message
+buckets to `chat_sessions_archive` / `messages_archive`, deletes its chat
+vectors in bulk, and removes it from the hot collections, so session lists,
+history reads and recall only ever touch live sessions. Copies keep their _id,
+so a batch interrupted at any step is redone safely on the next run.
+
+Run one pass from backend/src:
+    python -m lib.chatArchive
+"""
+import math
+from datetime import datetime, timedelta
+from pymongo.errors import BulkWriteError
+from configuration.Database import db, chat_sessions_archive_collection, messages_archive_collection
+from models.chat_session import message_bucket_id
+from lib.vectorDB import get_pinecone_chat_index
+from lib.vector_Store import delete_chat_session_vectors, delete_vectors_by_filter
+from utils.background_worker import PeriodicWorker
+from config import CHAT_ARCHIVE_GRACE_DAYS, CHAT_ARCHIVE_INTERVAL, CHAT_ARCHIVE_BATCH_SIZE, MESSAGE_BUCKET_SIZE
+
+DUPLICATE_KEY = 11000
+
+
+def _copy(collection, documents: list):
+    if not documents:
+        return
+    try:
+        collection.insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        # Copies left by an interrupted run are already there
+        if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+            raise
+
+
+def _bucket_ids(session: dict) -> list:
+    # Legacy sessions keep their messages embedded and have no buckets
+    buckets = math.ceil((session.get("messageCount") or 0) / MESSAGE_BUCKET_SIZE)
+    return [message_bucket_id(session["_id"], seq) for seq in range(buckets)]
+
+
+class ChatArchiver(PeriodicWorker):
+    thread_name = "chat-archiver"
+
+    def __init__(
+        self,
+        grace_days: float = CHAT_ARCHIVE_GRACE_DAYS,
+        interval: float = CHAT_ARCHIVE_INTERVAL,
+        batch_size: int = CHAT_ARCHIVE_BATCH_SIZE
+    ):
+        super().__init__(interval)
+        self.grace_days = grace_days
+        self.batch_size = batch_size
+
+        self.archived_sessions = 0
+        self.archived_buckets = 0
+        self.errors = 0
+
+    def _tick(self):
+        try:
+            self.run_once()
+        except Exception as e:
+            self.errors += 1
+            print(f"⚠️ Chat archival failed, retrying next run: {e}")
+
+    def run_once(self) -> int:
+        """
+        Archive every session that has been inactive for the grace period.
+        """
+        cutoff = datetime.utcnow() - timedelta(days=self.grace_days)
+        before = self.archived_sessions
+        while self._archive_batch(cutoff):
+            pass
+        archived = self.archived_sessions - before
+        if archived:
+            print(f"🧊 Archived {archived} deleted chat sessions")
+        return archived
+
+    def _archive_batch(self, cutoff: datetime) -> int:
+        """
+        Archive up to batch_size sessions; returns how many were looked at.
+        """
+        sessions = list(db.chat_sessions.find(
+            {"is_active": False, "updatedAt": {"$lt": cutoff}}
+        ).limit(self.batch_size))
+        if not sessions:
+            return 0
+
+        now = datetime.utcnow()
+        bucket_ids = {s["_id"]: _bucket_ids(s) for s in sessions}
+        buckets = list(db.messages.find({"_id": {"$in": [b for ids in bucket_ids.values() for b in ids]}}))
+        _copy(chat_sessions_archive_collection, [{**s, "archivedAt": now} for s in sessions])
+        _copy(messages_archive_collection, [{**b, "archivedAt": now} for b in buckets])
+        delete_chat_session_vectors(sessions)
+        # Vectors of older sessions under timestamp-based ids, or with no messageCount
+        delete_vectors_by_filter(get_pinecone_chat_index(), {"sessionId": {"$in": [s["sessionId"] for s in sessions]}})
+
+        archived, revived = [], []
+        for session in sessions:
+            # A session written to since it was read is left in place
+            result = db.chat_sessions.delete_one(
+                {"_id": session["_id"], "is_active": False, "updatedAt": session["updatedAt"]}
+            )
+            (archived if result.deleted_count else revived).append(session["_id"])
+
+        db.messages.delete_many({"_id": {"$in": [b for ref in archived for b in bucket_ids[ref]]}})
+        if revived:
+            chat_sessions_archive_collection.delete_many({"_id": {"$in": revived}})
+            messages_archive_collection.delete_many({"_id": {"$in": [b for ref in revived for b in bucket_ids[ref]]}})
+
+        self.archived_sessions += len(archived)
+        self.archived_buckets += sum(len(bucket_ids[ref]) for ref in archived)
+        return len(sessions)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running(),
+            "grace_days": self.grace_days,
+            "archived_sessions": self.archived_sessions,
+            "archived_buckets": self.archived_buckets,
+            "errors": self.errors,
+        }
+
+
+chat_archiver = ChatArchiver()
+
+
+if __name__ == "__main__":
+    chat_archiver.run_once()
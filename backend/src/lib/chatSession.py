@@ -1,7 +1,191 @@
+from bson import ObjectId
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
 from configuration.Database import db
-from models.chat_session import message_schema,chat_session_schema
+from models.chat_session import message_schema, chat_session_schema, message_bucket_id, message_bucket_schema, session_title, SESSION_LIST_SORT
 from datetime import datetime
-from utils.user_limits import check_user_active, check_chat_limit
+from utils.user_limits import check_user_active, check_chat_limit, reserve_chat_session, release_chat_session
+from lib.usageRollups import usage_rollups
+from config import MESSAGE_BUCKET_SIZE, CHAT_HISTORY_PAGE_SIZE, CHAT_SESSIONS_PAGE_SIZE
+
+# Messages are stored in `messages` bucket documents of MESSAGE_BUCKET_SIZE messages;
+# message i of a session lives in bucket i // MESSAGE_BUCKET_SIZE. The session document
+# keeps the metadata, and its `messageCount` allocates message indexes.
+
+def _format_message(msg: dict) -> dict:
+    return {"role": msg["role"], "message": msg["message"], "timestamp": msg["timestamp"]}
+
+def _migrate_embedded_messages(session_ref):
+    """
+    Move a legacy session's embedded `messages` array into buckets (once per session).
+    Bucket writes are idempotent, so concurrent migrations of one session are harmless.
+    """
+    session = db.chat_sessions.find_one({"_id": session_ref})
+    if session is None or "messageCount" in session:
+        return
+    messages = sorted(session.get("messages") or [], key=lambda m: m["timestamp"])
+    for seq, start in enumerate(range(0, len(messages), MESSAGE_BUCKET_SIZE)):
+        bucket = message_bucket_schema({
+            "sessionRef": session_ref,
+            "seq": seq,
+            "userId": session["userId"],
+            "sessionId": session["sessionId"],
+            "messages": [
+                {**message_schema(m), "index": start + i}
+                for i, m in enumerate(messages[start:start + MESSAGE_BUCKET_SIZE])
+            ]
+        })
+        db.messages.replace_one({"_id": bucket["_id"]}, bucket, upsert=True)
+    first_user_message = next((m["message"] for m in messages if m["role"] == "user"), "")
+    db.chat_sessions.update_one(
+        {"_id": session_ref, "messageCount": {"$exists": False}},
+        {
+            "$set": {"messageCount": len(messages), "title": session_title(first_user_message)},
+            "$unset": {"messages": ""}
+        }
+    )
+    print(f"📦 Moved {len(messages)} messages of session {session['sessionId']} into buckets")
+
+def _find_session(user_id: str, session_id: str, fields: dict = None):
+    """
+    Session metadata (never the messages), migrating a legacy session on first access.
+    """
+    projection = {**(fields or {}), "messageCount": 1}
+    session = db.chat_sessions.find_one({"userId": user_id, "sessionId": session_id}, projection)
+    if session is not None and "messageCount" not in session:
+        _migrate_embedded_messages(session["_id"])
+        session = db.chat_sessions.find_one({"_id": session["_id"]}, projection)
+    return session
+
+def _read_messages(session_ref, start: int, end: int) -> list:
+    """
+    Messages with index in [start, end), oldest first, from the buckets covering that range.
+    """
+    if end <= start:
+        return []
+    bucket_ids = [
+        message_bucket_id(session_ref, seq)
+        for seq in range(start // MESSAGE_BUCKET_SIZE, (end - 1) // MESSAGE_BUCKET_SIZE + 1)
+    ]
+    # Buckets come back in seq order and each is kept in index order on write
+    buckets = db.messages.find(
+        {"_id": {"$in": bucket_ids}},
+        {"seq": 1, "messages.index": 1, "messages.role": 1, "messages.message": 1, "messages.timestamp": 1}
+    ).sort("seq", 1)
+    return [
+        msg
+        for bucket in buckets
+        for msg in bucket.get("messages", [])
+        if start <= msg["index"] < end
+    ]
+
+def _append_messages(session_ref, user_id: str, session_id: str, first_index: int, messages: list):
+    """
+    Append messages with consecutive indexes from `first_index`: one upsert per
+    bucket touched (a turn only spans two at a bucket boundary), whatever the session length.
+    """
+    by_seq = {}
+    for i, message in enumerate(messages):
+        index = first_index + i
+        by_seq.setdefault(index // MESSAGE_BUCKET_SIZE, []).append({**message, "index": index})
+
+    for seq, bucket_messages in by_seq.items():
+        bucket = message_bucket_schema({"sessionRef": session_ref, "seq": seq, "userId": user_id, "sessionId": session_id})
+        db.messages.update_one(
+            {"_id": bucket.pop("_id")},
+            {
+                # $sort keeps the bucket in index order when concurrent appends land out of order
+                "$push": {"messages": {"$each": bucket_messages, "$sort": {"index": 1}}},
+                "$set": {"updatedAt": bucket.pop("updatedAt")},
+                "$setOnInsert": {k: v for k, v in bucket.items() if k != "messages"}
+            },
+            upsert=True
+        )
+
+def _allocate_message_indexes(user_id: str, session_id: str, count: int):
+    """
+    Reserve the next `count` message indexes of an existing session.
+    Returns the session (with the new messageCount and its summarizedCount), or None if there is no session.
+    """
+    def increment():
+        return db.chat_sessions.find_one_and_update(
+            {"userId": user_id, "sessionId": session_id, "messageCount": {"$exists": True}},
+            {"$inc": {"messageCount": count}, "$set": {"updatedAt": datetime.utcnow()}},
+            projection={"messageCount": 1, "summarizedCount": 1},
+            return_document=ReturnDocument.AFTER
+        )
+
+    session = increment()
+    if session is None and _find_session(user_id, session_id):
+        # A legacy session, migrated by _find_session
+        session = increment()
+    return session
+
+def _create_session(user_id: str, session_id: str, new_messages: list):
+    """
+    Insert a new session holding `new_messages`. Returns None if a concurrent
+    first turn created it first (the user_session index is unique).
+    """
+    first_user_message = next((m["message"] for m in new_messages if m["role"] == "user"), "")
+    new_session = chat_session_schema({
+        "userId": user_id,
+        "sessionId": session_id,
+        "title": session_title(first_user_message),
+        "messageCount": len(new_messages)
+    })
+    try:
+        inserted_id = db.chat_sessions.insert_one(new_session).inserted_id
+    except DuplicateKeyError:
+        return None
+    # Precomputed for the admin user list; users not yet backfilled get their total from the backfill
+    db.users.update_one(
+        {"_id": ObjectId(user_id), "chat_sessions_total": {"$exists": True}},
+        {"$inc": {"chat_sessions_total": 1}}
+    )
+    return {"_id": inserted_id, "messageCount": len(new_messages)}
+
+def save_messages(user_id: str, session_id: str, messages: list):
+    """
+    Save consecutive messages, given as (role, message) pairs, into a chat session.
+    Creates the session if it doesn't exist, after checking user active status and chat limits.
+    Returns the index of the first saved message as `firstIndex`, and the session's
+    `messageCount` and `summarizedCount` after the write.
+    """
+    new_messages = [message_schema({"role": role, "message": message}) for role, message in messages]
+
+    session = _allocate_message_indexes(user_id, session_id, len(new_messages))
+    new_session_count = 0
+    if session is None:
+        # New session - check user status and limits
+        allowed = _check_new_session_allowed(user_id, reserve=True)
+        if not allowed.get("success"):
+            return allowed
+
+        session = _create_session(user_id, session_id, new_messages)
+        if session is None:
+            # Lost the race to create it: append to the winner's session, and
+            # give back the session counted against the limit above
+            release_chat_session(user_id)
+            session = _allocate_message_indexes(user_id, session_id, len(new_messages))
+            if session is None:
+                return {"success": False, "error": "Chat session could not be saved"}
+        else:
+            new_session_count = 1
+
+    first_index = session["messageCount"] - len(new_messages)
+    _append_messages(session["_id"], user_id, session_id, first_index, new_messages)
+    usage_rollups.add(
+        user_id,
+        sessions=new_session_count,
+        messages=len(new_messages),
+        questions=sum(1 for m in new_messages if m["role"] == "user")
+    )
+    return {
+        "success": True,
+        "firstIndex": first_index,
+        "messageCount": session["messageCount"],
+        "summarizedCount": session.get("summarizedCount") or 0
+    }
 
 def save_message(user_id: str, session_id: str, role: str, message: str):
     """
@@ -9,94 +193,185 @@ def save_message(user_id: str, session_id: str, role: str, message: str):
     Creates a session if it doesn't exist.
     Checks user active status and chat limits when creating a new session.
     """
-    session = db.chat_sessions.find_one({"userId": user_id, "sessionId": session_id})
-    new_message = message_schema({"role": role, "message": message})
+    return save_messages(user_id, session_id, [(role, message)])
 
-    if session:
-        # Existing session - just add the message
-        db.chat_sessions.update_one(
-            {"_id": session["_id"]},
-            {
-                "$push": {"messages": new_message},
-                "$set": {"updatedAt": datetime.utcnow()}
-            }
-        )
-    else:
-        # New session - check user status and limits
-        is_active, error_msg = check_user_active(user_id)
-        if not is_active:
-            return {"success": False, "error": error_msg}
-        
-        can_create, limit_error, limit_info = check_chat_limit(user_id)
-        if not can_create:
-            return {
-                "success": False,
-                "error": limit_error,
-                "limit_info": limit_info
-            }
-        
-        # Create the new session
-        new_session = chat_session_schema({
-            "userId": user_id,
-            "sessionId": session_id,
-            "messages": [new_message]
-        })
-        db.chat_sessions.insert_one(new_session)
+def _check_new_session_allowed(user_id: str, reserve: bool = False):
+    """
+    User status and chat limit checks for a new session.
+    With `reserve`, the session is also counted against the limit.
+    """
+    is_active, error_msg = check_user_active(user_id)
+    if not is_active:
+        return {"success": False, "error": error_msg}
+
+    limit_check = reserve_chat_session if reserve else check_chat_limit
+    can_create, limit_error, limit_info = limit_check(user_id)
+    if not can_create:
+        return {
+            "success": False,
+            "error": limit_error,
+            "limit_info": limit_info
+        }
 
     return {"success": True}
 
-def get_chat_history(user_id: str, session_id: str):
+def check_session_allowed(user_id: str, session_id: str):
     """
-    Get all messages for a chat session, sorted by timestamp.
+    Check up front whether messages can be saved to a session, without writing.
+    Existing sessions are always allowed; a new session must pass the user
+    status and chat limit checks that save_messages would apply.
     """
-    session = db.chat_sessions.find_one({"userId": user_id, "sessionId": session_id})
+    if db.chat_sessions.find_one({"userId": user_id, "sessionId": session_id}, {"_id": 1}):
+        return {"success": True}
+    return _check_new_session_allowed(user_id)
 
+def get_session_memory(user_id: str, session_id: str, recent: int):
+    """
+    Load what conversation memory needs from a session without reading the
+    whole transcript: the rolling summary, the message count and the last
+    `recent` messages (oldest first).
+    """
+    session = _find_session(user_id, session_id, {"summary": 1, "summarizedCount": 1})
     if not session:
-        return {"success": True, "userId": user_id, "sessionId": session_id, "messages": []}
+        return {"summary": "", "summarizedCount": 0, "messageCount": 0, "recent": []}
 
-    sorted_messages = sorted(session.get("messages", []), key=lambda x: x["timestamp"])
-    formatted_messages = [
-        {"role": msg["role"], "message": msg["message"], "timestamp": msg["timestamp"]}
-        for msg in sorted_messages
-    ]
+    count = session.get("messageCount") or 0
+    recent_messages = _read_messages(session["_id"], max(0, count - recent), count) if recent > 0 else []
+    return {
+        "summary": session.get("summary") or "",
+        "summarizedCount": session.get("summarizedCount") or 0,
+        "messageCount": count,
+        "recent": [_format_message(msg) for msg in recent_messages],
+    }
+
+def get_messages_range(user_id: str, session_id: str, skip: int, limit: int):
+    """
+    Messages [skip, skip + limit) of a session in insertion order.
+    """
+    session = _find_session(user_id, session_id)
+    if not session:
+        return []
+    return [{"role": msg["role"], "message": msg["message"]} for msg in _read_messages(session["_id"], skip, skip + limit)]
+
+def save_session_summary(user_id: str, session_id: str, summary: str, previous_count: int, summarized_count: int) -> bool:
+    """
+    Store a new rolling summary covering the first `summarized_count` messages.
+    Only applies if nobody else advanced the summary since `previous_count` was read.
+    """
+    expected = {"$in": [0, None]} if not previous_count else previous_count
+    result = db.chat_sessions.update_one(
+        {"userId": user_id, "sessionId": session_id, "summarizedCount": expected},
+        {"$set": {"summary": summary, "summarizedCount": summarized_count}}
+    )
+    return result.modified_count > 0
+
+def get_chat_history(user_id: str, session_id: str, limit: int = CHAT_HISTORY_PAGE_SIZE, before: int = None):
+    """
+    Get one page of a chat session's messages, oldest first: the latest `limit`
+    messages, or the `limit` messages before the `before` cursor.
+    Pass the returned `nextCursor` as `before` to get the previous page;
+    it is None once the start of the session is reached.
+    """
+    session = _find_session(user_id, session_id, {"userId": 1, "sessionId": 1})
+
+    if not session:
+        return {"success": True, "userId": user_id, "sessionId": session_id, "messages": [], "total": 0, "nextCursor": None}
+
+    total = session.get("messageCount") or 0
+    end = total if before is None else max(0, min(before, total))
+    start = max(0, end - limit)
+    messages = _read_messages(session["_id"], start, end)
 
     return {
         "success": True,
         "userId": session["userId"],
         "sessionId": session["sessionId"],
-        "messages": formatted_messages
+        "messages": [_format_message(msg) for msg in messages],
+        "total": total,
+        "nextCursor": str(start) if start > 0 else None
     }
 
-def get_all_chat_history(user_id: str):
+def _session_cursor(session: dict) -> str:
+    return f"{session['updatedAt'].isoformat()}_{session['_id']}"
+
+def _parse_session_cursor(cursor: str):
+    updated_at, _, session_ref = cursor.rpartition("_")
+    return datetime.fromisoformat(updated_at), ObjectId(session_ref)
+
+def _fill_missing_titles(sessions: list):
     """
-    Get all chat sessions for a user, sorted by session creation timestamp.
+    Derive titles for sessions created before titles were stored, from the first
+    message of each one's first bucket, and store them so this happens once.
     """
-    chats_cursor = db.chat_sessions.find({"userId": user_id})
-    chats = list(chats_cursor)
-
-    if not chats:
-        return []
+    untitled = [s for s in sessions if "title" not in s]
+    if not untitled:
+        return
+    first_buckets = db.messages.find(
+        {"_id": {"$in": [message_bucket_id(s["_id"], 0) for s in untitled]}},
+        {"messages": {"$slice": 1}}
+    )
+    first_messages = {
+        bucket["_id"].rsplit(":", 1)[0]: bucket["messages"][0]["message"]
+        for bucket in first_buckets
+        if bucket.get("messages")
+    }
+    for session in untitled:
+        session["title"] = session_title(first_messages.get(str(session["_id"]), ""))
+        db.chat_sessions.update_one(
+            {"_id": session["_id"], "title": {"$exists": False}},
+            {"$set": {"title": session["title"]}}
+        )
 
-    formatted_chats = []
-    for chat in chats:
-        sorted_messages = sorted(chat.get("messages", []), key=lambda x: x["timestamp"])
-        formatted_messages = [
-            {"role": msg["role"], "message": msg["message"], "timestamp": msg["timestamp"]}
-            for msg in sorted_messages
+def list_chat_sessions(user_id: str, limit: int = CHAT_SESSIONS_PAGE_SIZE, cursor: str = None):
+    """
+    One page of a user's active chat sessions, most recently updated first,
+    without their messages (load those per session with get_chat_history).
+    Pass the returned `nextCursor` as `cursor` to get the next page;
+    it is None on the last page.
+    """
+    query = {"userId": user_id, "is_active": True}
+    if cursor:
+        try:
+            updated_at, session_ref = _parse_session_cursor(cursor)
+        except Exception:
+            return {"success": False, "error": "Invalid cursor"}
+        query["$or"] = [
+            {"updatedAt": {"$lt": updated_at}},
+            {"updatedAt": updated_at, "_id": {"$lt": session_ref}}
         ]
 
-        formatted_chats.append({
-            "success": True,
-            "userId": chat["userId"],
-            "sessionId": chat["sessionId"],
-            "messages": formatted_messages,
-            "createdAt": chat.get("createdAt"),
-            "updatedAt": chat.get("updatedAt")
-        })
+    # One extra row tells whether there is a next page
+    sessions = list(
+        db.chat_sessions.find(
+            query,
+            {"sessionId": 1, "title": 1, "messageCount": 1, "createdAt": 1, "updatedAt": 1}
+        ).sort(SESSION_LIST_SORT).limit(limit + 1)
+    )
+    has_more = len(sessions) > limit
+    sessions = sessions[:limit]
 
-    formatted_chats.sort(key=lambda x: x["createdAt"], reverse=True)
+    for session in sessions:
+        if "messageCount" not in session:
+            _migrate_embedded_messages(session["_id"])
+            migrated = db.chat_sessions.find_one({"_id": session["_id"]}, {"messageCount": 1, "title": 1}) or {}
+            session.update(migrated)
+    _fill_missing_titles(sessions)
 
-    return formatted_chats
+    return {
+        "success": True,
+        "userId": user_id,
+        "sessions": [
+            {
+                "sessionId": session["sessionId"],
+                "title": session.get("title") or "",
+                "messageCount": session.get("messageCount") or 0,
+                "createdAt": session.get("createdAt"),
+                "updatedAt": session.get("updatedAt")
+            }
+            for session in sessions
+        ],
+        "nextCursor": _session_cursor(sessions[-1]) if has_more else None
+    }
 
 def delete_chat(user_id: str, session_id: str):
     """
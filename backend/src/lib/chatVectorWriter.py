@@ -0,0 +1,132 @@
+"""
+Write-behind queue for chat message vectors.
+Saving a chat turn only enqueues its messages; a background worker embeds each
+batch in one forward pass and upserts it into the chat index in one call,
+retrying failed upserts with exponential backoff. Session recall only searches
+turns older than the recent window, so it tolerates the short lag.
+"""
+import atexit
+import queue
+import time
+from lib.vector_Store import build_chat_message_vectors, upsert_chat_message_vectors
+from utils.background_worker import BackgroundWorker
+from config import CHAT_VECTOR_BATCH_SIZE, CHAT_VECTOR_QUEUE_SIZE, CHAT_VECTOR_MAX_RETRIES, CHAT_VECTOR_RETRY_BACKOFF
+
+
+class ChatVectorWriter(BackgroundWorker):
+    thread_name = "chat-vector-writer"
+
+    def __init__(
+        self,
+        batch_size: int = CHAT_VECTOR_BATCH_SIZE,
+        max_pending: int = CHAT_VECTOR_QUEUE_SIZE,
+        max_retries: int = CHAT_VECTOR_MAX_RETRIES,
+        retry_backoff: float = CHAT_VECTOR_RETRY_BACKOFF
+    ):
+        super().__init__()
+        self.batch_size = batch_size
+        self.max_pending = max_pending
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self._queue = queue.Queue(maxsize=max_pending)
+
+        self.enqueued = 0
+        self.written = 0
+        self.retries = 0
+        self.dropped = 0
+        self.failed = 0
+
+    def _reset_after_fork(self):
+        # The parent writes its own queued messages
+        self._queue = queue.Queue(maxsize=self.max_pending)
+
+    def _next_batch(self, block: bool) -> list:
+        batch = []
+        try:
+            batch.append(self._queue.get(block=block))
+            while len(batch) < self.batch_size:
+                batch.append(self._queue.get_nowait())
+        except queue.Empty:
+            pass
+        return batch
+
+    def _run_worker(self):
+        while True:
+            self._write(self._next_batch(block=True))
+
+    def enqueue(self, user_id: str, session_id: str, first_index: int, messages: list):
+        """
+        Queue consecutive messages, given as (role, message) pairs starting at
+        message index `first_index`; never raises into the calling request.
+        """
+        try:
+            self.start()
+            now = time.time()
+            for i, (role, message) in enumerate(messages):
+                try:
+                    self._queue.put_nowait({
+                        "userId": user_id,
+                        "sessionId": session_id,
+                        "index": first_index + i,
+                        "role": role,
+                        "message": message,
+                        "createdAt": now
+                    })
+                    with self._lock:
+                        self.enqueued += 1
+                except queue.Full:
+                    with self._lock:
+                        self.dropped += 1
+                    print(f"⚠️ Chat vector queue full, dropping message {first_index + i} of session {session_id}")
+        except Exception as e:
+            print(f"⚠️ Failed to queue chat message vectors: {e}")
+
+    def _write(self, batch: list) -> int:
+        if not batch:
+            return 0
+        vectors = None
+        for attempt in range(self.max_retries + 1):
+            try:
+                # Embeddings survive a failed upsert, so a retry only repeats the upsert
+                if vectors is None:
+                    vectors = build_chat_message_vectors(batch)
+                upsert_chat_message_vectors(vectors)
+                with self._lock:
+                    self.written += len(batch)
+                return len(batch)
+            except Exception as e:
+                if attempt == self.max_retries:
+                    with self._lock:
+                        self.failed += len(batch)
+                    print(f"❌ Failed to save {len(batch)} chat message vectors after {attempt + 1} attempts: {e}")
+                    return 0
+                with self._lock:
+                    self.retries += 1
+                delay = self.retry_backoff * (2 ** attempt)
+                print(f"⚠️ Saving chat message vectors failed ({e}); retrying in {delay:.1f}s")
+                time.sleep(delay)
+
+    def flush(self) -> int:
+        """
+        Write everything still queued from the calling thread.
+        """
+        written = 0
+        while True:
+            batch = self._next_batch(block=False)
+            if not batch:
+                return written
+            written += self._write(batch)
+
+    def stats(self) -> dict:
+        return {
+            "enqueued": self.enqueued,
+            "written": self.written,
+            "pending": self._queue.qsize(),
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
+
+
+chat_vector_writer = ChatVectorWriter()
+atexit.register(chat_vector_writer.flush)
@@ -0,0 +1,123 @@
+"""
+Token-budgeted context packing for RAG prompts.
+Adjacent chunks of the same document are merged (with their shared overlap
+removed) and the resulting blocks fill the token budget best-fit by relevance.
+"""
+from typing import Any, Dict, List, Tuple
+from lib.fileProcessor import count_tokens
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Count tokens with the embedding tokenizer, falling back to a
+    ~4 characters per token estimate if the tokenizer is unavailable.
+    """
+    if not text:
+        return 0
+    try:
+        return count_tokens(text)
+    except Exception:
+        return max(1, len(text) // 4)
+
+
+def strip_overlap(previous: str, following: str, min_overlap: int = 20) -> str:
+    """
+    Remove the prefix of `following` that repeats the tail of `previous`.
+    Returns `following` unchanged if no overlap of at least `min_overlap` chars is found.
+    """
+    anchor = following[:min_overlap]
+    if len(anchor) < min_overlap:
+        return following
+
+    start = previous.find(anchor)
+    while start != -1:
+        tail = previous[start:]
+        if following.startswith(tail):
+            return following[len(tail):].lstrip()
+        start = previous.find(anchor, start + 1)
+    return following
+
+
+def _build_block(members: List[Dict[str, Any]]) -> Dict[str, Any]:
+    text = members[0].get("text", "")
+    for prev, nxt in zip(members, members[1:]):
+        addition = strip_overlap(prev.get("text", ""), nxt.get("text", ""))
+        if addition:
+            text = f"{text} {addition}"
+
+    formatted = f"- {text}"
+    return {
+        "text": formatted,
+        "tokens": estimate_tokens(formatted),
+        "score": max(m.get("hybridScore", 0) for m in members),
+        "members": members,
+    }
+
+
+def merge_adjacent_chunks(matches: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Group matches into blocks of consecutive chunks (by chunkIndex) of the same documentId.
+    Matches without a documentId/chunkIndex become single-chunk blocks.
+    """
+    by_document: Dict[str, Dict[int, Dict[str, Any]]] = {}
+    groups: List[List[Dict[str, Any]]] = []
+
+    for m in matches:
+        if not m.get("text"):
+            continue
+        metadata = m.get("metadata") or {}
+        doc_id = metadata.get("documentId")
+        chunk_index = metadata.get("chunkIndex")
+        if not doc_id or chunk_index is None:
+            groups.append([m])
+            continue
+        chunks = by_document.setdefault(str(doc_id), {})
+        index = int(chunk_index)
+        # Keep the best-scored copy if the same chunk is returned twice
+        if index not in chunks or m.get("hybridScore", 0) > chunks[index].get("hybridScore", 0):
+            chunks[index] = m
+
+    for chunks in by_document.values():
+        run = []
+        previous_index = None
+        for index in sorted(chunks):
+            if run and index != previous_index + 1:
+                groups.append(run)
+                run = []
+            run.append(chunks[index])
+            previous_index = index
+        if run:
+            groups.append(run)
+
+    return [_build_block(g) for g in groups]
+
+
+def pack_context(matches: List[Dict[str, Any]], max_tokens: int) -> Tuple[str, int]:
+    """
+    Build the prompt context from search matches within a token budget.
+
+    Blocks are considered in descending relevance. A block that doesn't fit is
+    skipped (smaller, later blocks may still fit); a merged block that doesn't
+    fit is split back into its individual chunks.
+
+    Args:
+        matches: Search matches with "text", "hybridScore" and "metadata"
+        max_tokens: Token budget for the packed context
+
+    Returns:
+        Tuple of (context: str, tokens_used: int)
+    """
+    candidates = sorted(merge_adjacent_chunks(matches), key=lambda b: b["score"], reverse=True)
+    selected = []
+    tokens_used = 0
+
+    while candidates:
+        block = candidates.pop(0)
+        if tokens_used + block["tokens"] <= max_tokens:
+            selected.append(block)
+            tokens_used += block["tokens"]
+        elif len(block["members"]) > 1:
+            candidates.extend(_build_block([m]) for m in block["members"])
+            candidates.sort(key=lambda b: b["score"], reverse=True)
+
+    return "\n\n".join(b["text"] for b in selected), tokens_used
@@ -0,0 +1,177 @@
+"""
+Bounded rolling conversation memory for follow-up questions.
+Each session keeps a compact LLM-maintained summary of its older turns plus a
+small window of recent turns; relevant earlier turns are recalled from the chat
+index, filtered to the current session. Everything is packed into a fixed token
+budget, so prompt size stays flat as sessions grow.
+"""
+import threading
+from configuration.llm_client import llm
+from lib.chatSession import get_session_memory, get_messages_range, save_session_summary
+from lib.contextPacker import estimate_tokens
+from lib.vector_Store import search_session_messages
+from utils.deadline import Deadline
+from config import CONVERSATION_MEMORY_TOKENS, CONVERSATION_RECENT_MESSAGES, CONVERSATION_SUMMARY_BATCH
+
+MAX_TURN_CHARS = 600
+FOLLOW_UP_MAX_WORDS = 8
+# Transcript tokens sent per summary call
+SUMMARY_CHUNK_TOKENS = 3000
+
+_summaries_in_progress = set()
+_summaries_lock = threading.Lock()
+
+
+def load_conversation_memory(user_id: str, session_id: str) -> dict:
+    memory = get_session_memory(user_id, session_id, CONVERSATION_RECENT_MESSAGES)
+    memory["has_history"] = memory["messageCount"] > 0
+    return memory
+
+
+def contextualize_query(question: str, memory: dict) -> str:
+    """
+    Retrieval query for a question. Short follow-ups ("what about the second one?")
+    carry little meaning on their own, so the previous user question is prepended.
+    """
+    if len(question.split()) > FOLLOW_UP_MAX_WORDS:
+        return question
+    previous = next((m["message"] for m in reversed(memory["recent"]) if m["role"] == "user"), None)
+    return f"{previous}\n{question}" if previous else question
+
+
+def _turn(role: str, message: str) -> str:
+    text = message if len(message) <= MAX_TURN_CHARS else message[:MAX_TURN_CHARS] + "…"
+    return f"{role.upper()}: {text}"
+
+
+def build_conversation_context(user_id: str, session_id: str, memory: dict, query_vector: list, max_tokens: int = CONVERSATION_MEMORY_TOKENS, deadline: Deadline = None) -> str:
+    """
+    Pack summary, recalled earlier turns and recent turns into `max_tokens`.
+    Recent turns take priority (newest first), then the summary, then recalled turns.
+    """
+    if not memory["has_history"]:
+        return ""
+
+    remaining = max_tokens
+
+    recent = []
+    for m in reversed(memory["recent"]):
+        line = _turn(m["role"], m["message"])
+        tokens = estimate_tokens(line)
+        if tokens > remaining:
+            break
+        recent.insert(0, line)
+        remaining -= tokens
+
+    summary = ""
+    if memory["summary"]:
+        line = f"Summary of earlier conversation: {memory['summary']}"
+        tokens = estimate_tokens(line)
+        if tokens <= remaining:
+            summary = line
+            remaining -= tokens
+
+    recalled = []
+    # Only turns older than the recent window are worth recalling from the index
+    if memory["messageCount"] > len(memory["recent"]):
+        recent_texts = {m["message"][:1000] for m in memory["recent"]}
+        for m in search_session_messages(query_vector, user_id, session_id, limit=3, deadline=deadline):
+            if not m["message"] or m["message"] in recent_texts:
+                continue
+            line = f"Earlier, {_turn(m['role'], m['message'])}"
+            tokens = estimate_tokens(line)
+            if tokens <= remaining:
+                recalled.append(line)
+                remaining -= tokens
+
+    return "\n".join([p for p in [summary] if p] + recalled + recent)
+
+
+def _summarize(user_id: str, previous_summary: str, messages: list) -> str:
+    transcript = "\n".join(_turn(m["role"], m["message"]) for m in messages)
+    response = llm.chat_completion(
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You maintain a running summary of a conversation between a user and a document assistant. "
+                    "Update the summary with the new turns. Keep the entities, documents and facts the user may "
+                    "refer back to. At most 120 words, plain prose."
+                )
+            },
+            {
+                "role": "user",
+                "content": f"Current summary:\n{previous_summary or '(none)'}\n\nNew turns:\n{transcript}"
+            }
+        ],
+        max_tokens=256,
+        user_id=user_id,
+        feature="conversation_summary"
+    )
+    return response["choices"][0]["message"]["content"].strip()
+
+
+def _summary_due(message_count: int, summarized_count: int) -> bool:
+    return message_count - CONVERSATION_RECENT_MESSAGES - summarized_count >= CONVERSATION_SUMMARY_BATCH
+
+
+def update_summary(user_id: str, session_id: str):
+    """
+    Fold messages that have left the recent window into the rolling summary,
+    once at least CONVERSATION_SUMMARY_BATCH of them have accumulated.
+    A long backlog (e.g. a legacy session) is folded in chunks of at most
+    CONVERSATION_SUMMARY_BATCH messages and SUMMARY_CHUNK_TOKENS, each chunk
+    updating the summary left by the previous one.
+    """
+    memory = get_session_memory(user_id, session_id, 0)
+    if not _summary_due(memory["messageCount"], memory["summarizedCount"]):
+        return
+
+    summary = memory["summary"]
+    summarized = memory["summarizedCount"]
+    summarize_until = memory["messageCount"] - CONVERSATION_RECENT_MESSAGES
+    while summarized < summarize_until:
+        messages = get_messages_range(user_id, session_id, summarized, min(CONVERSATION_SUMMARY_BATCH, summarize_until - summarized))
+        if not messages:
+            return
+
+        chunk, tokens = [], 0
+        for m in messages:
+            tokens += estimate_tokens(_turn(m["role"], m["message"]))
+            # Always take at least one message, so the chunk moves forward
+            if chunk and tokens > SUMMARY_CHUNK_TOKENS:
+                break
+            chunk.append(m)
+
+        summary = _summarize(user_id, summary, chunk)
+        if not save_session_summary(user_id, session_id, summary, summarized, summarized + len(chunk)):
+            # Another update got there first
+            return
+        summarized += len(chunk)
+        print(f"🧠 Conversation summary updated for session {session_id} ({summarized} messages)")
+
+
+def schedule_summary_update(user_id: str, session_id: str, message_count: int, summarized_count: int):
+    """
+    Update the rolling summary off the request path, given the session's counts
+    after the latest write; at most one update per session at a time.
+    Nothing is started until a batch of messages is due.
+    """
+    if not _summary_due(message_count, summarized_count):
+        return
+
+    with _summaries_lock:
+        if session_id in _summaries_in_progress:
+            return
+        _summaries_in_progress.add(session_id)
+
+    def run():
+        try:
+            update_summary(user_id, session_id)
+        except Exception as e:
+            print(f"❌ Failed to update conversation summary: {e}")
+        finally:
+            with _summaries_lock:
+                _summaries_in_progress.discard(session_id)
+
+    threading.Thread(target=run, daemon=True).start()
@@ -0,0 +1,230 @@
+"""
+Background cascading deletes.
+Deleting a user's data or a document only records a tombstone job in
+`deletion_jobs` (a document is also hidden from listing and retrieval at once).
+Worker threads claim jobs under a lease, so several processes can share the
+queue, and purge vectors, chunks, messages and sessions in batches, recording
+progress on the job. Failed jobs are retried with exponential backoff.
+Each batch deletes vectors before the Mongo records that reference them, so a
+retried job picks up where the failed attempt stopped.
+"""
+from datetime import datetime, timedelta
+from bson import ObjectId
+from pymongo import ReturnDocument
+from configuration.Database import db, deletion_jobs_collection
+from models.deletion_job import deletion_job_schema
+from lib.vectorDB import get_pinecone_index, get_pinecone_chat_index
+from lib.vector_Store import delete_vectors, delete_vectors_by_filter, delete_chat_session_vectors
+from utils.background_worker import PeriodicWorker
+from config import (
+    DELETION_BATCH_SIZE, DELETION_POLL_INTERVAL, DELETION_LEASE_SECONDS,
+    DELETION_MAX_ATTEMPTS, DELETION_RETRY_BACKOFF
+)
+
+
+class DeletionWorker(PeriodicWorker):
+    thread_name = "deletion-worker"
+
+    def __init__(
+        self,
+        batch_size: int = DELETION_BATCH_SIZE,
+        poll_interval: float = DELETION_POLL_INTERVAL,
+        lease_seconds: float = DELETION_LEASE_SECONDS,
+        max_attempts: int = DELETION_MAX_ATTEMPTS,
+        retry_backoff: float = DELETION_RETRY_BACKOFF
+    ):
+        super().__init__(poll_interval)
+        self.batch_size = batch_size
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+
+    def _tick(self):
+        self.run_pending()
+
+    def _claim(self):
+        """
+        Take the next due job: a pending one, or a running one whose worker's lease ran out.
+        """
+        now = datetime.utcnow()
+        return deletion_jobs_collection.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "runAfter": {"$lte": now}},
+                {"status": "running", "leaseUntil": {"$lt": now}},
+            ]},
+            {
+                "$set": {"status": "running", "leaseUntil": now + timedelta(seconds=self.lease_seconds), "updatedAt": now},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("runAfter", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+
+    def run_pending(self) -> int:
+        """
+        Work through every due job from the calling thread.
+        """
+        done = 0
+        while True:
+            job = self._claim()
+            if job is None:
+                return done
+            self._run(job)
+            done += 1
+
+    def _run(self, job: dict):
+        try:
+            if job["kind"] == "user":
+                self._purge_user(job)
+            elif job["kind"] == "document":
+                self._purge_document(job, ObjectId(job["targetId"]), get_pinecone_index())
+            else:
+                raise ValueError(f"Unknown deletion job kind: {job['kind']}")
+        except Exception as e:
+            now = datetime.utcnow()
+            if job["attempts"] >= self.max_attempts:
+                self.failed += 1
+                print(f"❌ Deletion job {job['_id']} failed after {job['attempts']} attempts: {e}")
+                update = {"status": "failed", "error": str(e), "leaseUntil": None, "updatedAt": now, "finishedAt": now}
+            else:
+                self.retried += 1
+                delay = self.retry_backoff * (2 ** (job["attempts"] - 1))
+                print(f"⚠️ Deletion job {job['_id']} failed ({e}); retrying in {delay:.0f}s")
+                update = {"status": "pending", "error": str(e), "leaseUntil": None, "updatedAt": now,
+                          "runAfter": now + timedelta(seconds=delay)}
+            deletion_jobs_collection.update_one({"_id": job["_id"]}, {"$set": update})
+            return
+
+        now = datetime.utcnow()
+        deletion_jobs_collection.update_one(
+            {"_id": job["_id"]},
+            {"$set": {"status": "done", "error": None, "leaseUntil": None, "updatedAt": now, "finishedAt": now}}
+        )
+        self.completed += 1
+        print(f"🗑️ Deletion job {job['_id']} done: {job['kind']} {job['targetId']}")
+
+    def _progress(self, job: dict, **counts):
+        """
+        Count a finished batch and extend the lease.
+        """
+        now = datetime.utcnow()
+        deletion_jobs_collection.update_one(
+            {"_id": job["_id"]},
+            {
+                "$inc": {f"progress.{name}": value for name, value in counts.items()},
+                "$set": {"leaseUntil": now + timedelta(seconds=self.lease_seconds), "updatedAt": now}
+            }
+        )
+
+    def _purge_user(self, job: dict):
+        options = job.get("options") or {}
+        if options.get("delete_chats"):
+            self._purge_chats(job)
+        if options.get("delete_documents"):
+            index = get_pinecone_index()
+            while True:
+                documents = list(db.documents.find({"user_id": ObjectId(job["userId"])}, {"_id": 1}).limit(self.batch_size))
+                if not documents:
+                    break
+                for document in documents:
+                    self._purge_document(job, document["_id"], index)
+
+    def _purge_chats(self, job: dict):
+        user_id = job["userId"]
+        while True:
+            sessions = list(db.chat_sessions.find({"userId": user_id}, {"sessionId": 1, "messageCount": 1}).limit(self.batch_size))
+            if not sessions:
+                break
+            vectors = delete_chat_session_vectors(sessions)
+            session_ids = [s["sessionId"] for s in sessions]
+            buckets = db.messages.delete_many({"userId": user_id, "sessionId": {"$in": session_ids}}).deleted_count
+            db.chat_sessions.delete_many({"_id": {"$in": [s["_id"] for s in sessions]}})
+            self._progress(job, sessions=len(sessions), message_buckets=buckets, chat_vectors=vectors)
+        # Archived sessions' vectors were deleted when they were archived
+        archived = db.chat_sessions_archive.delete_many({"userId": user_id}).deleted_count
+        archived_buckets = db.messages_archive.delete_many({"userId": user_id}).deleted_count
+        self._progress(job, archived_sessions=archived, archived_message_buckets=archived_buckets)
+        # Vectors written under the older timestamp-based ids
+        delete_vectors_by_filter(get_pinecone_chat_index(), {"userId": user_id})
+
+    def _purge_document(self, job: dict, document_id: ObjectId, index):
+        if db.document_chunks.find_one({"document_id": document_id, "vector_id": None}, {"_id": 1}):
+            # Chunks stored before their vector ids were recorded
+            delete_vectors_by_filter(index, {"documentId": str(document_id)})
+        while True:
+            chunks = list(db.document_chunks.find({"document_id": document_id}, {"vector_id": 1}).limit(self.batch_size))
+            if not chunks:
+                break
+            ids = [c["vector_id"] for c in chunks if c.get("vector_id")]
+            delete_vectors(index, ids)
+            db.document_chunks.delete_many({"_id": {"$in": [c["_id"] for c in chunks]}})
+            self._progress(job, chunks=len(chunks), vectors=len(ids))
+        db.documents.delete_one({"_id": document_id})
+        self._progress(job, documents=1)
+
+    def stats(self) -> dict:
+        return {
+            "running": self.running(),
+            "completed": self.completed,
+            "retried": self.retried,
+            "failed": self.failed,
+        }
+
+
+deletion_worker = DeletionWorker()
+
+
+def _enqueue(data: dict) -> str:
+    job_id = deletion_jobs_collection.insert_one(deletion_job_schema(data)).inserted_id
+    deletion_worker.wake()
+    return str(job_id)
+
+
+def enqueue_user_deletion(user_id: str, requested_by: str, delete_chats: bool, delete_documents: bool) -> str:
+    """
+    Queue the purge of a deleted user's chats and/or documents; returns the job id.
+    """
+    return _enqueue({
+        "kind": "user",
+        "targetId": user_id,
+        "userId": user_id,
+        "requestedBy": requested_by,
+        "options": {"delete_chats": bool(delete_chats), "delete_documents": bool(delete_documents)}
+    })
+
+
+def enqueue_document_deletion(document_id: str, user_id: str):
+    """
+    Hide the user's document from listing and retrieval at once and queue the
+    purge of its chunks and vectors. Returns the job id, or None if the user
+    has no such document.
+    """
+    result = db.documents.update_one(
+        {"_id": ObjectId(document_id), "user_id": ObjectId(user_id), "status": {"$ne": "deleting"}},
+        {"$set": {"status": "deleting", "is_enabled": False}}
+    )
+    if result.matched_count == 0:
+        return None
+    return _enqueue({"kind": "document", "targetId": document_id, "userId": user_id, "requestedBy": user_id})
+
+
+def get_deletion_job(job_id: str):
+    job = deletion_jobs_collection.find_one({"_id": ObjectId(job_id)})
+    if not job:
+        return None
+    return {
+        "_id": str(job["_id"]),
+        "kind": job["kind"],
+        "targetId": job["targetId"],
+        "status": job["status"],
+        "attempts": job["attempts"],
+        "progress": job.get("progress") or {},
+        "error": job.get("error"),
+        "createdAt": job.get("createdAt"),
+        "updatedAt": job.get("updatedAt"),
+        "finishedAt": job.get("finishedAt"),
+    }
@@ -1,9 +1,10 @@
-import requests
 # from config import GEMINI_API_KEY, GEMINI_API_URL
 from utils.api_config_helper import (
     get_gemini_api_key,
     get_gemini_api_url
 )
+from configuration.http_session import build_http_session, session_pool_stats
+from config import LLM_HTTP_POOL_SIZE, LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT
 
 
 class GeminiClient:
@@ -15,9 +16,16 @@ class GeminiClient:
         if not api_url:
             raise ValueError("GEMINI_API_URL is required")
 
+        self.api_key = api_key
+        self.api_url = api_url
         self.headers = {
             "Content-Type": "application/json"
         }
+        self.session = build_http_session(LLM_HTTP_POOL_SIZE)
+        self.timeout = (LLM_CONNECT_TIMEOUT, LLM_READ_TIMEOUT)
+
+    def pool_stats(self) -> list[dict]:
+        return session_pool_stats(self.session)
 
     def generate(
         self,
@@ -42,10 +50,11 @@ class GeminiClient:
             }
         }
 
-        response = requests.post(
+        response = self.session.post(
             f"{self.api_url}?key={self.api_key}",
             headers=self.headers,
-            json=payload
+            json=payload,
+            timeout=self.timeout
         )
         response.raise_for_status()
 
@@ -0,0 +1,214 @@
+"""
+Buffered LLM usage metering.
+Each call is recorded in memory and flushed to MongoDB in batches: raw records go
+to `llm_usage`, and per-day, per-user and per-feature daily rollups in
+`llm_usage_rollups` are maintained incrementally with `$inc`.
+"""
+import atexit
+import threading
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from configuration.Database import llm_usage_collection, llm_usage_rollups_collection
+from models.llm_usage import llm_usage_schema
+from utils.background_worker import PeriodicWorker
+from config import LLM_USAGE_FLUSH_SIZE, LLM_USAGE_FLUSH_INTERVAL
+
+MAX_BUFFERED_RECORDS = 10000
+DUPLICATE_KEY = 11000
+ROLLUP_SUM_FIELDS = ("prompt_tokens", "output_tokens", "total_tokens", "retries", "cost_usd")
+
+
+def _rollup_keys(record):
+    day = record["createdAt"].strftime("%Y-%m-%d")
+    yield "day", "all", day
+    yield "user", record["userId"] or "anonymous", day
+    yield "feature", record["feature"], day
+
+
+def _rollup_ops(batch: list) -> list:
+    """
+    Pre-aggregate a batch per rollup key so each key costs one upsert per flush.
+    """
+    totals = {}
+    for record in batch:
+        for key in _rollup_keys(record):
+            t = totals.setdefault(key, {
+                "inc": {"calls": 0, "errors": 0, "latency_ms_total": 0.0, **{f: 0 for f in ROLLUP_SUM_FIELDS}},
+                "latency_ms_max": 0.0,
+            })
+            t["inc"]["calls"] += 1
+            t["inc"]["errors"] += 0 if record["success"] else 1
+            t["inc"]["latency_ms_total"] += record["latency_ms"]
+            for field in ROLLUP_SUM_FIELDS:
+                t["inc"][field] += record[field]
+            t["latency_ms_max"] = max(t["latency_ms_max"], record["latency_ms"])
+
+    now = datetime.utcnow()
+    return [
+        UpdateOne(
+            {"scope": scope, "key": key, "day": day},
+            {
+                "$inc": t["inc"],
+                "$max": {"latency_ms_max": t["latency_ms_max"]},
+                "$set": {"updatedAt": now},
+            },
+            upsert=True
+        )
+        for (scope, key, day), t in totals.items()
+    ]
+
+
+class UsageMeter(PeriodicWorker):
+    thread_name = "llm-usage-flusher"
+
+    def __init__(self, flush_size: int = LLM_USAGE_FLUSH_SIZE, flush_interval: float = LLM_USAGE_FLUSH_INTERVAL):
+        super().__init__(flush_interval)
+        self.flush_size = flush_size
+        self._flush_lock = threading.Lock()
+        self._buffer = []
+
+        self.recorded = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.flush_errors = 0
+
+    def _reset_after_fork(self):
+        # The parent flushes its own buffered records
+        super()._reset_after_fork()
+        self._buffer = []
+
+    def _tick(self):
+        self.flush()
+
+    def record(self, **data):
+        """
+        Buffer one usage record; never raises into the calling request.
+        """
+        try:
+            self.start()
+            record = llm_usage_schema(data)
+            with self._lock:
+                if len(self._buffer) >= MAX_BUFFERED_RECORDS:
+                    self.dropped += 1
+                    return
+                self._buffer.append(record)
+                self.recorded += 1
+                full = len(self._buffer) >= self.flush_size
+            if full:
+                self.wake()
+        except Exception as e:
+            print(f"⚠️ Failed to record LLM usage: {e}")
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                batch, self._buffer = self._buffer, []
+            if not batch:
+                return 0
+
+            # Records keep the _id insert_many gave them, so a retried record
+            # that did reach the server fails as a duplicate and counts as written
+            try:
+                llm_usage_collection.insert_many(batch, ordered=False)
+                failed = set()
+            except BulkWriteError as e:
+                # The other records were inserted; only the failed ones are retried
+                failed = {
+                    error["index"] for error in e.details.get("writeErrors", [])
+                    if error.get("code") != DUPLICATE_KEY
+                }
+            except Exception as e:
+                print(f"❌ Failed to flush {len(batch)} LLM usage records: {e}")
+                failed = set(range(len(batch)))
+
+            if failed:
+                self.flush_errors += 1
+                retry = [record for i, record in enumerate(batch) if i in failed]
+                with self._lock:
+                    room = max(0, MAX_BUFFERED_RECORDS - len(self._buffer))
+                    self._buffer[:0] = retry[:room]
+                    self.dropped += len(retry) - min(room, len(retry))
+
+            written = [record for i, record in enumerate(batch) if i not in failed]
+            if not written:
+                return 0
+
+            try:
+                llm_usage_rollups_collection.bulk_write(_rollup_ops(written), ordered=False)
+            except Exception as e:
+                self.flush_errors += 1
+                print(f"❌ Failed to update LLM usage rollups: {e}")
+
+            self.flushed += len(written)
+            return len(written)
+
+    def stats(self) -> dict:
+        with self._lock:
+            buffered = len(self._buffer)
+        return {
+            "recorded": self.recorded,
+            "flushed": self.flushed,
+            "buffered": buffered,
+            "dropped": self.dropped,
+            "flush_errors": self.flush_errors,
+        }
+
+
+def _sum_rollups(scope: str, since_day: str, limit: int) -> list:
+    pipeline = [
+        {"$match": {"scope": scope, "day": {"$gte": since_day}}},
+        {"$group": {
+            "_id": "$key",
+            "calls": {"$sum": "$calls"},
+            "errors": {"$sum": "$errors"},
+            "prompt_tokens": {"$sum": "$prompt_tokens"},
+            "output_tokens": {"$sum": "$output_tokens"},
+            "total_tokens": {"$sum": "$total_tokens"},
+            "retries": {"$sum": "$retries"},
+            "cost_usd": {"$sum": "$cost_usd"},
+            "latency_ms_total": {"$sum": "$latency_ms_total"},
+            "latency_ms_max": {"$max": "$latency_ms_max"},
+        }},
+        {"$sort": {"total_tokens": -1}},
+        {"$limit": limit},
+    ]
+    return list(llm_usage_rollups_collection.aggregate(pipeline))
+
+
+def _format_rollup(row: dict) -> dict:
+    calls = row.get("calls") or 0
+    return {
+        "calls": calls,
+        "errors": row.get("errors", 0),
+        "prompt_tokens": row.get("prompt_tokens", 0),
+        "output_tokens": row.get("output_tokens", 0),
+        "total_tokens": row.get("total_tokens", 0),
+        "retries": row.get("retries", 0),
+        "cost_usd": round(row.get("cost_usd", 0), 6),
+        "latency_ms_avg": round(row.get("latency_ms_total", 0) / calls, 1) if calls else 0.0,
+        "latency_ms_max": round(row.get("latency_ms_max", 0), 1),
+    }
+
+
+def get_usage_summary(days: int = 7, limit: int = 20) -> dict:
+    """
+    Usage over the last `days` days from the rollups: one row per day,
+    plus the top users and features by total tokens.
+    """
+    since_day = (datetime.utcnow() - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+
+    daily = llm_usage_rollups_collection.find(
+        {"scope": "day", "key": "all", "day": {"$gte": since_day}}
+    ).sort("day", 1)
+
+    return {
+        "since": since_day,
+        "days": [{"day": d["day"], **_format_rollup(d)} for d in daily],
+        "users": [{"userId": r["_id"], **_format_rollup(r)} for r in _sum_rollups("user", since_day, limit)],
+        "features": [{"feature": r["_id"], **_format_rollup(r)} for r in _sum_rollups("feature", since_day, limit)],
+    }
+
+
+usage_meter = UsageMeter()
+atexit.register(usage_meter.flush)
@@ -0,0 +1,283 @@
+"""
+Per-user, per-day activity rollups for admin analytics.
+Events (new sessions, messages, uploads) are counted in memory per (user, day)
+and flushed periodically as one batched `$inc` per key to `usage_rollups`; a
+`userId: "all"` row per day holds the totals. LLM calls and tokens are read
+from the LLM usage rollups (lib/llmUsage.py), their only source, so both admin
+views report the same numbers. Admin reads only touch rollup rows, never the
+chat or document collections.
+
+Rebuild the rollups from existing data (run from backend/src):
+    python -m lib.usageRollups --rebuild
+"""
+import argparse
+import atexit
+import threading
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from configuration.Database import db, usage_rollups_collection, llm_usage_rollups_collection
+from utils.background_worker import PeriodicWorker
+from config import USAGE_ROLLUP_FLUSH_INTERVAL, USAGE_ROLLUP_MAX_KEYS
+
+ALL_USERS = "all"
+USAGE_COUNTERS = ("sessions", "messages", "questions", "uploads", "chunks")
+# Reported with the activity, from llm_usage_rollups: counter -> rollup field
+LLM_COUNTERS = {"llm_calls": "calls", "prompt_tokens": "prompt_tokens", "output_tokens": "output_tokens", "total_tokens": "total_tokens"}
+
+
+def _day(at: datetime = None) -> str:
+    return (at or datetime.utcnow()).strftime("%Y-%m-%d")
+
+
+def _merge_counts(totals: dict, user_id: str, day: str, counts: dict):
+    """
+    Add `counts` to the user's row and to the day's totals row.
+    """
+    for key in ((user_id, day), (ALL_USERS, day)):
+        row = totals.setdefault(key, {})
+        for counter, value in counts.items():
+            row[counter] = row.get(counter, 0) + value
+
+
+def _rollup_ops(totals: dict, replace: bool = False) -> list:
+    """
+    One upsert per (user, day): `$inc` the counts, or with `replace` overwrite them
+    (and drop the LLM counters rows used to keep).
+    """
+    now = datetime.utcnow()
+    ops = []
+    for (user_id, day), counts in totals.items():
+        if replace:
+            update = {"$set": {**counts, "updatedAt": now}, "$unset": {counter: "" for counter in LLM_COUNTERS}}
+        else:
+            update = {"$inc": counts, "$set": {"updatedAt": now}}
+        ops.append(UpdateOne({"userId": user_id, "day": day}, update, upsert=True))
+    return ops
+
+
+class UsageRollups(PeriodicWorker):
+    thread_name = "usage-rollup-flusher"
+
+    def __init__(self, flush_interval: float = USAGE_ROLLUP_FLUSH_INTERVAL, max_keys: int = USAGE_ROLLUP_MAX_KEYS):
+        super().__init__(flush_interval)
+        self.max_keys = max_keys
+        self._flush_lock = threading.Lock()
+        self._pending = {}
+
+        self.events = 0
+        self.flushed_keys = 0
+        self.flush_errors = 0
+
+    def _reset_after_fork(self):
+        # The parent flushes its own pending counts
+        super()._reset_after_fork()
+        self._pending = {}
+
+    def _tick(self):
+        self.flush()
+
+    def add(self, user_id: str, at: datetime = None, **counts):
+        """
+        Count activity for a user, e.g. add(user_id, messages=2, questions=1).
+        Never raises into the calling request.
+        """
+        try:
+            counts = {counter: value for counter, value in counts.items() if value}
+            if not counts:
+                return
+            self.start()
+            with self._lock:
+                _merge_counts(self._pending, str(user_id or "anonymous"), _day(at), counts)
+                self.events += 1
+                full = len(self._pending) >= self.max_keys
+            if full:
+                self.wake()
+        except Exception as e:
+            print(f"⚠️ Failed to count usage: {e}")
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+            if not pending:
+                return 0
+
+            keys = list(pending)
+            try:
+                usage_rollups_collection.bulk_write(_rollup_ops(pending), ordered=False)
+                failed = []
+            except BulkWriteError as e:
+                # The other upserts were applied; only the failed ones are retried
+                failed = [keys[error["index"]] for error in e.details.get("writeErrors", [])]
+            except Exception as e:
+                print(f"❌ Failed to flush {len(keys)} usage rollups: {e}")
+                failed = keys
+
+            if failed:
+                self.flush_errors += 1
+                # Counts are additive, so they can be merged back and retried on the next flush
+                with self._lock:
+                    for key in failed:
+                        row = self._pending.setdefault(key, {})
+                        for counter, value in pending[key].items():
+                            row[counter] = row.get(counter, 0) + value
+
+            self.flushed_keys += len(keys) - len(failed)
+            return len(keys) - len(failed)
+
+    def stats(self) -> dict:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "events": self.events,
+            "pending_keys": pending,
+            "flushed_keys": self.flushed_keys,
+            "flush_errors": self.flush_errors,
+        }
+
+
+def _format_row(row: dict, llm_row: dict = None) -> dict:
+    llm_row = llm_row or {}
+    return {
+        **{counter: row.get(counter, 0) for counter in USAGE_COUNTERS},
+        **{counter: llm_row.get(field, 0) for counter, field in LLM_COUNTERS.items()},
+    }
+
+
+def _llm_days(key: str, since_day: str) -> dict:
+    """
+    LLM usage rows per day of one user (or of everyone for ALL_USERS).
+    """
+    scope = "day" if key == ALL_USERS else "user"
+    rows = llm_usage_rollups_collection.find({"scope": scope, "key": key, "day": {"$gte": since_day}})
+    return {row["day"]: row for row in rows}
+
+
+def _daily_rows(user_id: str, since_day: str) -> list:
+    """
+    Activity and LLM usage per day, for every day with either.
+    """
+    activity = {row["day"]: row for row in usage_rollups_collection.find({"userId": user_id, "day": {"$gte": since_day}})}
+    llm_days = _llm_days(user_id, since_day)
+    return [
+        {"day": day, **_format_row(activity.get(day, {}), llm_days.get(day))}
+        for day in sorted(set(activity) | set(llm_days))
+    ]
+
+
+def get_activity_summary(days: int = 7, limit: int = 20) -> dict:
+    """
+    Activity over the last `days` days: one totals row per day, plus the most
+    active users by questions asked.
+    """
+    since_day = _day(datetime.utcnow() - timedelta(days=days - 1))
+
+    users = list(usage_rollups_collection.aggregate([
+        {"$match": {"day": {"$gte": since_day}, "userId": {"$ne": ALL_USERS}}},
+        {"$group": {"_id": "$userId", **{counter: {"$sum": f"${counter}"} for counter in USAGE_COUNTERS}}},
+        {"$sort": {"questions": -1, "messages": -1}},
+        {"$limit": limit},
+    ]))
+    llm_users = {
+        row["_id"]: row
+        for row in llm_usage_rollups_collection.aggregate([
+            {"$match": {"scope": "user", "key": {"$in": [u["_id"] for u in users]}, "day": {"$gte": since_day}}},
+            {"$group": {"_id": "$key", **{field: {"$sum": f"${field}"} for field in LLM_COUNTERS.values()}}},
+        ])
+    }
+
+    return {
+        "since": since_day,
+        "days": _daily_rows(ALL_USERS, since_day),
+        "users": [{"userId": u["_id"], **_format_row(u, llm_users.get(u["_id"]))} for u in users],
+    }
+
+
+def get_user_activity(user_id: str, days: int = 30) -> dict:
+    """
+    One user's activity per day over the last `days` days.
+    """
+    since_day = _day(datetime.utcnow() - timedelta(days=days - 1))
+    return {"since": since_day, "userId": user_id, "days": _daily_rows(user_id, since_day)}
+
+
+def _day_of(field: str) -> dict:
+    return {"$dateToString": {"format": "%Y-%m-%d", "date": field}}
+
+
+def _count_messages(collection, totals: dict, match: dict = None):
+    pipeline = [{"$match": match}] if match else []
+    pipeline += [
+        {"$unwind": "$messages"},
+        {"$group": {
+            "_id": {"userId": "$userId", "day": _day_of("$messages.timestamp")},
+            "messages": {"$sum": 1},
+            "questions": {"$sum": {"$cond": [{"$eq": ["$messages.role", "user"]}, 1, 0]}},
+        }},
+    ]
+    for row in collection.aggregate(pipeline):
+        _merge_counts(totals, str(row["_id"]["userId"]), row["_id"]["day"],
+                      {"messages": row["messages"], "questions": row["questions"]})
+
+
+def rebuild_usage_rollups(database=db) -> int:
+    """
+    Recompute every rollup row from the sessions and messages (live and
+    archived) and documents, overwriting the stored counters. Rows with no data
+    behind them any more (e.g. of a purged user) are reset to zero. Increments flushed
+    while this runs can be overwritten, so run it when traffic is light.
+    """
+    totals = {}
+
+    def merge(user_id, day, counts):
+        _merge_counts(totals, str(user_id), day, counts)
+
+    # Archived sessions (lib/chatArchive.py) were counted when they were live
+    for sessions, messages in (
+        (database.chat_sessions, database.messages),
+        (database.chat_sessions_archive, database.messages_archive),
+    ):
+        for row in sessions.aggregate([
+            {"$group": {"_id": {"userId": "$userId", "day": _day_of("$createdAt")}, "sessions": {"$sum": 1}}}
+        ]):
+            merge(row["_id"]["userId"], row["_id"]["day"], {"sessions": row["sessions"]})
+
+        _count_messages(messages, totals)
+        # Sessions not yet migrated to message buckets
+        _count_messages(sessions, totals, {"messages.0": {"$exists": True}})
+
+    chunks = {
+        row["_id"]: row["chunks"]
+        for row in database.document_chunks.aggregate([{"$group": {"_id": "$document_id", "chunks": {"$sum": 1}}}])
+    }
+    for document in database.documents.find({}, {"user_id": 1, "created_at": 1}):
+        merge(document["user_id"], _day(document["created_at"]), {"uploads": 1, "chunks": chunks.get(document["_id"], 0)})
+
+    for row in database.usage_rollups.find({}, {"userId": 1, "day": 1}):
+        totals.setdefault((row["userId"], row["day"]), {})
+    for row in totals.values():
+        for counter in USAGE_COUNTERS:
+            row.setdefault(counter, 0)
+    ops = _rollup_ops(totals, replace=True)
+    for start in range(0, len(ops), 1000):
+        database.usage_rollups.bulk_write(ops[start:start + 1000], ordered=False)
+    return len(ops)
+
+
+usage_rollups = UsageRollups()
+atexit.register(usage_rollups.flush)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the admin usage rollups.")
+    parser.add_argument("--rebuild", action="store_true", help="Recompute all rollups from existing data")
+    args = parser.parse_args()
+    if not args.rebuild:
+        parser.print_help()
+        return
+    print(f"✅ Rebuilt {rebuild_usage_rollups()} usage rollup rows")
+
+
+if __name__ == "__main__":
+    main()
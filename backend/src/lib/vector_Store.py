@@ -1,8 +1,17 @@
+import asyncio
 import time
 import re
+from functools import partial
+from typing import Iterator
 from lib.vectorDB import get_pinecone_index, get_pinecone_chat_index
 from configuration.embedding import EXPECTED_EMBEDDING_DIM, embed_texts
 from configuration.llm_client import llm
+from lib.contextPacker import pack_context
+from utils.deadline import Deadline, DeadlineExceeded
+from config import MAX_CONTEXT_TOKENS, VECTOR_QUERY_TIMEOUT
+
+# Pinecone accepts at most 1000 ids per delete call
+VECTOR_DELETE_BATCH = 1000
 
 
 def is_greeting(query: str) -> bool:
@@ -38,7 +47,7 @@ def store_documents(documents: list, user_id: str, session_id: str):
                 )
 
             vectors.append({
-                "id": generate_vector_id(doc["metadata"]["fileName"], doc["metadata"]["chunkIndex"]),
+                "id": doc["metadata"].get("vectorId") or generate_vector_id(doc["metadata"]["fileName"], doc["metadata"]["chunkIndex"]),
                 "values": embeddings[i],
                 "metadata": {
                     "fileName": doc["metadata"]["fileName"],
@@ -63,48 +72,97 @@ def store_documents(documents: list, user_id: str, session_id: str):
         print(f"❌ Error storing documents: {e}")
         return {"success": False, "error": str(e)}
 
-def save_message_to_vector_store(user_id: str, session_id: str, role: str, message: str):
+def generate_chat_message_vector_id(session_id: str, index: int) -> str:
+    # Deterministic, so retried upserts overwrite instead of duplicating
+    return f"{session_id}-msg-{index}"
+
+def build_chat_message_vectors(messages: list) -> list:
     """
-    Save a single chat message as a vector in Pinecone only (no MongoDB storage).
+    Chat index vectors for messages given as dicts with userId, sessionId, index,
+    role and message. All texts are embedded in one batch.
     """
-    try:
-        index = get_pinecone_chat_index()
-        print(f"💬 Generating embedding for chat message...")
-
-        # Batch embedding even for single message (validates shape)
-        vector = embed_texts([message])[0]
-
-        vector_id = generate_chat_vector_id(session_id)
-        payload = {
-            "id": vector_id,
+    vectors = embed_texts([m["message"] for m in messages])
+    return [
+        {
+            "id": generate_chat_message_vector_id(m["sessionId"], m["index"]),
             "values": vector,
             "metadata": {
-                "userId": user_id,
-                "sessionId": session_id,
-                "role": role,
-                "text": message[:1000],
-                "createdAt": time.time()
+                "userId": m["userId"],
+                "sessionId": m["sessionId"],
+                "role": m["role"],
+                "text": m["message"][:1000],
+                "createdAt": m.get("createdAt") or time.time()
             }
         }
+        for m, vector in zip(messages, vectors)
+    ]
 
-        index.upsert([payload])
-        print(f"🚀 Message vector saved with id: {vector_id}")
+def upsert_chat_message_vectors(vectors: list):
+    """
+    Upsert chat message vectors in one call. Raises on failure so callers can retry.
+    """
+    get_pinecone_chat_index().upsert(vectors=vectors)
 
-        return {"success": True, "id": vector_id}
+def delete_vectors(index, ids: list):
+    """
+    Delete vectors by id, in calls of at most VECTOR_DELETE_BATCH ids. Raises on failure.
+    """
+    for start in range(0, len(ids), VECTOR_DELETE_BATCH):
+        index.delete(ids=ids[start:start + VECTOR_DELETE_BATCH])
 
+def delete_vectors_by_filter(index, filter: dict):
+    """
+    Fallback for vectors written before their ids were recorded or derived.
+    Some index types don't support deleting by filter, so this is best effort.
+    """
+    try:
+        index.delete(filter=filter)
     except Exception as e:
-        print(f"❌ Error saving message to vector store: {e}")
-        return {"success": False, "error": str(e)}
+        print(f"⚠️ Pinecone delete by filter {filter} failed: {e}")
+
+def delete_chat_session_vectors(sessions: list) -> int:
+    """
+    Delete the chat index vectors of sessions given as dicts with sessionId and
+    messageCount. Raises on failure so callers can retry; returns the ids deleted.
+    """
+    ids = [
+        generate_chat_message_vector_id(s["sessionId"], i)
+        for s in sessions for i in range(s.get("messageCount") or 0)
+    ]
+    if ids:
+        delete_vectors(get_pinecone_chat_index(), ids)
+    return len(ids)
+
+def _query_index(index, deadline: Deadline = None, **query):
+    """
+    Query a Pinecone index. With a deadline, the query timeout is sized from
+    the remaining budget and running out of it raises DeadlineExceeded.
+    """
+    if deadline is None:
+        return index.query(**query)
 
-def search_similar_documents(query: str, user_id: str, session_id: str, limit=5):
+    deadline.check("the vector search")
+    try:
+        return index.query(timeout=deadline.timeout(VECTOR_QUERY_TIMEOUT), **query)
+    except Exception as e:
+        if deadline.expired():
+            raise DeadlineExceeded(f"Request deadline of {deadline.budget:.1f}s exceeded during the vector search") from e
+        raise
+
+def search_similar_documents(query: str, user_id: str, session_id: str, limit=5, query_vector: list = None, deadline: Deadline = None):
     """
     Single Pinecone query with hybrid reranking.
+    Pass `query_vector` to reuse an embedding of `query` that was already computed.
+    Raises DeadlineExceeded if `deadline` runs out; other errors are returned.
     """
     index = get_pinecone_index()
     try:
-        query_vector = embed_texts([query])[0]
+        if query_vector is None:
+            query_vector = embed_texts([query])[0]
 
-        search_response = index.query(
+        search_response = _query_index(
+            index,
+            deadline,
             vector=query_vector,
             top_k=50,
             include_metadata=True,
@@ -138,10 +196,41 @@ def search_similar_documents(query: str, user_id: str, session_id: str, limit=5)
             "message": f"Found {len(top_matches)} relevant matches"
         }
 
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"❌ Error searching documents: {e}")
         return {"success": False, "error": str(e), "matches": []}
 
+def search_session_messages(query_vector: list, user_id: str, session_id: str, limit: int = 3, deadline: Deadline = None) -> list:
+    """
+    Recall the chat messages of one session most similar to the query vector.
+    """
+    try:
+        index = get_pinecone_chat_index()
+        response = _query_index(
+            index,
+            deadline,
+            vector=query_vector,
+            top_k=limit,
+            include_metadata=True,
+            include_values=False,
+            filter={"userId": user_id, "sessionId": session_id}
+        )
+        return [
+            {
+                "role": match.metadata.get("role", "user"),
+                "message": match.metadata.get("text", ""),
+                "score": match.score
+            }
+            for match in response.matches
+        ]
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"❌ Error searching session messages: {e}")
+        return []
+
 def calculate_keyword_relevance(text: str, query: str) -> float:
     stop_words = {"what", "how", "when", "where", "which", "with", "from", "the", "and", "for"}
     query_keywords = [w.lower() for w in re.findall(r'\b\w+\b', query)
@@ -151,47 +240,18 @@ def calculate_keyword_relevance(text: str, query: str) -> float:
     score = sum(len(re.findall(rf'\b{re.escape(kw)}\b', text.lower())) for kw in query_keywords)
     return score / len(query_keywords)
 
-def answer_question(query: str, user_id: str, session_id: str, top_k: int = 5, max_context_chars: int = 4000) -> str:
-    """
-    Retrieves top relevant documents from Pinecone, constructs a context, 
-    and asks the LLM (Gemini) to answer based only on the retrieved context.
+NO_CONTEXT_ANSWER = "I couldn't find relevant information in your uploaded documents for that question."
+LLM_ERROR_ANSWER = "I couldn't generate an answer at this time. Please try again later."
+GREETING_ANSWER = "Hi! 👋 How can I help you?"
 
-    Args:
-        query: User question
-        user_id: ID of the user
-        session_id: Current chat session
-        top_k: Number of top documents to retrieve
-        max_context_chars: Maximum characters of context to send to LLM
-
-    Returns:
-        str: LLM-generated answer or fallback message
+def build_answer_messages(query: str, matches: list, max_context_tokens: int = MAX_CONTEXT_TOKENS, conversation: str = "") -> list:
     """
-    
-    if is_greeting(query):
-       return "Hi! 👋 How can I help you?"
-
-    search_result = search_similar_documents(query, user_id, session_id, limit=top_k)
-    matches = search_result.get("matches", [])
-
-    if not matches:
-        return "I couldn't find relevant information in your uploaded documents for that question."
-
-    # 2️⃣ Rerank matches using hybridScore descending
-    matches.sort(key=lambda x: x.get("hybridScore", 0), reverse=True)
-
-    # 3️⃣ Build context safely
-    context_parts = []
-    chars_used = 0
-    for m in matches:
-        text = m.get("text", "")
-        if not text:
-            continue
-        if chars_used + len(text) > max_context_chars:
-            break
-        context_parts.append(f"- {text}")
-        chars_used += len(text)
-
-    context = "\n\n".join(context_parts)
+    Pack the matches into a token-budgeted context and build the LLM messages.
+    `conversation` is the already-budgeted conversation memory, if any.
+    """
+    # Merge adjacent chunks and pack them best-fit into the token budget
+    context, context_tokens = pack_context(matches, max_context_tokens)
+    print(f"🧩 Packed {context_tokens}/{max_context_tokens} context tokens")
 
     messages = [
 {
@@ -222,7 +282,8 @@ def answer_question(query: str, user_id: str, session_id: str, top_k: int = 5, m
 {
   "role": "user",
   "content": (
-      f"Context:\n{context}\n\n"
+      (f"Conversation so far (use only to resolve references in the question):\n{conversation}\n\n" if conversation else "")
+      + f"Context:\n{context}\n\n"
       f"Question:\n{query}\n\n"
       "Answer concisely using only the context.\n"
       "- Key points only\n"
@@ -232,14 +293,116 @@ def answer_question(query: str, user_id: str, session_id: str, top_k: int = 5, m
 }
          ]
 
+    return messages
+
+def answer_question(query: str, user_id: str, session_id: str, top_k: int = 5, max_context_tokens: int = MAX_CONTEXT_TOKENS, matches: list = None, conversation: str = "", deadline: Deadline = None) -> str:
+    """
+    Retrieves top relevant documents from Pinecone, constructs a context, 
+    and asks the LLM (Gemini) to answer based only on the retrieved context.
+
+    Args:
+        query: User question
+        user_id: ID of the user
+        session_id: Current chat session
+        top_k: Number of top documents to retrieve
+        max_context_tokens: Token budget for the context sent to the LLM
+        matches: Already-retrieved matches; when given, the search is skipped
+        conversation: Conversation memory to include in the prompt
+        deadline: Request deadline; DeadlineExceeded is raised rather than answered with a fallback
+
+    Returns:
+        str: LLM-generated answer or fallback message
+    """
+    
+    if is_greeting(query):
+       return GREETING_ANSWER
+
+    if matches is None:
+        search_result = search_similar_documents(query, user_id, session_id, limit=top_k, deadline=deadline)
+        matches = search_result.get("matches", [])
+
+    if not matches:
+        return NO_CONTEXT_ANSWER
+
+    messages = build_answer_messages(query, matches, max_context_tokens, conversation)
 
     try:
-        response = llm.chat_completion(messages=messages)
+        response = llm.chat_completion(messages=messages, user_id=user_id, feature="rag_answer", deadline=deadline)
         answer = response["choices"][0]["message"]["content"].strip()
         if not answer:
-            return "I couldn't find relevant information in your uploaded documents for that question."
+            return NO_CONTEXT_ANSWER
         return answer
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         print(f"❌ LLM error: {e}")
-        return "I couldn't generate an answer at this time. Please try again later."
+        return LLM_ERROR_ANSWER
 
+async def answer_question_async(query: str, user_id: str, session_id: str, top_k: int = 5, max_context_tokens: int = MAX_CONTEXT_TOKENS, matches: list = None, conversation: str = "", deadline: Deadline = None) -> str:
+    """
+    asyncio variant of answer_question. Embedding, vector search and tokenization
+    run in the loop's executor; the LLM call is awaited without holding a thread.
+    """
+    if is_greeting(query):
+        return GREETING_ANSWER
+
+    loop = asyncio.get_running_loop()
+    if matches is None:
+        search_result = await loop.run_in_executor(
+            None, partial(search_similar_documents, query, user_id, session_id, limit=top_k, deadline=deadline)
+        )
+        matches = search_result.get("matches", [])
+
+    if not matches:
+        return NO_CONTEXT_ANSWER
+
+    messages = await loop.run_in_executor(None, build_answer_messages, query, matches, max_context_tokens, conversation)
+
+    try:
+        response = await llm.achat_completion(messages=messages, user_id=user_id, feature="rag_answer", deadline=deadline)
+        answer = response["choices"][0]["message"]["content"].strip()
+        if not answer:
+            return NO_CONTEXT_ANSWER
+        return answer
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"❌ LLM error: {e}")
+        return LLM_ERROR_ANSWER
+
+def answer_question_stream(query: str, user_id: str, session_id: str, top_k: int = 5, max_context_tokens: int = MAX_CONTEXT_TOKENS, matches: list = None, conversation: str = "", deadline: Deadline = None) -> Iterator[str]:
+    """
+    Streaming variant of answer_question: yields answer fragments as the LLM produces them.
+    Fallback messages are yielded as a single fragment. An LLM error after the first
+    fragment is re-raised, since the partial answer has already been sent.
+    """
+    if is_greeting(query):
+        yield GREETING_ANSWER
+        return
+
+    if matches is None:
+        search_result = search_similar_documents(query, user_id, session_id, limit=top_k, deadline=deadline)
+        matches = search_result.get("matches", [])
+
+    if not matches:
+        yield NO_CONTEXT_ANSWER
+        return
+
+    messages = build_answer_messages(query, matches, max_context_tokens, conversation)
+
+    emitted = False
+    try:
+        for fragment in llm.chat_completion_stream(messages=messages, user_id=user_id, feature="rag_answer_stream", deadline=deadline):
+            emitted = True
+            yield fragment
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        print(f"❌ LLM stream error: {e}")
+        if emitted:
+            raise
+        yield LLM_ERROR_ANSWER
+        return
+
+    if not emitted:
+        yield NO_CONTEXT_ANSWER
@@ -1,4 +1,8 @@
 from datetime import datetime
+from pymongo import DESCENDING
+
+# Session list order: most recently updated first
+SESSION_LIST_SORT = [("updatedAt", DESCENDING), ("_id", DESCENDING)]
 
 def message_schema(data):
     return {
@@ -8,12 +12,50 @@ def message_schema(data):
     }
 
 
+SESSION_TITLE_CHARS = 80
+
+
+def session_title(message: str) -> str:
+    """
+    Short preview of a session's first message, shown in the session list.
+    """
+    text = " ".join((message or "").split())
+    return text if len(text) <= SESSION_TITLE_CHARS else text[:SESSION_TITLE_CHARS - 1] + "…"
+
+
 def chat_session_schema(data):
+    """
+    Session metadata only; messages live in `messages` bucket documents.
+    """
     return {
         "userId": data["userId"],     
         "sessionId": data["sessionId"], 
-        "messages": data.get("messages", []),
+        "title": data.get("title", ""),
+        "messageCount": data.get("messageCount", 0),
         "is_active": True,
         "createdAt": datetime.utcnow(),
         "updatedAt": datetime.utcnow()
     }
+
+
+def message_bucket_id(session_ref, seq: int) -> str:
+    """
+    Deterministic bucket id, so concurrent upserts of a new bucket can't create duplicates.
+    """
+    return f"{session_ref}:{seq}"
+
+
+def message_bucket_schema(data):
+    """
+    One fixed-size bucket of a session's messages, in index order.
+    """
+    now = datetime.utcnow()
+    return {
+        "_id": message_bucket_id(data["sessionRef"], data["seq"]),
+        "userId": data["userId"],
+        "sessionId": data["sessionId"],
+        "seq": data["seq"],
+        "messages": data.get("messages", []),
+        "createdAt": now,
+        "updatedAt": now
+    }
@@ -0,0 +1,25 @@
+from datetime import datetime
+
+
+def deletion_job_schema(data):
+    """
+    Tombstone for a cascading delete, worked through in batches by lib.deletionJobs.
+    `userId` is the owner of the data; `targetId` is the user or document being deleted.
+    """
+    now = datetime.utcnow()
+    return {
+        "kind": data["kind"],
+        "targetId": data["targetId"],
+        "userId": data["userId"],
+        "requestedBy": data.get("requestedBy"),
+        "options": data.get("options", {}),
+        "status": "pending",
+        "attempts": 0,
+        "progress": {},
+        "error": None,
+        "runAfter": now,
+        "leaseUntil": None,
+        "createdAt": now,
+        "updatedAt": now,
+        "finishedAt": None
+    }
@@ -8,5 +8,6 @@ def document_chunk_schema(data):
         "document_id": document_id,
         "chunk_index": data["chunk_index"],
         "content": data["content"],
-        "embedding": data.get("embedding")
+        "embedding": data.get("embedding"),
+        "vector_id": data.get("vector_id")
     }
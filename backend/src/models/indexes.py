@@ -0,0 +1,188 @@
+"""
+Required MongoDB indexes, declared per collection next to the schemas, and the
+hot query shapes they serve.
+
+ensure_indexes() creates them idempotently (create_indexes is a no-op for an
+index that already exists), replaces an existing index whose uniqueness was
+changed here, and runs at app startup unless MONGO_ENSURE_INDEXES is off. report_collection_scans() explains each hot query and lists the ones
+the planner would still answer with a collection scan.
+
+Run from backend/src:
+    python -m models.indexes            # ensure indexes, backfill new user fields
+    python -m models.indexes --explain  # ensure, then report collection scans
+"""
+import argparse
+from datetime import datetime
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from models.chat_session import SESSION_LIST_SORT
+
+REQUIRED_INDEXES = {
+    "users": [
+        # Login and registration look users up by email
+        IndexModel([("email", ASCENDING)], name="email"),
+        # Admin user list
+        IndexModel([("created_at", DESCENDING)], name="created_at"),
+        # Admin user search: prefix match on lowercased names and email
+        IndexModel([("search_keys", ASCENDING)], name="search_keys"),
+    ],
+    "chat_sessions": [
+        # Every chat turn: find/allocate by session. Unique, so concurrent first
+        # turns of a session can't create it twice (lib/chatSession.save_messages)
+        IndexModel([("userId", ASCENDING), ("sessionId", ASCENDING)], name="user_session", unique=True),
+        # Chat limit windows, per-user session counts
+        IndexModel([("userId", ASCENDING), ("createdAt", ASCENDING)], name="user_created"),
+        # Session list: equality on userId/is_active, then the sort order
+        IndexModel([("userId", ASCENDING), ("is_active", ASCENDING)] + SESSION_LIST_SORT, name="session_list"),
+        # Archival: only deleted sessions are indexed
+        IndexModel([("updatedAt", ASCENDING)], name="inactive_updated", partialFilterExpression={"is_active": False}),
+    ],
+    "chat_sessions_archive": [
+        IndexModel([("userId", ASCENDING)], name="user"),
+    ],
+    "messages_archive": [
+        IndexModel([("userId", ASCENDING)], name="user"),
+    ],
+    "messages": [
+        # Buckets are read by _id; deleting a user's chats goes by userId
+        IndexModel([("userId", ASCENDING)], name="user"),
+    ],
+    "documents": [
+        # Retrieval scope for every question
+        IndexModel([("user_id", ASCENDING), ("is_enabled", ASCENDING)], name="user_enabled"),
+        # Document list, newest first
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING)], name="user_created"),
+    ],
+    "document_chunks": [
+        IndexModel([("document_id", ASCENDING)], name="document"),
+    ],
+    "deletion_jobs": [
+        # Workers claim the oldest due job
+        IndexModel([("status", ASCENDING), ("runAfter", ASCENDING)], name="status_run_after"),
+    ],
+    "api_config": [
+        IndexModel([("key_name", ASCENDING), ("is_active", ASCENDING)], name="key_name_active"),
+    ],
+    "usage_rollups": [
+        # One row per (user, day); flushes upsert by it, per-user activity reads ranges of it
+        IndexModel([("userId", ASCENDING), ("day", ASCENDING)], name="user_day", unique=True),
+        # Top users over a range of days
+        IndexModel([("day", ASCENDING)], name="day"),
+    ],
+    "llm_usage_rollups": [
+        # Rollup upserts on every flush, and the usage summary's day ranges
+        IndexModel([("scope", ASCENDING), ("day", ASCENDING), ("key", ASCENDING)], name="scope_day_key"),
+    ],
+}
+
+# (collection, filter, sort) of the queries on the request path, with placeholder values
+HOT_QUERIES = [
+    ("users", {"email": ""}, None),
+    ("users", {"role": {"$ne": "admin"}}, [("created_at", DESCENDING)]),
+    ("users", {"role": {"$ne": "admin"}, "search_keys": {"$regex": "^a"}}, None),
+    ("chat_sessions", {"userId": "", "sessionId": ""}, None),
+    ("chat_sessions", {"userId": "", "createdAt": {"$gte": datetime(1970, 1, 1)}}, None),
+    ("chat_sessions", {"userId": "", "is_active": True}, SESSION_LIST_SORT),
+    ("chat_sessions", {"is_active": False, "updatedAt": {"$lt": datetime(1970, 1, 1)}}, None),
+    ("messages", {"userId": ""}, None),
+    ("documents", {"user_id": ObjectId(), "is_enabled": True}, None),
+    ("documents", {"user_id": ObjectId()}, [("created_at", DESCENDING)]),
+    ("document_chunks", {"document_id": ObjectId()}, None),
+    ("deletion_jobs", {"status": "pending", "runAfter": {"$lte": datetime(1970, 1, 1)}}, [("runAfter", ASCENDING)]),
+    ("api_config", {"key_name": "", "is_active": True}, None),
+    ("usage_rollups", {"userId": "all", "day": {"$gte": ""}}, [("day", ASCENDING)]),
+    ("usage_rollups", {"day": {"$gte": ""}, "userId": {"$ne": "all"}}, None),
+    ("llm_usage_rollups", {"scope": "day", "key": "all", "day": {"$gte": ""}}, [("day", ASCENDING)]),
+    ("llm_usage_rollups", {"scope": "user", "key": {"$in": [""]}, "day": {"$gte": ""}}, None),
+]
+
+
+def _drop_changed_indexes(collection, indexes: list):
+    """
+    Drop existing indexes whose `unique` option differs from the declared one;
+    Mongo won't change an index's options in place.
+    """
+    existing = collection.index_information()
+    for index in indexes:
+        spec = index.document
+        current = existing.get(spec["name"])
+        if current is not None and bool(current.get("unique")) != bool(spec.get("unique")):
+            collection.drop_index(spec["name"])
+            print(f"🔁 Rebuilding index {collection.name}.{spec['name']} (unique={bool(spec.get('unique'))})")
+
+
+def ensure_indexes(db) -> dict:
+    """
+    Create any missing required index. A failure on one collection
+    (e.g. a conflicting index with the same name, or duplicates under a new
+    unique index) doesn't stop the others.
+    """
+    created, failed = {}, {}
+    for collection, indexes in REQUIRED_INDEXES.items():
+        try:
+            _drop_changed_indexes(db[collection], indexes)
+            created[collection] = db[collection].create_indexes(indexes)
+        except Exception as e:
+            failed[collection] = str(e)
+            print(f"⚠️ Could not create indexes on {collection}: {e}")
+    return {"success": not failed, "created": created, "failed": failed}
+
+
+def _plan_stages(plan: dict):
+    if not isinstance(plan, dict):
+        return
+    if "stage" in plan:
+        yield plan["stage"]
+    for key in ("inputStage", "queryPlan"):
+        yield from _plan_stages(plan.get(key))
+    for child in plan.get("inputStages") or []:
+        yield from _plan_stages(child)
+    # Sharded clusters report one winning plan per shard
+    for shard in plan.get("shards") or []:
+        yield from _plan_stages(shard.get("winningPlan"))
+
+
+def report_collection_scans(db) -> list:
+    """
+    Explain every hot query and return the ones whose winning plan is a
+    collection scan. Queries that can't be explained are reported with the error.
+    """
+    scans = []
+    for collection, flt, sort in HOT_QUERIES:
+        cursor = db[collection].find(flt)
+        if sort:
+            cursor = cursor.sort(sort)
+        try:
+            plan = cursor.explain().get("queryPlanner", {}).get("winningPlan", {})
+        except Exception as e:
+            scans.append({"collection": collection, "filter": str(flt), "error": str(e)})
+            continue
+        if "COLLSCAN" in set(_plan_stages(plan)):
+            scans.append({"collection": collection, "filter": str(flt), "sort": str(sort)})
+    for scan in scans:
+        if "error" in scan:
+            print(f"⚠️ Could not explain {scan['collection']} {scan['filter']}: {scan['error']}")
+        else:
+            print(f"🐢 Collection scan: {scan['collection']} {scan['filter']} sort={scan['sort']}")
+    return scans
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Create the required MongoDB indexes.")
+    parser.add_argument("--explain", action="store_true", help="Report hot queries that still scan a whole collection")
+    args = parser.parse_args()
+
+    from configuration.Database import db
+    from models.user import backfill_user_fields
+
+    result = ensure_indexes(db)
+    backfill_user_fields(db)
+    for collection, names in result["created"].items():
+        print(f"✅ {collection}: {', '.join(names)}")
+    if args.explain and not report_collection_scans(db):
+        print("✅ No collection scans in the hot queries")
+    raise SystemExit(0 if result["success"] else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,23 @@
+from datetime import datetime
+from config import DEFAULT_TOKEN_COST_PER_1K_USD
+
+
+def llm_usage_schema(data):
+    """
+    One metered LLM call.
+    """
+    total_tokens = int(data.get("total_tokens") or 0)
+    return {
+        "userId": data.get("userId"),
+        "feature": data.get("feature") or "unknown",
+        "provider": data.get("provider"),
+        "prompt_tokens": int(data.get("prompt_tokens") or 0),
+        "output_tokens": int(data.get("output_tokens") or 0),
+        "total_tokens": total_tokens,
+        "prompt_chars": int(data.get("prompt_chars") or 0),
+        "latency_ms": float(data.get("latency_ms") or 0),
+        "retries": int(data.get("retries") or 0),
+        "success": bool(data.get("success", True)),
+        "cost_usd": total_tokens / 1000 * DEFAULT_TOKEN_COST_PER_1K_USD,
+        "createdAt": data.get("createdAt", datetime.utcnow()),
+    }
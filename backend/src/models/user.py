@@ -1,5 +1,16 @@
 from datetime import datetime
 
+
+def user_search_keys(first_name: str, last_name: str, email: str) -> list:
+    """
+    Lowercased values the admin user search matches by prefix (see route.admin).
+    """
+    first_name = (first_name or "").strip().lower()
+    last_name = (last_name or "").strip().lower()
+    keys = [(email or "").lower(), first_name, last_name, f"{first_name} {last_name}".strip()]
+    return list(dict.fromkeys(key for key in keys if key))
+
+
 def user_schema(data):
     now = datetime.utcnow()
     return {
@@ -16,5 +27,37 @@ def user_schema(data):
         "usage_start_time": data.get("usage_start_time"),           
         "usage_end_time": data.get("usage_end_time"),
         "chat_count": 0,   
+        "chat_count_window": None,
         "chat_count_reset_at": now,
+        "chat_sessions_total": 0,
+        "search_keys": user_search_keys(data["firstName"], data["lastName"], data["email"]),
+    }
+
+
+def backfill_user_fields(db) -> int:
+    """
+    Set search_keys and chat_sessions_total on users created before they existed.
+    Users without search_keys haven't been backfilled; the search_keys index finds them.
+    """
+    users = list(db.users.find({"search_keys": {"$exists": False}}, {"firstName": 1, "lastName": 1, "email": 1}))
+    if not users:
+        return 0
+
+    user_ids = [str(user["_id"]) for user in users]
+    totals = {
+        row["_id"]: row["count"]
+        for row in db.chat_sessions.aggregate([
+            {"$match": {"userId": {"$in": user_ids}}},
+            {"$group": {"_id": "$userId", "count": {"$sum": 1}}}
+        ])
     }
+    for user in users:
+        db.users.update_one(
+            {"_id": user["_id"], "search_keys": {"$exists": False}},
+            {"$set": {
+                "search_keys": user_search_keys(user.get("firstName"), user.get("lastName"), user.get("email")),
+                "chat_sessions_total": totals.get(str(user["_id"]), 0)
+            }}
+        )
+    print(f"✅ Backfilled search keys and session totals for {len(users)} users")
+    return len(users)
@@ -1,17 +1,32 @@
+import os
+import re
 from bson import ObjectId
 from flask import Blueprint, jsonify, request
 from datetime import datetime
 from configuration.Database import (
-    chat_sessions_collection,
-    documents_collection,
     users_collection,
     api_config_collection,
 )
 from core.user_auth import jwt_required, require_role
 from models.api_config import api_config_schema
+from configuration.llm_client import llm
+from lib.llmUsage import usage_meter, get_usage_summary
+from lib.usageRollups import usage_rollups, get_activity_summary, get_user_activity
+from lib.chatVectorWriter import chat_vector_writer
+from lib.deletionJobs import deletion_worker, enqueue_user_deletion, get_deletion_job
+from lib.chatArchive import chat_archiver
+from configuration.client_registry import provider_clients
 from utils.encryption import encrypt_value, decrypt_value
+from utils.user_context import invalidate_user_context
+from utils.api_config_helper import bump_config_version
 
 
+USER_LIST_FIELDS = {
+    "firstName": 1, "lastName": 1, "email": 1, "phone": 1, "role": 1, "is_active": 1,
+    "created_at": 1, "chat_limit": 1, "usage_time_window": 1, "usage_start_time": 1,
+    "usage_end_time": 1, "chat_sessions_total": 1
+}
+
 admin_bp = Blueprint("admin", __name__)
 @admin_bp.route("/admin/users", methods=["GET"])
 @jwt_required
@@ -19,7 +34,7 @@ admin_bp = Blueprint("admin", __name__)
 def admin_list_users(user_id, **kwargs):
     """
     List all users with their details.
-    Query params: page, limit, search (email/name search)
+    Query params: page, limit, search (prefix of the email, first name, last name or full name)
     """
     try:
         page = int(request.args.get("page", 1))
@@ -28,26 +43,24 @@ def admin_list_users(user_id, **kwargs):
         
         skip = (page - 1) * limit
         
-        # Build query for search
         query = {"role": {"$ne": "admin"}}
         if search:
-            query = {
-                "$or": [
-                    {"email": {"$regex": search, "$options": "i"}},
-                    {"firstName": {"$regex": search, "$options": "i"}},
-                    {"lastName": {"$regex": search, "$options": "i"}},
-                ]
-            }
-        
-        total = users_collection.count_documents(query)
-        
-        users = users_collection.find(query).sort("created_at", -1).skip(skip).limit(limit)
+            # Anchored prefix match on the lowercased keys, so the search_keys index applies
+            query["search_keys"] = {"$regex": f"^{re.escape(search)}"}
+        
+        # One round trip: the page and the total, with each user's precomputed session count
+        result = next(users_collection.aggregate([
+            {"$match": query},
+            {"$sort": {"created_at": -1}},
+            {"$facet": {
+                "total": [{"$count": "count"}],
+                "users": [{"$skip": skip}, {"$limit": limit}, {"$project": USER_LIST_FIELDS}],
+            }}
+        ]), {"total": [], "users": []})
+        total = result["total"][0]["count"] if result["total"] else 0
         
         user_list = []
-        for user in users:
-            # Get chat statistics for this user
-            chat_count = chat_sessions_collection.count_documents({"userId": str(user["_id"])})
-            
+        for user in result["users"]:
             user_list.append({
                 "_id": str(user["_id"]),
                 "firstName": user.get("firstName"),
@@ -61,7 +74,7 @@ def admin_list_users(user_id, **kwargs):
                 "usage_time_window": user.get("usage_time_window"),
                 "usage_start_time": user.get("usage_start_time"),
                 "usage_end_time": user.get("usage_end_time"),
-                "total_chat_sessions": chat_count,
+                "total_chat_sessions": user.get("chat_sessions_total") or 0,
             })
         
         return jsonify({
@@ -99,23 +112,46 @@ def admin_delete_user(target_user_id, **kwargs):
         if user.get("role", "user").lower() == "admin":
             return jsonify({"success": False, "error": "Cannot delete admin users"}), 403
         
-        if delete_chats:
-            chat_sessions_collection.delete_many({"userId": target_user_id})
-        
-        if delete_documents:
-            documents_collection.delete_many({"user_id": target_user_id})
-        
         # Delete the user
         result = users_collection.delete_one({"_id": ObjectId(target_user_id)})
+        invalidate_user_context(target_user_id)
         
         if result.deleted_count == 0:
             return jsonify({"success": False, "error": "Failed to delete user"}), 500
         
+        if not (delete_chats or delete_documents):
+            return jsonify({
+                "success": True,
+                "message": "User deleted successfully",
+                "userId": target_user_id,
+            }), 200
+        
+        # Their chats and documents are purged in the background
+        job_id = enqueue_user_deletion(target_user_id, kwargs.get("user_id"), delete_chats, delete_documents)
         return jsonify({
             "success": True,
-            "message": "User deleted successfully",
+            "message": "User deleted successfully; their data is being removed",
             "userId": target_user_id,
-        }), 200
+            "deletionJobId": job_id,
+        }), 202
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_bp.route("/admin/deletion-jobs/<job_id>", methods=["GET"])
+@jwt_required
+@require_role("admin")
+def admin_deletion_job(job_id, **kwargs):
+    """
+    Status and progress of a background deletion job.
+    """
+    try:
+        if not ObjectId.is_valid(job_id):
+            return jsonify({"success": False, "error": "Invalid job id"}), 400
+        job = get_deletion_job(job_id)
+        if not job:
+            return jsonify({"success": False, "error": "Deletion job not found"}), 404
+        return jsonify({"success": True, "job": job}), 200
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
 
@@ -148,6 +184,7 @@ def admin_toggle_user(target_user_id, **kwargs):
                 "updated_at": datetime.utcnow()
             }}
         )
+        invalidate_user_context(target_user_id)
 
         if result.matched_count == 0:
             return jsonify({"success": False, "error": "User not found"}), 404
@@ -190,10 +227,14 @@ def admin_set_chat_limits(target_user_id, **kwargs):
             if window not in valid_windows:
                 return jsonify({"success": False, "error": f"usage_time_window must be one of: {valid_windows}"}), 400
             update_data["usage_time_window"] = window
+            if window != user.get("usage_time_window"):
+                # Re-seed the session counter for the new window from chat_sessions
+                update_data["chat_count_window"] = None
         result = users_collection.update_one(
             {"_id": ObjectId(target_user_id)},
             {"$set": update_data}
         )
+        invalidate_user_context(target_user_id)
         
         if result.matched_count == 0:
             return jsonify({"success": False, "error": "User not found"}), 404
@@ -275,6 +316,7 @@ def admin_create_api_config(user_id, **kwargs):
         })
         
         result = api_config_collection.insert_one(config_data)
+        bump_config_version()
         config_data["_id"] = str(result.inserted_id)
         config_data.pop("created_by")
         
@@ -323,6 +365,7 @@ def admin_update_api_config(user_id, config_id, **kwargs):
             {"_id": ObjectId(config_id)},
             {"$set": update_data}
         )
+        bump_config_version()
         
         if result.matched_count == 0:
             return jsonify({"success": False, "error": "API configuration not found"}), 404
@@ -351,6 +394,7 @@ def admin_update_api_config(user_id, config_id, **kwargs):
 def admin_delete_api_config(user_id, config_id, **kwargs):
     try:
         result = api_config_collection.delete_one({"_id": ObjectId(config_id)})
+        bump_config_version()
         
         if result.deleted_count == 0:
             return jsonify({"success": False, "error": "API configuration not found"}), 404
@@ -379,6 +423,7 @@ def admin_toggle_api_config(user_id, config_id, **kwargs):
             {"_id": ObjectId(config_id)},
             {"$set": {"is_active": bool(is_active), "updated_at": datetime.utcnow()}}
         )
+        bump_config_version()
         
         if result.matched_count == 0:
             return jsonify({"success": False, "error": "API configuration not found"}), 404
@@ -390,3 +435,104 @@ def admin_toggle_api_config(user_id, config_id, **kwargs):
         }), 200
     except Exception as e:
         return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_bp.route("/admin/llm-stats", methods=["GET"])
+@jwt_required
+@require_role("admin")
+def admin_llm_stats(user_id, **kwargs):
+    """
+    Runtime statistics for the LLM client in this worker process.
+    """
+    try:
+        return jsonify({
+            "success": True,
+            "pid": os.getpid(),
+            "provider": llm.provider,
+            "pool": llm.pool_stats(),
+            "limiter": llm.limiter_stats(),
+            "hedging": llm.hedging_stats(),
+            "usage_meter": usage_meter.stats(),
+            "usage_rollups": usage_rollups.stats(),
+            "deletion_worker": deletion_worker.stats(),
+            "chat_archiver": chat_archiver.stats(),
+            "chat_vector_writer": chat_vector_writer.stats(),
+            "provider_clients": provider_clients.stats(),
+        }), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_bp.route("/admin/llm-usage", methods=["GET"])
+@jwt_required
+@require_role("admin")
+def admin_llm_usage(user_id, **kwargs):
+    """
+    LLM token usage, cost and latency from the usage rollups.
+    Query params: days (1-90, default 7), limit (top users/features, default 20)
+    """
+    try:
+        days = min(max(int(request.args.get("days", 7)), 1), 90)
+        limit = min(max(int(request.args.get("limit", 20)), 1), 200)
+
+        summary = get_usage_summary(days=days, limit=limit)
+        _add_user_details(summary["users"])
+
+        return jsonify({"success": True, **summary}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_bp.route("/admin/analytics/usage", methods=["GET"])
+@jwt_required
+@require_role("admin")
+def admin_usage_analytics(user_id, **kwargs):
+    """
+    Sessions, messages, questions, uploads, chunks and LLM tokens per day, and
+    the most active users, from the activity and LLM usage rollups.
+    Query params: days (1-90, default 7), limit (top users, default 20)
+    """
+    try:
+        days = min(max(int(request.args.get("days", 7)), 1), 90)
+        limit = min(max(int(request.args.get("limit", 20)), 1), 200)
+
+        summary = get_activity_summary(days=days, limit=limit)
+        _add_user_details(summary["users"])
+
+        return jsonify({"success": True, **summary}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+@admin_bp.route("/admin/analytics/users/<target_user_id>", methods=["GET"])
+@jwt_required
+@require_role("admin")
+def admin_user_usage_analytics(target_user_id, **kwargs):
+    """
+    One user's activity per day from the activity rollups.
+    Query params: days (1-365, default 30)
+    """
+    try:
+        days = min(max(int(request.args.get("days", 30)), 1), 365)
+        return jsonify({"success": True, **get_user_activity(target_user_id, days=days)}), 200
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
+def _add_user_details(rows: list):
+    """
+    Add each row's user email and name, in one query.
+    """
+    user_ids = [ObjectId(row["userId"]) for row in rows if ObjectId.is_valid(row["userId"])]
+    users = {
+        str(u["_id"]): u
+        for u in users_collection.find(
+            {"_id": {"$in": user_ids}},
+            {"email": 1, "firstName": 1, "lastName": 1}
+        )
+    }
+    for row in rows:
+        user = users.get(row["userId"]) or {}
+        row["email"] = user.get("email")
+        row["firstName"] = user.get("firstName")
+        row["lastName"] = user.get("lastName")
@@ -1,10 +1,13 @@
-from flask import Blueprint, jsonify, request
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+import json
 import uuid
 
 from core.user_auth import jwt_required
-from lib.chatSession import get_chat_history, get_all_chat_history, delete_chat, save_message
-from services.chat_service import ask_rag_question
+from lib.chatSession import get_chat_history, list_chat_sessions, delete_chat, save_message
+from services.chat_service import ask_rag_question, stream_rag_question, persist_chat_turn
 from utils.user_limits import check_user_active, check_chat_limit
+from utils.deadline import Deadline, DeadlineExceeded, DEADLINE_HEADER
+from config import CHAT_HISTORY_PAGE_SIZE, CHAT_HISTORY_MAX_PAGE_SIZE, CHAT_SESSIONS_PAGE_SIZE, CHAT_SESSIONS_MAX_PAGE_SIZE
 
 
 chat_bp = Blueprint("chat", __name__)
@@ -13,25 +16,106 @@ chat_bp = Blueprint("chat", __name__)
 @chat_bp.route("/chat/ask", methods=["POST"])
 @jwt_required
 def chat_ask(user_id, **kwargs):
+    """
+    Answer a question. Production serves this route from asgi.py instead, so
+    questions waiting on the LLM don't hold a thread; this is the WSGI version.
+    """
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER))
     is_active, error_msg = check_user_active(user_id)
     if not is_active:
         return jsonify({"success": False, "error": error_msg}), 403
     
-    data = request.get_json(silent=True) or {}
+    ask, error = parse_ask_request(request.get_json(silent=True))
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+
+    result = ask_rag_question(user_id=user_id, deadline=deadline, **ask)
+    return jsonify(result), result_status(result)
+
+def parse_ask_request(data) -> tuple[dict | None, str | None]:
+    """
+    The question, sessionId and topK of an ask request body, or (None, error message).
+    """
+    data = data if isinstance(data, dict) else {}
     question = (data.get("question") or "").strip()
     session_id = (data.get("sessionId") or "").strip()
     if not question:
-        return jsonify({"success": False, "error": "question is required"}), 400
+        return None, "question is required"
     if not session_id:
-        return jsonify({"success": False, "error": "sessionId is required"}), 400
+        return None, "sessionId is required"
+    return {"question": question, "session_id": session_id, "top_k": int(data.get("topK") or 5)}, None
+
+def result_status(result: dict) -> int:
+    if result.get("success"):
+        return 200
+    return 504 if result.get("timedOut") else 500
+
+def _sse(data: dict, event: str = None) -> str:
+    prefix = f"event: {event}\n" if event else ""
+    return f"{prefix}data: {json.dumps(data)}\n\n"
+
+@chat_bp.route("/chat/ask/stream", methods=["POST"])
+@jwt_required
+def chat_ask_stream(user_id, **kwargs):
+    """
+    Server-Sent Events variant of /chat/ask.
+    Emits `data: {"token": ...}` per answer fragment, then an `event: done` with the
+    full answer (or `event: error`). The turn is persisted after the stream closes.
+    """
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER))
+    is_active, error_msg = check_user_active(user_id)
+    if not is_active:
+        return jsonify({"success": False, "error": error_msg}), 403
+    
+    ask, error = parse_ask_request(request.get_json(silent=True))
+    if error:
+        return jsonify({"success": False, "error": error}), 400
+    question, session_id = ask["question"], ask["session_id"]
+
+    result = stream_rag_question(user_id=user_id, deadline=deadline, **ask)
+    if not result.get("success"):
+        return jsonify(result), result_status(result)
+
+    turn = {"answer": None}
+
+    def events():
+        parts = []
+        try:
+            for token in result["stream"]:
+                parts.append(token)
+                yield _sse({"token": token})
+        except DeadlineExceeded as e:
+            print(f"⏱️ {e}")
+            yield _sse({"success": False, "error": "The answer took too long. Please try again.", "timedOut": True}, event="error")
+            return
+        except Exception as e:
+            print(f"❌ Error while streaming answer: {e}")
+            yield _sse({"success": False, "error": "The answer stream was interrupted. Please try again."}, event="error")
+            return
+        turn["answer"] = "".join(parts).strip()
+        yield _sse({"success": True, "answer": turn["answer"]}, event="done")
 
-    result = ask_rag_question(user_id=user_id, session_id=session_id, question=question, top_k=int(data.get("topK") or 5))
-    status = 200 if result.get("success") else 500
-    return jsonify(result), status
+    def persist_turn():
+        # Only completed answers are saved; a disconnected client leaves no partial turn
+        if turn["answer"]:
+            persist_chat_turn(user_id=user_id, session_id=session_id, question=question, answer=turn["answer"])
+
+    response = Response(
+        stream_with_context(events()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+    response.call_on_close(persist_turn)
+    return response
 
 @chat_bp.route("/chat/history", methods=["GET"])
 @jwt_required
 def chat_history(user_id, **kwargs):
+    """
+    One page of a session's messages, oldest first.
+    Query params: `limit` (default CHAT_HISTORY_PAGE_SIZE) and `before`, the
+    `nextCursor` of the previous response, to page back through older messages.
+    """
     is_active, error_msg = check_user_active(user_id)
     if not is_active:
         return jsonify({"success": False, "error": error_msg}), 403
@@ -39,16 +123,35 @@ def chat_history(user_id, **kwargs):
     session_id = (request.args.get("sessionId") or "").strip()
     if not session_id:
         return jsonify({"success": False, "error": "sessionId is required"}), 400
-    return jsonify(get_chat_history(user_id=user_id, session_id=session_id)), 200
+
+    limit = request.args.get("limit", default=CHAT_HISTORY_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, CHAT_HISTORY_MAX_PAGE_SIZE))
+    before = request.args.get("before")
+    if before is not None:
+        if not before.isdigit():
+            return jsonify({"success": False, "error": "Invalid cursor"}), 400
+        before = int(before)
+
+    return jsonify(get_chat_history(user_id=user_id, session_id=session_id, limit=limit, before=before)), 200
 
 @chat_bp.route("/chat/all-history", methods=["GET"])
 @jwt_required
-def get_chat_history(user_id, **kwargs):
+def chat_all_history(user_id, **kwargs):
+    """
+    One page of the user's sessions (title, message count, timestamps), without messages.
+    Query params: `limit` (default CHAT_SESSIONS_PAGE_SIZE) and `cursor`, the
+    `nextCursor` of the previous response. Transcripts come from /chat/history.
+    """
     is_active, error_msg = check_user_active(user_id)
     if not is_active:
         return jsonify({"success": False, "error": error_msg}), 403
     
-    return jsonify(get_all_chat_history(user_id=user_id)), 200
+    limit = request.args.get("limit", default=CHAT_SESSIONS_PAGE_SIZE, type=int)
+    limit = max(1, min(limit, CHAT_SESSIONS_MAX_PAGE_SIZE))
+    cursor = (request.args.get("cursor") or "").strip() or None
+
+    result = list_chat_sessions(user_id=user_id, limit=limit, cursor=cursor)
+    return jsonify(result), 200 if result.get("success") else 400
 
 
 @chat_bp.route("/chat/delete-chat" , methods=["DELETE"])
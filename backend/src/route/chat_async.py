@@ -0,0 +1,47 @@
+"""
+Routes served natively by the ASGI app (asgi.py).
+A question spends most of its time waiting on the LLM; here that wait is an
+await on the event loop, so it holds no thread and one worker process can keep
+hundreds of questions in flight. Only the short blocking steps (user lookup,
+embedding, vector search, persistence) borrow executor threads.
+"""
+import asyncio
+import json
+
+from core.user_auth import authenticate
+from route.chat import parse_ask_request, result_status
+from services.chat_service import ask_rag_question_async
+from utils.user_limits import check_user_active
+from utils.deadline import Deadline, DEADLINE_HEADER
+
+
+async def chat_ask(headers: dict, body: bytes) -> tuple[dict, int]:
+    """
+    POST /chat/ask. `headers` has lowercase names; returns (response body, status).
+    """
+    deadline = Deadline.from_header(headers.get(DEADLINE_HEADER.lower()))
+    payload, error = authenticate(headers.get("authorization"))
+    if error:
+        return {"success": False, "error": error}, 401
+    user_id = payload["user_id"]
+
+    loop = asyncio.get_running_loop()
+    is_active, error_msg = await loop.run_in_executor(None, check_user_active, user_id)
+    if not is_active:
+        return {"success": False, "error": error_msg}, 403
+
+    try:
+        data = json.loads(body) if body else None
+    except ValueError:
+        data = None
+    ask, error = parse_ask_request(data)
+    if error:
+        return {"success": False, "error": error}, 400
+
+    result = await ask_rag_question_async(user_id=user_id, deadline=deadline, **ask)
+    return result, result_status(result)
+
+
+ASYNC_ROUTES = {
+    ("POST", "/chat/ask"): chat_ask,
+}
@@ -12,7 +12,8 @@ documents_bp = Blueprint("documents", __name__)
 @documents_bp.route("/documents/list", methods=["GET"])
 @jwt_required
 def list_documents(user_id, **kwargs):
-    docs = documents_collection.find({"user_id": ObjectId(user_id)}).sort("created_at", -1)
+    # Documents being deleted in the background are already gone for the user
+    docs = documents_collection.find({"user_id": ObjectId(user_id), "status": {"$ne": "deleting"}}).sort("created_at", -1)
     out = []
     for d in docs:
         out.append(
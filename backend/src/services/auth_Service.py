@@ -1,16 +1,17 @@
 from werkzeug.security import generate_password_hash, check_password_hash
 from configuration.Database import users_collection, documents_collection, document_chunks_collection
+from utils.user_context import get_user_context
 from core.user_auth import generate_jwt
 from models.user import user_schema
-from lib.vector_Store import store_documents
+from lib.vector_Store import store_documents, generate_vector_id
 from lib.fileProcessor import validate_upload, validate_file
 import os
 import tempfile
 from lib.fileProcessor import extract_text, chunk_text
 from models.documents import document_schema
 from models.document_chunk import document_chunk_schema
-from bson import ObjectId
-from lib.vectorDB import get_pinecone_index
+from lib.usageRollups import usage_rollups
+from lib.deletionJobs import enqueue_document_deletion
 
 def process_file(file):
     """
@@ -84,11 +85,7 @@ def handle_upload_documents(files, user_id, session_id):
     Blocks inactive users and returns results for each file.
     """
 
-    # Fetch user with only is_active field
-    user = users_collection.find_one(
-        {"_id": ObjectId(user_id)},
-        {"is_active": 1}
-    )
+    user = get_user_context(user_id)
 
     # Treat user as inactive if not found or is_active is False/None
     is_active = user.get("is_active", False) if user else False
@@ -136,11 +133,14 @@ def handle_upload_documents(files, user_id, session_id):
             document_id = str(doc_insert.inserted_id)
 
             for c in chunks:
+                # Recorded on the chunk so the document's vectors can be deleted by id
+                c["metadata"]["vectorId"] = generate_vector_id(c["metadata"]["fileName"], c["metadata"]["chunkIndex"])
                 chunk_doc = document_chunk_schema({
                     "document_id": document_id,
                     "chunk_index": c["metadata"]["chunkIndex"],
                     "content": c["text"],
-                    "embedding": None
+                    "embedding": None,
+                    "vector_id": c["metadata"]["vectorId"]
                 })
                 document_chunks_collection.insert_one(chunk_doc)
                 c["metadata"]["documentId"] = document_id
@@ -148,6 +148,7 @@ def handle_upload_documents(files, user_id, session_id):
             store_result = store_documents(chunks, user_id, session_id)
             if store_result["success"]:
                 total_chunks_processed += len(chunks)
+                usage_rollups.add(user_id, uploads=1, chunks=len(chunks))
                 results.append({
                     "fileName": file.filename,
                     "status": "success",
@@ -173,39 +174,8 @@ def handle_upload_documents(files, user_id, session_id):
     return {"results": results, "summary": summary}, 200
 
 def delete_documents(document_id: str, user_id: str) -> bool:
-    document_object_id = ObjectId(document_id)
-    user_object_id = ObjectId(user_id)
-    doc = documents_collection.find_one(
-        {
-            "_id": document_object_id,
-            "user_id": user_object_id,
-        }
-    )
-
-    if not doc:
-        return False
-
-    document_chunks_collection.delete_many(
-        {"document_id": document_object_id}
-    )
-
-    documents_collection.delete_one(
-        {
-            "_id": document_object_id,
-            "user_id": user_object_id,
-        }
-    )
-
-    try:
-        index = get_pinecone_index()
-        index.delete(
-            filter={
-                "userId": str(user_id),
-                "fileName": doc.get("file_name"),
-            }
-        )
-    except Exception as e:
-        # Intentionally not failing hard here
-        print(f"❌ Pinecone delete failed: {e}")
-
-    return True
\ No newline at end of file
+    """
+    Delete one of the user's documents. It disappears at once; its chunks and
+    vectors are purged in the background (see lib.deletionJobs).
+    """
+    return enqueue_document_deletion(document_id, user_id) is not None
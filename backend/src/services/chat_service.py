@@ -1,15 +1,32 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
 import random
+import re
+from functools import partial
 from typing import Any, Dict, List, Tuple
 
 from bson import ObjectId
 
 from configuration import Database as db_mod
-from lib.chatSession import save_message, get_chat_history
+from lib.chatSession import save_messages, get_chat_history, check_session_allowed
 from lib.vector_Store import search_similar_documents
 from configuration.gemini_client import gemini
-from lib.vector_Store import answer_question, save_message_to_vector_store
+from lib.vector_Store import answer_question, answer_question_async, answer_question_stream
+from lib.chatVectorWriter import chat_vector_writer
+from lib.conversationMemory import (
+    load_conversation_memory,
+    contextualize_query,
+    build_conversation_context,
+    schedule_summary_update,
+)
+from configuration.embedding import embed_texts
+from utils.single_flight import SingleFlight
+from utils.deadline import Deadline
+
+# Coalesces identical concurrent questions into one retrieval + LLM computation
+_question_flights = SingleFlight()
 
 def _enabled_document_ids_for_user(user_id: str) -> set[str]:
     """
@@ -63,62 +80,220 @@ def _filter_matches_to_enabled_docs(matches: List[Dict[str, Any]], enabled_doc_i
     
     return filtered
 
-def ask_rag_question(*, user_id: str, session_id: str, question: str, top_k: int = 5) -> Dict[str, Any]:
-    try:
-        search = search_similar_documents(query=question, user_id=user_id, session_id=session_id, limit=top_k)
-        if not search.get("success"):
-            return {"success": False, "error": search.get("error", "Retrieval failed")}
+def _retrieve_enabled_matches(user_id: str, session_id: str, question: str, top_k: int, enabled: set[str] | None = None, query_vector: list | None = None, deadline: Deadline | None = None) -> Tuple[List[Dict[str, Any]], Dict[str, Any] | None]:
+    """
+    Search the vector store and keep only matches from the user's enabled documents.
+    Returns (matches, None) on success or ([], error_response).
+    """
+    search = search_similar_documents(query=question, user_id=user_id, session_id=session_id, limit=top_k, query_vector=query_vector, deadline=deadline)
+    if not search.get("success"):
+        return [], {"success": False, "error": search.get("error", "Retrieval failed")}
 
-        search_matches = search.get("matches", [])
-        print(f"📊 Found {len(search_matches)} matches from Pinecone search")
-        
+    search_matches = search.get("matches", [])
+    print(f"📊 Found {len(search_matches)} matches from Pinecone search")
+    
+    if enabled is None:
         enabled = _enabled_document_ids_for_user(user_id)
-        print(f"📋 Enabled document IDs for user: {enabled}")
-        
-        match_doc_ids = []
-        for m in search_matches:
-            doc_id = (m.get("metadata") or {}).get("documentId")
-            if doc_id:
-                match_doc_ids.append(str(doc_id))
-            else:
-                match_doc_ids.append("(missing)")
-        print(f"🔍 Document IDs in search matches: {match_doc_ids}")
-        print(f"🔍 Unique document IDs: {set([d for d in match_doc_ids if d != '(missing)'])}")
-        
-        matches = _filter_matches_to_enabled_docs(search_matches, enabled)
-        print(f"✅ After filtering, {len(matches)} matches remain")
-
-        if not matches:
-            if not search_matches:
-                return {
-                    "success": False,
-                    "error": "No documents found in vector store. Please upload documents first."
-                }
-            elif not enabled:
-                return {
-                    "success": False,
-                    "error": "No enabled documents found for your account. Please contact support."
-                }
-            else:
-                return {
-                    "success": False,
-                    "error": "No relevant documents found. The search results don't match your enabled documents. Please try a different question."
-                }
-        
-        answer = answer_question(query=question, user_id=user_id, session_id=session_id, top_k=top_k)
+    print(f"📋 Enabled document IDs for user: {enabled}")
+    
+    match_doc_ids = []
+    for m in search_matches:
+        doc_id = (m.get("metadata") or {}).get("documentId")
+        if doc_id:
+            match_doc_ids.append(str(doc_id))
+        else:
+            match_doc_ids.append("(missing)")
+    print(f"🔍 Document IDs in search matches: {match_doc_ids}")
+    print(f"🔍 Unique document IDs: {set([d for d in match_doc_ids if d != '(missing)'])}")
+    
+    matches = _filter_matches_to_enabled_docs(search_matches, enabled)
+    print(f"✅ After filtering, {len(matches)} matches remain")
 
-        # Save user message - this will check limits if it's a new session
-        user_msg_result = save_message(user_id=user_id, session_id=session_id, role="user", message=question)
-        if not user_msg_result.get("success"):
-            # If saving failed due to limits or inactive user, return the error
-            return user_msg_result
-        
-        # Save assistant message (session already exists, so no limit check needed)
-        save_message(user_id=user_id, session_id=session_id, role="assistant", message=answer)
-        save_message_to_vector_store(user_id=user_id, session_id=session_id, role="user", message=question)
-        save_message_to_vector_store(user_id=user_id, session_id=session_id, role="assistant", message=answer)
+    if not matches:
+        if not search_matches:
+            return [], {
+                "success": False,
+                "error": "No documents found in vector store. Please upload documents first."
+            }
+        elif not enabled:
+            return [], {
+                "success": False,
+                "error": "No enabled documents found for your account. Please contact support."
+            }
+        else:
+            return [], {
+                "success": False,
+                "error": "No relevant documents found. The search results don't match your enabled documents. Please try a different question."
+            }
+
+    return matches, None
+
+def persist_chat_turn(*, user_id: str, session_id: str, question: str, answer: str) -> Dict[str, Any]:
+    """
+    Save the question/answer pair to the chat session in one write, and queue
+    both messages for the chat vector index (written behind the request).
+    """
+    turn = [("user", question), ("assistant", answer)]
+    # Checks limits if this turn starts a new session
+    result = save_messages(user_id=user_id, session_id=session_id, messages=turn)
+    if not result.get("success"):
+        # If saving failed due to limits or inactive user, return the error
+        return result
+
+    chat_vector_writer.enqueue(user_id, session_id, result["firstIndex"], turn)
+    schedule_summary_update(user_id, session_id, result["messageCount"], result["summarizedCount"])
+
+    return {"success": True}
+
+def _normalize_question(question: str) -> str:
+    return re.sub(r"\s+", " ", question).strip().lower().rstrip("?!. ")
+
+def _question_flight_key(user_id: str, session_id: str, question: str, enabled: set[str], top_k: int, memory: Dict[str, Any]) -> tuple:
+    """
+    Answers depend on the retrieval scope, the question and the documents in scope.
+    Documents are private to their owner, so the scope is the user; the corpus
+    version is a digest of the enabled document ids, so uploads, deletes and
+    enable/disable changes start a fresh computation. Once a session has history
+    the answer also depends on its conversation memory, so the scope narrows to
+    the session at its current length.
+    """
+    corpus_version = hashlib.sha1(",".join(sorted(enabled)).encode()).hexdigest()
+    if memory["has_history"]:
+        scope = f"session:{session_id}:{memory['messageCount']}"
+    else:
+        scope = f"user:{user_id}"
+    return (scope, _normalize_question(question), corpus_version, top_k)
+
+def _prepare_answer_inputs(user_id: str, session_id: str, question: str, top_k: int, enabled: set[str], memory: Dict[str, Any], deadline: Deadline | None = None) -> Tuple[List[Dict[str, Any]], str, Dict[str, Any] | None]:
+    """
+    Conversation-aware retrieval: one embedding of the (contextualized) question
+    serves both the document search and the session's chat-index recall.
+    Returns (matches, conversation, None) or ([], "", error_response).
+    """
+    if deadline is not None:
+        deadline.check("retrieval")
+    retrieval_query = contextualize_query(question, memory)
+    query_vector = embed_texts([retrieval_query])[0]
+    matches, error = _retrieve_enabled_matches(user_id, session_id, retrieval_query, top_k, enabled, query_vector, deadline)
+    if error:
+        return [], "", error
+    conversation = build_conversation_context(user_id, session_id, memory, query_vector, deadline=deadline)
+    return matches, conversation, None
+
+def _compute_answer(user_id: str, session_id: str, question: str, top_k: int, enabled: set[str], memory: Dict[str, Any], deadline: Deadline | None = None) -> Dict[str, Any]:
+    matches, conversation, error = _prepare_answer_inputs(user_id, session_id, question, top_k, enabled, memory, deadline)
+    if error:
+        return error
+    answer = answer_question(query=question, user_id=user_id, session_id=session_id, top_k=top_k, matches=matches, conversation=conversation, deadline=deadline)
+    return {"success": True, "answer": answer}
+
+async def _compute_answer_async(user_id: str, session_id: str, question: str, top_k: int, enabled: set[str], memory: Dict[str, Any], deadline: Deadline | None = None) -> Dict[str, Any]:
+    loop = asyncio.get_running_loop()
+    matches, conversation, error = await loop.run_in_executor(
+        None, _prepare_answer_inputs, user_id, session_id, question, top_k, enabled, memory, deadline
+    )
+    if error:
+        return error
+    answer = await answer_question_async(query=question, user_id=user_id, session_id=session_id, top_k=top_k, matches=matches, conversation=conversation, deadline=deadline)
+    return {"success": True, "answer": answer}
+
+def _timed_out_response(e: Exception) -> Dict[str, Any]:
+    print(f"⏱️ {e}")
+    return {"success": False, "error": "The answer took too long. Please try again.", "timedOut": True}
+
+def _flight_timeout(deadline: Deadline | None) -> float | None:
+    return deadline.remaining() if deadline is not None else None
+
+def ask_rag_question(*, user_id: str, session_id: str, question: str, top_k: int = 5, deadline: Deadline | None = None) -> Dict[str, Any]:
+    """
+    Answer a question and save the turn. With a `deadline`, every stage is bounded
+    by the remaining budget and running out returns {"success": False, "timedOut": True}.
+    """
+    try:
+        enabled = _enabled_document_ids_for_user(user_id)
+        memory = load_conversation_memory(user_id, session_id)
+        key = _question_flight_key(user_id, session_id, question, enabled, top_k, memory)
+        result, shared = _question_flights.do(
+            key, lambda: _compute_answer(user_id, session_id, question, top_k, enabled, memory, deadline),
+            timeout=_flight_timeout(deadline)
+        )
+        if shared:
+            print("🔁 Reused the answer of an identical in-flight question")
+        if not result.get("success"):
+            return result
+        answer = result["answer"]
+
+        # Persistence stays per caller, even for a shared answer
+        saved = persist_chat_turn(user_id=user_id, session_id=session_id, question=question, answer=answer)
+        if not saved.get("success"):
+            return saved
 
         return {"success": True, "answer": answer}
+    except TimeoutError as e:
+        return _timed_out_response(e)
     except Exception as e:
         print(f"❌ Unexpected error in ask_rag_question: {e}")
         return {"success": False, "error": f"An unexpected error occurred: {str(e)}"}
+
+async def ask_rag_question_async(*, user_id: str, session_id: str, question: str, top_k: int = 5, deadline: Deadline | None = None) -> Dict[str, Any]:
+    """
+    asyncio variant of ask_rag_question for async callers. Retrieval and persistence
+    run in the loop's executor and the LLM call is awaited, so many questions can be
+    in flight per process without a thread each.
+    """
+    try:
+        loop = asyncio.get_running_loop()
+        enabled = await loop.run_in_executor(None, _enabled_document_ids_for_user, user_id)
+        memory = await loop.run_in_executor(None, load_conversation_memory, user_id, session_id)
+        key = _question_flight_key(user_id, session_id, question, enabled, top_k, memory)
+        result, shared = await _question_flights.ado(
+            key, lambda: _compute_answer_async(user_id, session_id, question, top_k, enabled, memory, deadline),
+            timeout=_flight_timeout(deadline)
+        )
+        if shared:
+            print("🔁 Reused the answer of an identical in-flight question")
+        if not result.get("success"):
+            return result
+        answer = result["answer"]
+
+        saved = await loop.run_in_executor(
+            None, partial(persist_chat_turn, user_id=user_id, session_id=session_id, question=question, answer=answer)
+        )
+        if not saved.get("success"):
+            return saved
+
+        return {"success": True, "answer": answer}
+    except TimeoutError as e:
+        return _timed_out_response(e)
+    except Exception as e:
+        print(f"❌ Unexpected error in ask_rag_question_async: {e}")
+        return {"success": False, "error": f"An unexpected error occurred: {str(e)}"}
+
+def stream_rag_question(*, user_id: str, session_id: str, question: str, top_k: int = 5, deadline: Deadline | None = None) -> Dict[str, Any]:
+    """
+    Prepare a streamed answer. Retrieval and the session limit checks run up front,
+    so errors are returned before any token is sent. The `deadline` also bounds
+    the stream itself, which is cut off (raising DeadlineExceeded) once it expires.
+
+    Returns:
+        {"success": True, "stream": iterator of answer fragments} or an error response.
+        The caller persists the turn with persist_chat_turn once the stream has closed.
+    """
+    try:
+        allowed = check_session_allowed(user_id, session_id)
+        if not allowed.get("success"):
+            return allowed
+
+        memory = load_conversation_memory(user_id, session_id)
+        enabled = _enabled_document_ids_for_user(user_id)
+        matches, conversation, error = _prepare_answer_inputs(user_id, session_id, question, top_k, enabled, memory, deadline)
+        if error:
+            return error
+
+        stream = answer_question_stream(query=question, user_id=user_id, session_id=session_id, top_k=top_k, matches=matches, conversation=conversation, deadline=deadline)
+        return {"success": True, "stream": stream}
+    except TimeoutError as e:
+        return _timed_out_response(e)
+    except Exception as e:
+        print(f"❌ Unexpected error in stream_rag_question: {e}")
+        return {"success": False, "error": f"An unexpected error occurred: {str(e)}"}
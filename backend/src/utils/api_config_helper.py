@@ -2,10 +2,102 @@
 Utility functions to retrieve API keys from database configuration.
 Values are fetched from DB, decrypted automatically.
 Database is the single source of truth.
-"""
 
+All active values are held decrypted in a per-process snapshot, reloaded in
+one query once it is API_CONFIG_TTL_SECONDS old or after bump_config_version()
+(called by the admin endpoints that change api_config).
+"""
+import threading
+import time
 from configuration.Database import api_config_collection
 from utils.encryption import decrypt_value
+from config import (
+    API_CONFIG_TTL_SECONDS,
+    LLM_RATE_LIMIT_PER_SEC,
+    LLM_RATE_LIMIT_BURST,
+    LLM_MAX_IN_FLIGHT,
+    LLM_MAX_QUEUE_WAIT,
+    LLM_RETRY_BUDGET_RATIO,
+    LLM_HEDGE_ENABLED,
+    LLM_HEDGE_PERCENTILE,
+    LLM_HEDGE_MIN_DELAY,
+    LLM_HEDGE_MAX_RATIO,
+)
+
+class ApiConfigSnapshot:
+    def __init__(self, ttl: float = API_CONFIG_TTL_SECONDS):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = None
+        self._expires_at = 0.0
+        self._invalidations = 0
+        self._loaded_at_invalidation = -1
+        # Incremented whenever a reload finds different values
+        self.version = 0
+        self.loads = 0
+
+    def invalidate(self):
+        """
+        Mark the snapshot stale; the next read reloads it.
+        """
+        with self._lock:
+            self._invalidations += 1
+
+    def _fresh(self) -> bool:
+        return (
+            self._values is not None
+            and self._loaded_at_invalidation == self._invalidations
+            and time.monotonic() < self._expires_at
+        )
+
+    def values(self) -> dict:
+        if self._fresh():
+            return self._values
+        with self._lock:
+            if self._fresh():
+                return self._values
+            invalidations = self._invalidations
+            try:
+                configs = api_config_collection.find({"is_active": True}, {"key_name": 1, "key_value": 1})
+                # Duplicate names: the first active row wins, as with find_one
+                values = {}
+                for config in configs:
+                    if config.get("key_value") and config["key_name"] not in values:
+                        values[config["key_name"]] = decrypt_value(config["key_value"])
+            except Exception as e:
+                print(f"Warning: Failed to load API configuration from database: {e}")
+                # Keep serving the previous snapshot, if any, and retry on the next read
+                return self._values or {}
+            if values != self._values:
+                self.version += 1
+            self._values = values
+            self._loaded_at_invalidation = invalidations
+            self._expires_at = time.monotonic() + self.ttl
+            self.loads += 1
+            return values
+
+    def stats(self) -> dict:
+        return {"version": self.version, "loads": self.loads, "keys": len(self._values or {}), "ttl": self.ttl}
+
+
+api_config_snapshot = ApiConfigSnapshot()
+
+
+def bump_config_version():
+    """
+    Called after api_config changes: reload the snapshot on the next read.
+    """
+    api_config_snapshot.invalidate()
+
+
+def get_config_version() -> int:
+    """
+    Version of the current configuration values; changes whenever a value does.
+    Reloads the snapshot first if it is due.
+    """
+    api_config_snapshot.values()
+    return api_config_snapshot.version
+
 
 def get_api_key(key_name: str) -> str | None:
     """
@@ -18,21 +110,7 @@ def get_api_key(key_name: str) -> str | None:
     Returns:
         Decrypted API key value if found and active, else None
     """
-    try:
-        config = api_config_collection.find_one(
-            {
-                "key_name": key_name,
-                "is_active": True,
-            }
-        )
-
-        if config and config.get("key_value"):
-            return decrypt_value(config["key_value"])
-
-    except Exception as e:
-        print(f"Warning: Failed to retrieve {key_name} from database: {e}")
-
-    return None
+    return api_config_snapshot.values().get(key_name)
 
 
 def get_gemini_api_key() -> str | None:
@@ -43,6 +121,10 @@ def get_gemini_api_url() -> str | None:
     return get_api_key("GEMINI_API_URL")
 
 
+def get_gemini_stream_api_url() -> str | None:
+    return get_api_key("GEMINI_STREAM_API_URL")
+
+
 def get_pinecone_api_key() -> str | None:
     return get_api_key("PINECONE_API_KEY")
 
@@ -61,3 +143,53 @@ def get_huggingface_api_key() -> str | None:
 
 def get_hf_modal() -> str | None:
     return get_api_key("HF_MODAL")
+
+
+def get_number_setting(key_name: str, default: float, cast=float):
+    """
+    Read a numeric setting from database configuration, falling back to `default`
+    when it's missing or not a valid number.
+    """
+    value = get_api_key(key_name)
+    if value is None or str(value).strip() == "":
+        return default
+    try:
+        return cast(str(value).strip())
+    except (TypeError, ValueError):
+        print(f"Warning: Invalid value for {key_name}: {value!r}, using default {default}")
+        return default
+
+
+def get_bool_setting(key_name: str, default: bool) -> bool:
+    """
+    Read a boolean setting ("true"/"false", "1"/"0", "yes"/"no") from database configuration.
+    """
+    value = get_api_key(key_name)
+    if value is None or str(value).strip() == "":
+        return default
+    return str(value).strip().lower() in ("true", "1", "yes", "on")
+
+
+def get_llm_limits() -> dict:
+    """
+    LLM admission control settings (see configuration.llm_limiter.LLMLimiter).
+    """
+    return {
+        "rate_per_sec": get_number_setting("LLM_RATE_LIMIT_PER_SEC", LLM_RATE_LIMIT_PER_SEC),
+        "burst": get_number_setting("LLM_RATE_LIMIT_BURST", LLM_RATE_LIMIT_BURST, int),
+        "max_in_flight": get_number_setting("LLM_MAX_IN_FLIGHT", LLM_MAX_IN_FLIGHT, int),
+        "max_queue_wait": get_number_setting("LLM_MAX_QUEUE_WAIT", LLM_MAX_QUEUE_WAIT),
+        "retry_budget_ratio": get_number_setting("LLM_RETRY_BUDGET_RATIO", LLM_RETRY_BUDGET_RATIO),
+    }
+
+
+def get_llm_hedging() -> dict:
+    """
+    Hedged-request settings (see configuration.llm_hedging.Hedger).
+    """
+    return {
+        "enabled": get_bool_setting("LLM_HEDGE_ENABLED", LLM_HEDGE_ENABLED),
+        "percentile": get_number_setting("LLM_HEDGE_PERCENTILE", LLM_HEDGE_PERCENTILE),
+        "min_delay": get_number_setting("LLM_HEDGE_MIN_DELAY", LLM_HEDGE_MIN_DELAY),
+        "max_hedge_ratio": get_number_setting("LLM_HEDGE_MAX_RATIO", LLM_HEDGE_MAX_RATIO),
+    }
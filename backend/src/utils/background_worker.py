@@ -0,0 +1,73 @@
+"""
+Per-process background worker threads.
+A worker's thread is started once per process, on its first start() there
+(lazily from the request path, or from app startup). A forked child starts its
+own thread, and first drops the state it inherited from the parent, which the
+parent's thread still owns (e.g. buffered records it will flush itself).
+"""
+import os
+import threading
+
+
+class BackgroundWorker:
+    """
+    Subclasses implement _run_worker(), the body of the thread.
+    """
+
+    thread_name = "background-worker"
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._worker_pid = None
+
+    def start(self):
+        if self._worker_pid == os.getpid():
+            return
+        with self._lock:
+            if self._worker_pid == os.getpid():
+                return
+            if self._worker_pid is not None:
+                self._reset_after_fork()
+            self._worker_pid = os.getpid()
+        threading.Thread(target=self._run_worker, name=self.thread_name, daemon=True).start()
+
+    def running(self) -> bool:
+        return self._worker_pid == os.getpid()
+
+    def _reset_after_fork(self):
+        """
+        Drop state inherited from the parent process; called under the lock.
+        """
+
+    def _run_worker(self):
+        raise NotImplementedError
+
+
+class PeriodicWorker(BackgroundWorker):
+    """
+    Calls _tick() every `interval` seconds, starting at once; wake() runs the
+    next tick early (e.g. when a buffer fills up or a job is queued).
+    """
+
+    def __init__(self, interval: float):
+        super().__init__()
+        self.interval = interval
+        self._wake = threading.Event()
+
+    def wake(self):
+        self._wake.set()
+
+    def _reset_after_fork(self):
+        self._wake = threading.Event()
+
+    def _tick(self):
+        raise NotImplementedError
+
+    def _run_worker(self):
+        while True:
+            try:
+                self._tick()
+            except Exception as e:
+                print(f"⚠️ {self.thread_name} error: {e}")
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,56 @@
+"""
+Request-scoped deadlines.
+A Deadline is created once per request and passed down explicitly (it has to
+cross executor threads and the background event loop, which contextvars don't).
+Each stage sizes its timeout from the remaining budget and gives up early rather
+than doing work the client will never see.
+"""
+import time
+from config import REQUEST_DEADLINE_SECONDS
+
+DEADLINE_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(TimeoutError):
+    """
+    Raised when a stage can't start or finish within the request deadline.
+    """
+
+
+class Deadline:
+    def __init__(self, seconds: float):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    @classmethod
+    def from_header(cls, value: str | None, default: float = REQUEST_DEADLINE_SECONDS) -> "Deadline":
+        """
+        Deadline from an `X-Request-Timeout` value in seconds. Missing or invalid
+        values get the server default, and clients can't ask for more than it.
+        """
+        try:
+            seconds = float(value) if value else default
+        except ValueError:
+            seconds = default
+        if seconds <= 0:
+            seconds = default
+        return cls(min(seconds, default))
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+    def timeout(self, cap: float) -> float:
+        """
+        Timeout for one stage: its own cap, or what's left of the deadline if less.
+        """
+        return min(cap, self.remaining())
+
+    def can_fit(self, seconds: float) -> bool:
+        return self.remaining() > seconds
+
+    def check(self, stage: str):
+        if self.expired():
+            raise DeadlineExceeded(f"Request deadline of {self.budget:.1f}s exceeded before {stage}")
@@ -4,16 +4,18 @@ Uses Fernet symmetric encryption from the cryptography library.
 """
 import os
 import base64
+from functools import lru_cache
 from cryptography.fernet import Fernet
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 from config import API_KEY_SECRET
 
 
+@lru_cache(maxsize=1)
 def _get_encryption_key() -> bytes:
     """
     Derive a Fernet key from the API_KEY_SECRET.
-    Uses PBKDF2 to derive a key from the secret.
+    Uses PBKDF2 to derive a key from the secret; deliberately slow, so it runs once per process.
     """
     # Use API_KEY_SECRET as the password
     password = API_KEY_SECRET.encode()
@@ -29,6 +31,11 @@ def _get_encryption_key() -> bytes:
     return key
 
 
+@lru_cache(maxsize=1)
+def _get_fernet() -> Fernet:
+    return Fernet(_get_encryption_key())
+
+
 def encrypt_value(value: str) -> str:
     """
     Encrypt a string value using Fernet.
@@ -43,9 +50,7 @@ def encrypt_value(value: str) -> str:
         return value
     
     try:
-        key = _get_encryption_key()
-        fernet = Fernet(key)
-        encrypted = fernet.encrypt(value.encode())
+        encrypted = _get_fernet().encrypt(value.encode())
         return encrypted.decode()
     except Exception as e:
         print(f"Error encrypting value: {e}")
@@ -66,9 +71,7 @@ def decrypt_value(encrypted_value: str) -> str:
         return encrypted_value
     
     try:
-        key = _get_encryption_key()
-        fernet = Fernet(key)
-        decrypted = fernet.decrypt(encrypted_value.encode())
+        decrypted = _get_fernet().decrypt(encrypted_value.encode())
         return decrypted.decode()
     except Exception as e:
         print(f"Error decrypting value: {e}")
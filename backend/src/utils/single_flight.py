@@ -0,0 +1,84 @@
+"""
+Single-flight call coalescing.
+Concurrent calls with the same key share one in-flight computation: the first
+caller runs it, the others wait and receive the same result (or exception).
+"""
+import asyncio
+import threading
+from typing import Any, Callable, Hashable, Tuple
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict = {}
+        self._tasks: dict = {}
+        self.coalesced = 0
+
+    def do(self, key: Hashable, fn: Callable[[], Any], timeout: float | None = None) -> Tuple[Any, bool]:
+        """
+        Run `fn` once per key across threads. Callers that join an in-flight
+        call wait at most `timeout` seconds for it (TimeoutError after that).
+
+        Returns:
+            Tuple of (result, shared) where shared is True for callers that
+            received another caller's result.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+                self.coalesced += 1
+
+        if not leader:
+            if not call.done.wait(timeout):
+                raise TimeoutError("Timed out waiting for an identical in-flight call")
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        try:
+            call.result = fn()
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+    async def ado(self, key: Hashable, make_coro: Callable[[], Any], timeout: float | None = None) -> Tuple[Any, bool]:
+        """
+        asyncio variant of do(): coalesces calls on the same event loop.
+        """
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        shared = task is not None
+        if shared:
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(make_coro())
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+
+        # shield: a cancelled waiter must not cancel the computation others share
+        if timeout is None:
+            return await asyncio.shield(task), shared
+        return await asyncio.wait_for(asyncio.shield(task), timeout), shared
+
+    def in_flight(self) -> int:
+        with self._lock:
+            return len(self._calls) + len(self._tasks)
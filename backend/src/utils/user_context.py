@@ -0,0 +1,109 @@
+"""
+Per-process cache of the user fields that authorization and limit checks need.
+Entries live for USER_CONTEXT_TTL_SECONDS; admin changes to a user invalidate
+that user's entry in the process that made them, and the TTL bounds how long
+other worker processes can serve the old values.
+"""
+import threading
+import time
+from collections import OrderedDict
+from bson import ObjectId
+from flask import g, has_request_context
+from configuration.Database import users_collection
+from config import USER_CONTEXT_TTL_SECONDS, USER_CONTEXT_CACHE_SIZE
+
+USER_CONTEXT_FIELDS = {
+    "email": 1, "role": 1, "is_active": 1, "chat_limit": 1,
+    "usage_time_window": 1, "usage_start_time": 1, "usage_end_time": 1
+}
+
+
+def _load_user_context(user_id: str):
+    user = users_collection.find_one({"_id": ObjectId(user_id)}, USER_CONTEXT_FIELDS)
+    if not user:
+        return None
+    return {
+        "_id": user_id,
+        "email": user.get("email"),
+        "role": (user.get("role") or "user").lower(),
+        "is_active": user.get("is_active", True),
+        "chat_limit": user.get("chat_limit"),
+        "usage_time_window": user.get("usage_time_window"),
+        "usage_start_time": user.get("usage_start_time"),
+        "usage_end_time": user.get("usage_end_time"),
+    }
+
+
+class UserContextCache:
+    def __init__(self, ttl: float = USER_CONTEXT_TTL_SECONDS, max_size: int = USER_CONTEXT_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_size = max_size
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id: str):
+        """
+        The user's context, or None if there is no such user. Unknown users aren't cached.
+        """
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry and entry[0] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        context = _load_user_context(user_id)
+        if context is not None and self.ttl > 0:
+            with self._lock:
+                self._entries[user_id] = (now + self.ttl, context)
+                self._entries.move_to_end(user_id)
+                while len(self._entries) > self.max_size:
+                    self._entries.popitem(last=False)
+        return context
+
+    def invalidate(self, user_id: str):
+        with self._lock:
+            self._entries.pop(str(user_id), None)
+        if has_request_context() and (g.get("user_context") or {}).get("_id") == str(user_id):
+            g.user_context = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            size = len(self._entries)
+        return {"size": size, "ttl": self.ttl, "hits": self.hits, "misses": self.misses}
+
+
+user_context_cache = UserContextCache()
+
+
+def load_request_user_context(user_id: str):
+    """
+    Load the authenticated user's context once per request (called by jwt_required).
+    """
+    try:
+        g.user_context = user_context_cache.get(user_id)
+    except Exception as e:
+        print(f"⚠️ Failed to load user context: {e}")
+        g.user_context = None
+    return g.user_context
+
+
+def get_user_context(user_id: str):
+    """
+    The user's context: the one loaded for the current request if it is this
+    user's, otherwise from the cache.
+    """
+    if has_request_context():
+        context = g.get("user_context")
+        if context is not None and context["_id"] == user_id:
+            return context
+    return user_context_cache.get(user_id)
+
+
+def invalidate_user_context(user_id: str):
+    user_context_cache.invalidate(user_id)
@@ -3,7 +3,9 @@ Utility functions for checking user chat limits and active status.
 """
 from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo import ReturnDocument
 from configuration.Database import users_collection, chat_sessions_collection
+from utils.user_context import get_user_context
 
 
 from typing import Tuple
@@ -19,7 +21,7 @@ def check_user_active(user_id: str) -> Tuple[bool, str]:
         Tuple of (is_active: bool, error_message: str)
     """
     try:
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
+        user = get_user_context(user_id)
         if not user:
             return False, "User not found"
         
@@ -68,55 +70,174 @@ def get_user_chat_count_in_window(user_id: str, usage_time_window: str = None,
     return chat_sessions_collection.count_documents({"userId": user_id})
 
 
+# Sessions created per usage window are counted on the user document:
+# `chat_count` counts the window named by `chat_count_window`, and a new
+# window key rolls the counter over. `chat_count_window` is None until the
+# counter has been seeded from chat_sessions (once per user or window change).
+LIMIT_FIELDS = {
+    "is_active": 1, "chat_limit": 1, "usage_time_window": 1, "usage_start_time": 1,
+    "usage_end_time": 1, "chat_count": 1, "chat_count_window": 1
+}
+
+
+def _window_key(user: dict, now: datetime) -> Tuple[str, bool]:
+    """
+    Key of the usage window `now` falls in, and whether sessions created now count towards it.
+    """
+    window = user.get("usage_time_window")
+    if window == "daily":
+        return f"daily:{now:%Y-%m-%d}", True
+    if window == "weekly":
+        monday = now - timedelta(days=now.weekday())
+        return f"weekly:{monday:%Y-%m-%d}", True
+    if window == "monthly":
+        return f"monthly:{now:%Y-%m}", True
+    if window == "custom":
+        start, end = user.get("usage_start_time"), user.get("usage_end_time")
+        key = f"custom:{start.isoformat() if start else ''}:{end.isoformat() if end else ''}"
+        return key, (start is None or now >= start) and (end is None or now <= end)
+    return "all", True
+
+
+def _current_count(user: dict, key: str, now: datetime) -> int:
+    if user.get("chat_count_window") == key:
+        return user.get("chat_count") or 0
+    if user.get("chat_count_window") is not None:
+        # The counter belongs to an earlier window
+        return 0
+
+    # Seed the counter from the sessions already created in this window
+    count = get_user_chat_count_in_window(
+        str(user["_id"]),
+        user.get("usage_time_window"),
+        user.get("usage_start_time"),
+        user.get("usage_end_time")
+    )
+    users_collection.update_one(
+        {"_id": user["_id"], "chat_count_window": None},
+        {"$set": {"chat_count": count, "chat_count_window": key, "chat_count_reset_at": now}}
+    )
+    user["chat_count"], user["chat_count_window"] = count, key
+    return count
+
+
+def _limit_error(chat_limit: int, usage_time_window: str) -> str:
+    if usage_time_window == "daily":
+        return f"You have reached your daily chat limit of {chat_limit} sessions. Please try again tomorrow."
+    if usage_time_window == "weekly":
+        return f"You have reached your weekly chat limit of {chat_limit} sessions. Please try again next week."
+    if usage_time_window == "monthly":
+        return f"You have reached your monthly chat limit of {chat_limit} sessions. Please try again next month."
+    if usage_time_window == "custom":
+        return f"You have reached your chat limit of {chat_limit} sessions for the specified time period. Please contact support if you need more sessions."
+    return f"You have reached your chat limit of {chat_limit} sessions. Please contact support to increase your limit."
+
+
+def _limit_info(user: dict, current_count: int) -> dict:
+    return {
+        "current_count": current_count,
+        "limit": user.get("chat_limit"),
+        "usage_time_window": user.get("usage_time_window")
+    }
+
+
+def _limit_result(user: dict, current_count: int) -> Tuple[bool, str, dict]:
+    chat_limit = user.get("chat_limit")
+    if chat_limit is not None and current_count >= chat_limit:
+        return False, _limit_error(chat_limit, user.get("usage_time_window")), _limit_info(user, current_count)
+    return True, "", _limit_info(user, current_count)
+
+
 def check_chat_limit(user_id: str) -> Tuple[bool, str, dict]:
+    """
+    Whether the user may start another chat session, without counting one.
+    """
     try:
-        user = users_collection.find_one({"_id": ObjectId(user_id)})
+        user = users_collection.find_one({"_id": ObjectId(user_id)}, LIMIT_FIELDS)
         if not user:
             return False, "User not found", {}
-        
-        chat_limit = user.get("chat_limit")
-        usage_time_window = user.get("usage_time_window")
-        usage_start_time = user.get("usage_start_time")
-        usage_end_time = user.get("usage_end_time")
-        
-        if chat_limit is None:
-            return True, "", {
-                "current_count": get_user_chat_count_in_window(user_id, usage_time_window, usage_start_time, usage_end_time),
-                "limit": None,
-                "usage_time_window": usage_time_window
-            }
-        
-        # Get current count within the time window
-        current_count = get_user_chat_count_in_window(
-            user_id, 
-            usage_time_window, 
-            usage_start_time, 
-            usage_end_time
-        )
-        
-        if current_count >= chat_limit:
-            if usage_time_window == "daily":
-                error_msg = f"You have reached your daily chat limit of {chat_limit} sessions. Please try again tomorrow."
-            elif usage_time_window == "weekly":
-                error_msg = f"You have reached your weekly chat limit of {chat_limit} sessions. Please try again next week."
-            elif usage_time_window == "monthly":
-                error_msg = f"You have reached your monthly chat limit of {chat_limit} sessions. Please try again next month."
-            elif usage_time_window == "custom":
-                error_msg = f"You have reached your chat limit of {chat_limit} sessions for the specified time period. Please contact support if you need more sessions."
-            else:
-                error_msg = f"You have reached your chat limit of {chat_limit} sessions. Please contact support to increase your limit."
-            
-            return False, error_msg, {
-                "current_count": current_count,
-                "limit": chat_limit,
-                "usage_time_window": usage_time_window
-            }
-        
-        return True, "", {
-            "current_count": current_count,
-            "limit": chat_limit,
-            "usage_time_window": usage_time_window
-        }
+
+        now = datetime.utcnow()
+        key, _ = _window_key(user, now)
+        return _limit_result(user, _current_count(user, key, now))
     except Exception as e:
         return False, f"Error checking chat limit: {str(e)}", {}
 
+
+def _increment_chat_count(user_id: ObjectId, key: str, chat_limit: int):
+    """
+    Count one session if the counter is on window `key` and under the limit.
+    """
+    under_limit = {} if chat_limit is None else {"chat_count": {"$lt": chat_limit}}
+    return users_collection.find_one_and_update(
+        {"_id": user_id, "chat_count_window": key, **under_limit},
+        {"$inc": {"chat_count": 1}},
+        projection={"chat_count": 1},
+        return_document=ReturnDocument.AFTER
+    )
+
+
+def release_chat_session(user_id: str):
+    """
+    Undo a reserve_chat_session whose session ended up not being created.
+    """
+    user = users_collection.find_one({"_id": ObjectId(user_id)}, LIMIT_FIELDS)
+    if not user:
+        return
+    key, counting = _window_key(user, datetime.utcnow())
+    if counting:
+        users_collection.update_one(
+            {"_id": user["_id"], "chat_count_window": key, "chat_count": {"$gt": 0}},
+            {"$inc": {"chat_count": -1}}
+        )
+
+
+def reserve_chat_session(user_id: str) -> Tuple[bool, str, dict]:
+    """
+    Check the chat limit and count a new session against it in one atomic step,
+    so concurrent new sessions can't overshoot the limit.
+    """
+    try:
+        context = get_user_context(user_id)
+        if not context:
+            return False, "User not found", {}
+
+        now = datetime.utcnow()
+        key, counting = _window_key(context, now)
+        if counting:
+            # Common case: the counter is on this window and under the limit
+            updated = _increment_chat_count(ObjectId(user_id), key, context.get("chat_limit"))
+            if updated is not None:
+                return True, "", _limit_info(context, updated["chat_count"])
+
+        # Limit reached, new window, counter not seeded yet, or cached settings out of date
+        user = users_collection.find_one({"_id": ObjectId(user_id)}, LIMIT_FIELDS)
+        if not user:
+            return False, "User not found", {}
+
+        key, counting = _window_key(user, now)
+        current_count = _current_count(user, key, now)
+        chat_limit = user.get("chat_limit")
+        if not counting:
+            # Outside a custom window: nothing is counted, the window's total still applies
+            return _limit_result(user, current_count)
+
+        updated = _increment_chat_count(user["_id"], key, chat_limit)
+        if updated is None and (chat_limit is None or chat_limit > 0):
+            # First session of a new window: roll the counter over
+            updated = users_collection.find_one_and_update(
+                {"_id": user["_id"], "chat_count_window": {"$nin": [key, None]}},
+                {"$set": {"chat_count": 1, "chat_count_window": key, "chat_count_reset_at": now}},
+                projection={"chat_count": 1},
+                return_document=ReturnDocument.AFTER
+            )
+            if updated is None:
+                # Someone else rolled it over first
+                updated = _increment_chat_count(user["_id"], key, chat_limit)
+
+        if updated is None:
+            # Only a limit can stop the increment
+            return _limit_result(user, max(current_count, chat_limit or 0))
+        return True, "", _limit_info(user, updated["chat_count"])
+    except Exception as e:
+        return False, f"Error checking chat limit: {str(e)}", {}
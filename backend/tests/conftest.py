@@ -0,0 +1,81 @@
+"""
+The app runs in-process against the local backends of devtools.local_backends
+(mongomock, in-memory indexes, hashed embeddings) and the fake Gemini server.
+Background workers are off; tests run the jobs they need directly.
+
+Run from backend/:
+    python -m pytest -q
+"""
+import os
+
+# Read when config is imported
+os.environ["DELETION_WORKER_ENABLED"] = "false"
+os.environ["CHAT_ARCHIVE_ENABLED"] = "false"
+
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from devtools.fake_gemini_server import FakeGeminiServer
+from devtools.load_test import _bootstrap_app, _seed_users
+
+fake_gemini = FakeGeminiServer(("127.0.0.1", 0), chunk_interval=0)
+fake_gemini.start_in_thread()
+flask_app = _bootstrap_app(fake_gemini, settings={}, real_embeddings=None)
+
+from configuration.Database import db
+from configuration.client_registry import provider_clients
+from core.user_auth import decode_jwt
+from services.chat_service import _question_flights
+from utils.user_context import user_context_cache
+
+# Seeded once by _bootstrap_app and kept between tests
+KEPT_COLLECTIONS = {"api_config"}
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    """
+    Empty every collection (keeping their indexes), both vector indexes and the
+    per-process caches, so each test starts from the same state.
+    """
+    for name in db.list_collection_names():
+        if name not in KEPT_COLLECTIONS:
+            db[name].delete_many({})
+    for index in (provider_clients.current("pinecone_index"), provider_clients.current("pinecone_chat_index")):
+        index.delete(delete_all=True)
+    user_context_cache._entries.clear()
+    _question_flights._calls.clear()
+    yield
+
+
+@pytest.fixture
+def client():
+    return flask_app.test_client()
+
+
+@pytest.fixture
+def gemini():
+    return fake_gemini
+
+
+@pytest.fixture
+def chat_index():
+    return provider_clients.current("pinecone_chat_index")
+
+
+@pytest.fixture
+def make_user():
+    """
+    make_user(**fields) creates a user with one enabled document in the index
+    and returns (user_id, auth headers).
+    """
+    def make(**fields):
+        (token,) = _seed_users(SimpleNamespace(users=1, docs_per_user=1, chunks_per_doc=3), random.Random(0))
+        user_id = decode_jwt(token)["user_id"]
+        if fields:
+            from bson import ObjectId
+            db.users.update_one({"_id": ObjectId(user_id)}, {"$set": fields})
+        return user_id, {"Authorization": f"Bearer {token}"}
+    return make
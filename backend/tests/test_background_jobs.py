@@ -0,0 +1,144 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from configuration.Database import db
+from configuration.client_registry import provider_clients
+from devtools.local_backends import HASH_EMBEDDING_DIM
+from lib.chatArchive import ChatArchiver
+from lib.chatSession import save_messages, delete_chat
+from lib.deletionJobs import DeletionWorker, enqueue_user_deletion, enqueue_document_deletion, get_deletion_job
+from lib.vector_Store import build_chat_message_vectors, upsert_chat_message_vectors, generate_chat_vector_id
+from models.document_chunk import document_chunk_schema
+
+TURN = [("user", "What is the travel policy?"), ("assistant", "Ask the travel team.")]
+
+
+@pytest.fixture
+def document_index():
+    return provider_clients.current("pinecone_index")
+
+
+def _vector_ids(index, **filter) -> set:
+    result = index.query(top_k=10000, vector=[1.0] * HASH_EMBEDDING_DIM, filter=filter)
+    return {match.id for match in result.matches}
+
+
+def _save_session(user_id: str, session_id: str):
+    """
+    A two-message session whose vectors are in the chat index.
+    """
+    first_index = save_messages(user_id, session_id, TURN)["firstIndex"]
+    upsert_chat_message_vectors(build_chat_message_vectors([
+        {"userId": user_id, "sessionId": session_id, "index": first_index + i, "role": role, "message": message}
+        for i, (role, message) in enumerate(TURN)
+    ]))
+
+
+def _record_chunks(document_index, document_id) -> set:
+    """
+    Chunk records for a seeded document's vectors, as an upload writes them.
+    """
+    ids = _vector_ids(document_index, documentId=str(document_id))
+    db.document_chunks.insert_many([
+        document_chunk_schema({"document_id": document_id, "chunk_index": i, "content": "", "vector_id": vector_id})
+        for i, vector_id in enumerate(sorted(ids))
+    ])
+    return ids
+
+
+def test_archiver_moves_old_deleted_sessions(make_user, chat_index):
+    user_id, _ = make_user()
+    for session_id in ("old", "recent", "active"):
+        _save_session(user_id, session_id)
+    delete_chat(user_id, "old")
+    delete_chat(user_id, "recent")
+    db.chat_sessions.update_one({"sessionId": "old"}, {"$set": {"updatedAt": datetime.utcnow() - timedelta(days=30)}})
+    # A vector from before message vectors had derived ids
+    chat_index.upsert(vectors=[{
+        "id": generate_chat_vector_id("old"), "values": [1.0] * HASH_EMBEDDING_DIM,
+        "metadata": {"userId": user_id, "sessionId": "old"}
+    }])
+
+    assert ChatArchiver(grace_days=7).run_once() == 1
+
+    assert {s["sessionId"] for s in db.chat_sessions.find()} == {"recent", "active"}
+    assert db.messages.count_documents({"sessionId": "old"}) == 0
+    assert [s["sessionId"] for s in db.chat_sessions_archive.find()] == ["old"]
+    assert db.messages_archive.count_documents({"sessionId": "old"}) == 1
+    assert _vector_ids(chat_index, sessionId="old") == set()
+    assert len(_vector_ids(chat_index, sessionId="recent")) == 2
+    # Nothing left to archive
+    assert ChatArchiver(grace_days=7).run_once() == 0
+
+
+def test_user_deletion_purges_chats_and_documents(make_user, chat_index, document_index):
+    user_id, _ = make_user()
+    other_id, _ = make_user()
+    for uid in (user_id, other_id):
+        _save_session(uid, f"{uid}-s1")
+        _record_chunks(document_index, db.documents.find_one({"user_id": ObjectId(uid)})["_id"])
+    db.chat_sessions_archive.insert_one({"userId": user_id, "sessionId": "archived"})
+
+    job_id = enqueue_user_deletion(user_id, requested_by="admin", delete_chats=True, delete_documents=True)
+    assert DeletionWorker().run_pending() == 1
+
+    job = get_deletion_job(job_id)
+    assert job["status"] == "done"
+    assert job["progress"]["sessions"] == 1 and job["progress"]["archived_sessions"] == 1
+    for collection in ("chat_sessions", "messages", "chat_sessions_archive"):
+        assert db[collection].count_documents({"userId": user_id}) == 0
+    assert db.documents.count_documents({"user_id": ObjectId(user_id)}) == 0
+    assert _vector_ids(chat_index, userId=user_id) == set()
+    assert _vector_ids(document_index, userId=user_id) == set()
+
+    # The other user's data is untouched
+    assert db.chat_sessions.count_documents({"userId": other_id}) == 1
+    assert len(_vector_ids(chat_index, userId=other_id)) == 2
+    assert len(_vector_ids(document_index, userId=other_id)) == 3
+
+
+def test_document_deletion_hides_it_at_once(make_user, document_index):
+    user_id, _ = make_user()
+    other_id, _ = make_user()
+    document_id = db.documents.find_one({"user_id": ObjectId(user_id)})["_id"]
+    vector_ids = _record_chunks(document_index, document_id)
+
+    assert enqueue_document_deletion(str(document_id), other_id) is None
+    job_id = enqueue_document_deletion(str(document_id), user_id)
+    document = db.documents.find_one({"_id": document_id})
+    assert document["status"] == "deleting" and document["is_enabled"] is False
+    # Already queued
+    assert enqueue_document_deletion(str(document_id), user_id) is None
+
+    DeletionWorker().run_pending()
+
+    assert get_deletion_job(job_id)["progress"] == {"chunks": 3, "vectors": 3, "documents": 1}
+    assert db.documents.find_one({"_id": document_id}) is None
+    assert db.document_chunks.count_documents({"document_id": document_id}) == 0
+    assert _vector_ids(document_index, documentId=str(document_id)) == set()
+    assert vector_ids
+
+
+def test_failed_jobs_are_retried_with_backoff(make_user, document_index, monkeypatch):
+    user_id, _ = make_user()
+    document_id = db.documents.find_one({"user_id": ObjectId(user_id)})["_id"]
+    _record_chunks(document_index, document_id)
+
+    def unavailable(**kwargs):
+        raise ConnectionError("index unavailable")
+
+    monkeypatch.setattr(document_index, "delete", unavailable)
+    job_id = enqueue_document_deletion(str(document_id), user_id)
+    worker = DeletionWorker(retry_backoff=60)
+    worker.run_pending()
+
+    job = get_deletion_job(job_id)
+    assert job["status"] == "pending" and job["attempts"] == 1
+    assert "index unavailable" in job["error"]
+    assert db.deletion_jobs.find_one({"_id": ObjectId(job_id)})["runAfter"] > datetime.utcnow() + timedelta(seconds=50)
+    assert worker.stats()["retried"] == 1
+    # Not due yet
+    assert worker.run_pending() == 0
+    assert db.document_chunks.count_documents({"document_id": document_id}) == 3
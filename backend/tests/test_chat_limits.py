@@ -0,0 +1,83 @@
+from datetime import datetime
+
+from bson import ObjectId
+
+from configuration.Database import db
+from lib.chatSession import save_messages
+from models.chat_session import chat_session_schema
+from utils.user_limits import reserve_chat_session, release_chat_session
+
+TURN = [("user", "q"), ("assistant", "a")]
+
+
+def _counter(user_id: str) -> tuple:
+    user = db.users.find_one({"_id": ObjectId(user_id)})
+    return user.get("chat_count"), user.get("chat_count_window")
+
+
+def test_reservations_stop_at_the_limit(make_user):
+    user_id, _ = make_user(chat_limit=2, usage_time_window="daily")
+
+    assert reserve_chat_session(user_id)[0]
+    assert reserve_chat_session(user_id)[0]
+    allowed, error, info = reserve_chat_session(user_id)
+
+    assert not allowed
+    assert "daily chat limit of 2" in error
+    assert info["current_count"] == 2
+    assert _counter(user_id) == (2, f"daily:{datetime.utcnow():%Y-%m-%d}")
+
+
+def test_counter_seeded_from_existing_sessions(make_user):
+    user_id, _ = make_user(chat_limit=3, usage_time_window="daily")
+    for session_id in ("s1", "s2"):
+        db.chat_sessions.insert_one(chat_session_schema({"userId": user_id, "sessionId": session_id, "messageCount": 0}))
+
+    assert reserve_chat_session(user_id)[:2] == (True, "")
+    assert _counter(user_id)[0] == 3
+    assert not reserve_chat_session(user_id)[0]
+
+
+def test_counter_rolls_over_to_a_new_window(make_user):
+    user_id, _ = make_user(chat_limit=2, usage_time_window="daily", chat_count=2, chat_count_window="daily:2000-01-01")
+
+    allowed, _, info = reserve_chat_session(user_id)
+
+    assert allowed
+    assert info["current_count"] == 1
+    assert _counter(user_id) == (1, f"daily:{datetime.utcnow():%Y-%m-%d}")
+
+
+def test_custom_window_counts_only_inside_it(make_user):
+    user_id, _ = make_user(
+        chat_limit=1, usage_time_window="custom",
+        usage_start_time=datetime(2000, 1, 1), usage_end_time=datetime(2000, 1, 2)
+    )
+
+    # Outside the window nothing is counted
+    assert reserve_chat_session(user_id)[0]
+    assert reserve_chat_session(user_id)[0]
+    assert _counter(user_id)[0] == 0
+
+
+def test_release_gives_a_reservation_back(make_user):
+    user_id, _ = make_user(chat_limit=1, usage_time_window="daily")
+
+    assert reserve_chat_session(user_id)[0]
+    release_chat_session(user_id)
+
+    assert _counter(user_id)[0] == 0
+    assert reserve_chat_session(user_id)[0]
+
+
+def test_limit_applies_to_new_sessions_only(make_user):
+    user_id, _ = make_user(chat_limit=1, usage_time_window="monthly")
+
+    assert save_messages(user_id, "s1", TURN)["success"]
+    refused = save_messages(user_id, "s2", TURN)
+    assert not refused["success"]
+    assert "monthly chat limit of 1" in refused["error"]
+
+    # The existing session keeps accepting turns
+    assert save_messages(user_id, "s1", TURN)["firstIndex"] == 2
+    assert db.chat_sessions.count_documents({"userId": user_id}) == 1
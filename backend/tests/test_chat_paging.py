@@ -0,0 +1,73 @@
+from datetime import datetime
+
+from configuration.Database import db
+from lib.chatSession import save_messages, list_chat_sessions, delete_chat
+
+
+def _save_turns(user_id: str, session_id: str, turns: int):
+    for i in range(turns):
+        save_messages(user_id, session_id, [("user", f"q{i}"), ("assistant", f"a{i}")])
+
+
+def test_history_pages_back_to_the_start(client, make_user):
+    user_id, headers = make_user()
+    # 130 messages, across two message buckets
+    _save_turns(user_id, "s1", 65)
+
+    pages, before = [], None
+    while True:
+        query = {"sessionId": "s1", "limit": 50, **({"before": before} if before else {})}
+        body = client.get("/chat/history", headers=headers, query_string=query).get_json()
+        assert body["success"] and body["total"] == 130
+        pages.append([m["message"] for m in body["messages"]])
+        before = body["nextCursor"]
+        if before is None:
+            break
+
+    assert [len(page) for page in pages] == [50, 50, 30]
+    # Pages come newest first, messages oldest first within a page
+    messages = [m for page in reversed(pages) for m in page]
+    assert messages == [text for i in range(65) for text in (f"q{i}", f"a{i}")]
+
+
+def test_history_rejects_invalid_cursors(client, make_user):
+    _, headers = make_user()
+
+    response = client.get("/chat/history", headers=headers, query_string={"sessionId": "s1", "before": "-1"})
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "Invalid cursor"
+
+
+def test_history_of_an_unknown_session_is_empty(client, make_user):
+    _, headers = make_user()
+
+    body = client.get("/chat/history", headers=headers, query_string={"sessionId": "missing"}).get_json()
+    assert body["messages"] == [] and body["nextCursor"] is None
+
+
+def test_sessions_page_in_update_order(client, make_user):
+    user_id, headers = make_user()
+    for i in range(5):
+        _save_turns(user_id, f"s{i}", 1)
+    delete_chat(user_id, "s4")
+    # Ties on updatedAt are broken by _id, so no session is skipped or repeated
+    db.chat_sessions.update_many({"sessionId": {"$in": ["s1", "s2"]}}, {"$set": {"updatedAt": datetime(2030, 1, 1)}})
+
+    seen, cursor = [], None
+    while True:
+        query = {"limit": 2, **({"cursor": cursor} if cursor else {})}
+        body = client.get("/chat/all-history", headers=headers, query_string=query).get_json()
+        assert body["success"]
+        assert all("messages" not in s for s in body["sessions"])
+        seen += [s["sessionId"] for s in body["sessions"]]
+        cursor = body["nextCursor"]
+        if cursor is None:
+            break
+
+    assert seen == ["s2", "s1", "s3", "s0"]
+
+
+def test_sessions_reject_invalid_cursors(make_user):
+    user_id, _ = make_user()
+
+    assert list_chat_sessions(user_id, cursor="not-a-cursor") == {"success": False, "error": "Invalid cursor"}
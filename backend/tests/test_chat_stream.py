@@ -0,0 +1,64 @@
+import json
+
+from lib.chatSession import get_chat_history
+
+
+def _events(body: str) -> list:
+    """
+    (event, data) pairs of a Server-Sent Events body.
+    """
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = "message", None
+        for line in block.split("\n"):
+            if line.startswith("event: "):
+                event = line[len("event: "):]
+            elif line.startswith("data: "):
+                data = json.loads(line[len("data: "):])
+        events.append((event, data))
+    return events
+
+
+def test_stream_sends_tokens_then_done_and_saves_the_turn(client, make_user, gemini):
+    user_id, headers = make_user()
+
+    response = client.post("/chat/ask/stream", headers=headers, json={"question": "What is the travel policy?", "sessionId": "s1"})
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    events = _events(response.get_data(as_text=True))
+    response.close()
+
+    tokens = [data["token"] for event, data in events if event == "message"]
+    assert len(tokens) > 1
+    assert events[-1][0] == "done"
+    answer = events[-1][1]["answer"]
+    assert answer == "".join(tokens).strip() == gemini.answer
+
+    history = get_chat_history(user_id, "s1")
+    assert [(m["role"], m["message"]) for m in history["messages"]] == [
+        ("user", "What is the travel policy?"),
+        ("assistant", answer),
+    ]
+
+
+def test_stream_closed_early_saves_nothing(client, make_user):
+    user_id, headers = make_user()
+
+    response = client.post("/chat/ask/stream", headers=headers, json={"question": "What is the travel policy?", "sessionId": "s1"})
+    body = iter(response.response)
+    assert next(body)
+    # The client goes away before the answer is complete
+    response.close()
+
+    assert get_chat_history(user_id, "s1")["messages"] == []
+
+
+def test_stream_rejects_invalid_requests_before_streaming(client, make_user):
+    _, headers = make_user()
+
+    response = client.post("/chat/ask/stream", headers=headers, json={"sessionId": "s1"})
+    assert response.status_code == 400
+    assert response.get_json() == {"success": False, "error": "question is required"}
+
+    response = client.post("/chat/ask/stream", json={"question": "hi", "sessionId": "s1"})
+    assert response.status_code == 401
@@ -0,0 +1,168 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services import chat_service
+from services.chat_service import _question_flight_key
+from utils.single_flight import SingleFlight
+
+NO_HISTORY = {"has_history": False, "messageCount": 0}
+
+
+def _wait_until(condition, timeout: float = 5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out waiting for concurrent callers"
+        time.sleep(0.01)
+
+
+def _run_concurrently(flight: SingleFlight, key, fn, callers: int) -> list:
+    results = [None] * callers
+
+    def call(i):
+        results[i] = flight.do(key, fn)
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(callers)]
+    for t in threads:
+        t.start()
+    return threads, results
+
+
+def test_concurrent_calls_share_one_computation():
+    flight = SingleFlight()
+    release, calls = threading.Event(), []
+
+    def compute():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    threads, results = _run_concurrently(flight, "k", compute, callers=5)
+    _wait_until(lambda: flight.coalesced == 4)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(calls) == 1
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert {result for result, _ in results} == {"answer"}
+    assert flight.in_flight() == 0
+
+
+def test_waiters_receive_the_leaders_error():
+    flight = SingleFlight()
+    release = threading.Event()
+
+    def compute():
+        release.wait(5)
+        raise ValueError("provider down")
+
+    errors = []
+
+    def call():
+        try:
+            flight.do("k", compute)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call) for _ in range(3)]
+    for t in threads:
+        t.start()
+    _wait_until(lambda: flight.coalesced == 2)
+    release.set()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 3
+    # The next call computes again
+    assert flight.do("k", lambda: "ok") == ("ok", False)
+
+
+def test_waiter_times_out():
+    flight = SingleFlight()
+    release = threading.Event()
+    leader = threading.Thread(target=flight.do, args=("k", lambda: release.wait(5)))
+    leader.start()
+    _wait_until(lambda: flight.in_flight() == 1)
+
+    with pytest.raises(TimeoutError):
+        flight.do("k", lambda: None, timeout=0.05)
+    release.set()
+    leader.join()
+
+
+def test_async_calls_share_one_task():
+    flight = SingleFlight()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("k", compute) for _ in range(4)))
+
+    results = asyncio.run(main())
+    assert len(calls) == 1
+    assert [shared for _, shared in results] == [False, True, True, True]
+    assert flight.in_flight() == 0
+
+
+def test_flight_key_scoped_to_user_without_history():
+    key = _question_flight_key("u1", "s1", "What is the policy?", {"d1"}, 5, NO_HISTORY)
+
+    # Same user, other session, same question up to case and punctuation
+    assert _question_flight_key("u1", "s2", "  what is the POLICY ", {"d1"}, 5, NO_HISTORY) == key
+    assert _question_flight_key("u2", "s1", "What is the policy?", {"d1"}, 5, NO_HISTORY) != key
+
+
+def test_flight_key_changes_with_documents_and_top_k():
+    key = _question_flight_key("u1", "s1", "What is the policy?", {"d1", "d2"}, 5, NO_HISTORY)
+
+    assert _question_flight_key("u1", "s1", "What is the policy?", {"d2", "d1"}, 5, NO_HISTORY) == key
+    assert _question_flight_key("u1", "s1", "What is the policy?", {"d1"}, 5, NO_HISTORY) != key
+    assert _question_flight_key("u1", "s1", "What is the policy?", {"d1", "d2"}, 3, NO_HISTORY) != key
+
+
+def test_flight_key_scoped_to_session_length_with_history():
+    memory = {"has_history": True, "messageCount": 4}
+    key = _question_flight_key("u1", "s1", "and the second one?", {"d1"}, 5, memory)
+
+    assert _question_flight_key("u1", "s2", "and the second one?", {"d1"}, 5, memory) != key
+    assert _question_flight_key("u1", "s1", "and the second one?", {"d1"}, 5, {**memory, "messageCount": 6}) != key
+
+
+def test_identical_questions_make_one_llm_call(make_user, gemini):
+    user_id, _ = make_user()
+    gemini_calls = gemini.stats()["generate"]
+    coalesced = chat_service._question_flights.coalesced
+    release = threading.Event()
+    compute = chat_service._compute_answer
+
+    def slow_compute(*args, **kwargs):
+        release.wait(5)
+        return compute(*args, **kwargs)
+
+    chat_service._compute_answer = slow_compute
+    try:
+        results = [None, None]
+
+        def ask(i):
+            results[i] = chat_service.ask_rag_question(user_id=user_id, session_id=f"s{i}", question="What is the travel policy?")
+
+        threads = [threading.Thread(target=ask, args=(i,)) for i in range(2)]
+        for t in threads:
+            t.start()
+        _wait_until(lambda: chat_service._question_flights.coalesced == coalesced + 1)
+        release.set()
+        for t in threads:
+            t.join()
+    finally:
+        chat_service._compute_answer = compute
+
+    assert all(r["success"] for r in results)
+    assert results[0]["answer"] == results[1]["answer"]
+    assert gemini.stats()["generate"] == gemini_calls + 1